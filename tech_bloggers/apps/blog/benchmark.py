@@ -0,0 +1,294 @@
+"""
+In-process benchmarks of the key endpoints (see the benchmark_endpoints command).
+
+Every endpoint is requested through the Django test client, so the full middleware
+stack, templates and database queries are exercised without a web server. Each
+endpoint gets a few warmup requests, then timed requests (with the queries counted),
+then a few requests under tracemalloc for the allocation peak, which is kept out of
+the timed loop because tracing slows everything down. Endpoints with a p99 budget
+(search suggestions, SEARCH_SUGGEST_P99_MS) are also checked against it, with or
+without a baseline.
+
+Run it against a seeded database (see seed_performance_data), never production:
+the like and upload endpoints write. The uploaded images are deleted again after
+each request, and the benchmark user (with its likes) after the run if the run
+created it. Cold runs invalidate the blog's generation counters and the pages of
+the benchmarked endpoints rather than clearing the whole cache.
+"""
+import platform
+import statistics
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from io import BytesIO
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from apps.core.pagecache import purge_pages
+
+from .cache import bump_content_generation, bump_engagement_generation
+from .models import Post, PostImage
+
+BENCHMARK_USERNAME = 'benchmark'
+
+DEFAULT_TOLERANCES = {
+    # Allowed relative growth of p95 latency
+    'latency': 0.25,
+    # Growth of p95 latency always allowed (ms), so sub-millisecond noise does not fail
+    'latency_floor_ms': 2.0,
+    # Allowed extra queries per request (absolute)
+    'queries': 0,
+    # Allowed relative growth of the allocation peak
+    'memory': 0.5,
+}
+
+
+@dataclass
+class Endpoint:
+    name: str
+    path: str
+    method: str = 'get'
+    login: bool = False
+    data: object = None  # Callable returning the POST data of one request
+    teardown: object = None  # Callable run after each request, outside the timings
+    expected_status: tuple = (200,)
+    p99_budget_ms: float = None  # Absolute p99 latency limit, see check_budgets()
+
+
+@dataclass
+class BenchmarkOptions:
+    iterations: int = 50
+    warmup: int = 5
+    memory_iterations: int = 5
+    cold: bool = False
+    only: list = field(default_factory=list)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of `values`"""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def png_bytes(size=(64, 64)):
+    buffer = BytesIO()
+    Image.new('RGB', size, (40, 120, 200)).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def get_benchmark_user():
+    """Return (user, created) for the user the authenticated endpoints run as"""
+    user, created = User.objects.get_or_create(
+        username=BENCHMARK_USERNAME, defaults={'email': f'{BENCHMARK_USERNAME}@example.com'}
+    )
+    if created:
+        user.set_unusable_password()
+        user.save(update_fields=['password'])
+    return user, created
+
+
+def search_term():
+    """A word from the newest published title, so the search has results"""
+    title = Post.objects.filter(status='published').order_by('-published_at').values_list('title', flat=True).first()
+    words = [word for word in (title or '').split() if len(word) > 3]
+    return words[0].lower() if words else 'python'
+
+
+def build_endpoints(user):
+    """The benchmarked endpoints, resolved against the current data"""
+    published = Post.objects.filter(status='published')
+    heaviest = published.order_by('-comment_count', '-pk').only('pk', 'slug').first()
+    if heaviest is None:
+        raise ValueError('No published posts to benchmark; run seed_performance_data first.')
+    post_kwargs = {'pk': heaviest.pk, 'slug': heaviest.slug}
+    image = png_bytes()
+
+    def upload_data():
+        return {'file': SimpleUploadedFile('benchmark.png', image, content_type='image/png')}
+
+    def delete_uploads():
+        # Deleting the rows removes the files too (post_delete receiver)
+        for post_image in PostImage.objects.filter(uploaded_by=user, post=None):
+            post_image.delete()
+
+    return [
+        Endpoint('index', reverse('pages:index')),
+        Endpoint('post_list', reverse('blog:post_list')),
+        Endpoint('post_list_search', f"{reverse('blog:post_list')}?q={search_term()}"),
+        Endpoint(
+            'search_suggest', f"{reverse('blog:search_suggest')}?q={search_term()}",
+            p99_budget_ms=settings.SEARCH_SUGGEST_P99_MS,
+        ),
+        Endpoint('post_detail', reverse('blog:post_detail', kwargs=post_kwargs)),
+        Endpoint('post_like', reverse('blog:post_like', kwargs=post_kwargs), method='post', login=True),
+        Endpoint(
+            'image_upload', reverse('blog:image_upload'), method='post', login=True,
+            data=upload_data, teardown=delete_uploads,
+        ),
+        Endpoint('rss_feed', reverse('blog:post_feed')),
+        Endpoint('atom_feed', reverse('blog:post_atom_feed')),
+        Endpoint('sitemap_index', reverse('django.contrib.sitemaps.views.index')),
+        Endpoint('sitemap_posts', reverse('django.contrib.sitemaps.views.sitemap', kwargs={'section': 'posts'})),
+    ]
+
+
+class BenchmarkRunner:
+    def __init__(self, options, endpoints=None):
+        self.options = options
+        self.user, self.created_user = get_benchmark_user()
+        self.endpoints = endpoints if endpoints is not None else build_endpoints(self.user)
+        if options.only:
+            unknown = set(options.only) - {endpoint.name for endpoint in self.endpoints}
+            if unknown:
+                raise ValueError(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+            self.endpoints = [endpoint for endpoint in self.endpoints if endpoint.name in options.only]
+        self.anonymous = Client()
+        self.authenticated = Client()
+        self.authenticated.force_login(self.user)
+
+    def purge_caches(self):
+        """Invalidate what the blog caches for the endpoints, leaving other cache users alone"""
+        bump_content_generation()
+        bump_engagement_generation()
+        purge_pages(endpoint.path.split('?')[0] for endpoint in self.endpoints)
+
+    def request(self, endpoint):
+        if self.options.cold:
+            self.purge_caches()
+        client = self.authenticated if endpoint.login else self.anonymous
+        data = endpoint.data() if endpoint.data else None
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = getattr(client, endpoint.method)(endpoint.path, data)
+            elapsed = time.perf_counter() - start
+        if endpoint.teardown:
+            endpoint.teardown()
+        if response.status_code not in endpoint.expected_status:
+            raise RuntimeError(f'{endpoint.name}: {endpoint.method.upper()} {endpoint.path} returned {response.status_code}')
+        return response, elapsed, len(captured)
+
+    def run_endpoint(self, endpoint):
+        for _ in range(self.options.warmup):
+            self.request(endpoint)
+
+        timings = []
+        queries = []
+        for _ in range(self.options.iterations):
+            response, elapsed, query_count = self.request(endpoint)
+            timings.append(elapsed * 1000)
+            queries.append(query_count)
+
+        peaks = []
+        for _ in range(self.options.memory_iterations):
+            tracemalloc.start()
+            try:
+                self.request(endpoint)
+                peaks.append(tracemalloc.get_traced_memory()[1] / 1024)
+            finally:
+                tracemalloc.stop()
+
+        return {
+            'method': endpoint.method.upper(),
+            'path': endpoint.path,
+            'status': response.status_code,
+            'latency_ms': {
+                'p50': round(percentile(timings, 50), 3),
+                'p95': round(percentile(timings, 95), 3),
+                'p99': round(percentile(timings, 99), 3),
+                'mean': round(statistics.fmean(timings), 3),
+                'min': round(min(timings), 3),
+                'max': round(max(timings), 3),
+                'p99_budget': endpoint.p99_budget_ms,
+            },
+            'queries': {
+                'median': statistics.median_low(queries),
+                'max': max(queries),
+            },
+            'memory_kib': {
+                'peak_p50': round(statistics.median_low(peaks), 1) if peaks else None,
+                'peak_max': round(max(peaks), 1) if peaks else None,
+            },
+        }
+
+    def run(self):
+        try:
+            # Rate limits would turn repeated writes into 403s
+            with override_settings(RATELIMIT_ENABLE=False):
+                results = {endpoint.name: self.run_endpoint(endpoint) for endpoint in self.endpoints}
+        finally:
+            if self.created_user:
+                # Its likes go too (and are uncounted by the pre_delete receiver)
+                self.user.delete()
+        return {
+            'meta': {
+                'created_at': timezone.now().isoformat(),
+                'iterations': self.options.iterations,
+                'warmup': self.options.warmup,
+                'memory_iterations': self.options.memory_iterations,
+                'cold': self.options.cold,
+                'database': connection.vendor,
+                'posts': Post.objects.filter(status='published').count(),
+                'django': django.get_version(),
+                'python': platform.python_version(),
+            },
+            'endpoints': results,
+        }
+
+
+def check_budgets(report):
+    """Endpoints of `report` whose p99 latency exceeds their budget, as human-readable strings"""
+    violations = []
+    for name, current in report['endpoints'].items():
+        budget = current['latency_ms'].get('p99_budget')
+        if budget is not None and current['latency_ms']['p99'] > budget:
+            violations.append(f"{name}: p99 latency {current['latency_ms']['p99']:.1f}ms > {budget}ms budget")
+    return violations
+
+
+def compare_to_baseline(report, baseline, tolerances=None):
+    """
+    Regressions of `report` against `baseline` as human-readable strings. Endpoints
+    missing from either side are ignored.
+    """
+    tolerances = {**DEFAULT_TOLERANCES, **(tolerances or {})}
+    regressions = []
+    for name, current in report['endpoints'].items():
+        previous = baseline.get('endpoints', {}).get(name)
+        if previous is None:
+            continue
+
+        limit = max(
+            previous['latency_ms']['p95'] * (1 + tolerances['latency']),
+            previous['latency_ms']['p95'] + tolerances['latency_floor_ms'],
+        )
+        if current['latency_ms']['p95'] > limit:
+            regressions.append(
+                f"{name}: p95 latency {current['latency_ms']['p95']:.1f}ms > {limit:.1f}ms "
+                f"(baseline {previous['latency_ms']['p95']:.1f}ms)"
+            )
+
+        limit = previous['queries']['max'] + tolerances['queries']
+        if current['queries']['max'] > limit:
+            regressions.append(
+                f"{name}: {current['queries']['max']} queries > {limit} (baseline {previous['queries']['max']})"
+            )
+
+        previous_peak = previous['memory_kib']['peak_p50']
+        current_peak = current['memory_kib']['peak_p50']
+        if previous_peak is not None and current_peak is not None:
+            limit = previous_peak * (1 + tolerances['memory'])
+            if current_peak > limit:
+                regressions.append(
+                    f"{name}: allocation peak {current_peak:.0f}KiB > {limit:.0f}KiB (baseline {previous_peak:.0f}KiB)"
+                )
+    return regressions
@@ -0,0 +1,102 @@
+"""
+Cache helpers for published blog content.
+
+Generation counters live in the configured cache backend. Cache entries include
+the generations they depend on in their key, so bumping a counter invalidates all
+of them at once across every worker:
+
+* the published content generation is bumped whenever a post is saved or deleted
+  or its tags change;
+* the engagement generation is bumped whenever a post is liked or unliked or a
+  comment is added or removed.
+
+Each content bump also records when it happened, so Last-Modified can move
+forward for changes that leave no updated_at behind, like deleting a post.
+
+Anonymous full-page cache entries (apps.core.pagecache) are purged per URL
+instead; see purge_post_pages().
+"""
+import time
+
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.core.pagecache import purge_pages
+
+CONTENT_GENERATION_KEY = 'blog:content_generation'
+ENGAGEMENT_GENERATION_KEY = 'blog:engagement_generation'
+CONTENT_CHANGED_AT_KEY = 'blog:content_changed_at'
+
+
+def _initial_generation():
+    # Seed from the clock so a lost counter never reuses the number of a still-cached generation
+    return int(time.time())
+
+
+def _get_generation(key):
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, _initial_generation(), timeout=None)
+        generation = cache.get(key, 0)
+    return generation
+
+
+def _bump_generation(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Key missing (first run or evicted): start a fresh generation
+        cache.add(key, _initial_generation(), timeout=None)
+        return cache.incr(key)
+
+
+def get_content_generation():
+    """Return the current published content generation"""
+    return _get_generation(CONTENT_GENERATION_KEY)
+
+
+def get_content_changed_at():
+    """Return when the content generation was last bumped, or None if unknown"""
+    return cache.get(CONTENT_CHANGED_AT_KEY)
+
+
+def bump_content_generation():
+    """Invalidate every cache entry keyed on the content generation"""
+    # Recorded first, so a reader of the new generation never sees an older time
+    cache.set(CONTENT_CHANGED_AT_KEY, timezone.now(), timeout=None)
+    return _bump_generation(CONTENT_GENERATION_KEY)
+
+
+def get_engagement_generation():
+    """Return the current likes/comments generation"""
+    return _get_generation(ENGAGEMENT_GENERATION_KEY)
+
+
+def bump_engagement_generation():
+    """Invalidate every cache entry keyed on the engagement generation"""
+    return _bump_generation(ENGAGEMENT_GENERATION_KEY)
+
+
+def purge_post_pages(posts, content=True):
+    """
+    Purge the cached anonymous pages that show `posts` (objects with pk and slug).
+
+    Listing pages (including their tag filters and page numbers) and the homepage
+    always show counters, so they are purged for any change. Feeds and the sitemap
+    only change with the content itself.
+    """
+    paths = [reverse('pages:index'), reverse('blog:post_list')]
+    if content:
+        paths += [
+            reverse('blog:post_feed'),
+            reverse('blog:post_atom_feed'),
+            reverse('django.contrib.sitemaps.views.index'),
+            reverse('django.contrib.sitemaps.views.sitemap', kwargs={'section': 'posts'}),
+            reverse('django.contrib.sitemaps.views.sitemap', kwargs={'section': 'tags'}),
+        ]
+    paths += [
+        reverse('blog:post_detail', kwargs={'pk': post.pk, 'slug': post.slug})
+        for post in posts
+    ]
+    purge_pages(paths)
@@ -0,0 +1,25 @@
+from .models import Comment
+
+
+def load_comment_tree(post):
+    """
+    Load the active comments on `post` as a tree.
+
+    All comments are fetched in one ordered query with their authors joined,
+    then linked in memory: every comment gets a `children` list, and the
+    top-level comments are returned oldest first. Replies whose parent is
+    inactive are dropped along with it.
+    """
+    comments = list(
+        Comment.objects.filter(post=post, active=True).select_related('author').order_by('created_at', 'pk')
+    )
+    by_id = {comment.pk: comment for comment in comments}
+    top_level = []
+    for comment in comments:
+        comment.children = []
+    for comment in comments:
+        if comment.parent_id is None:
+            top_level.append(comment)
+        elif comment.parent_id in by_id:
+            by_id[comment.parent_id].children.append(comment)
+    return top_level
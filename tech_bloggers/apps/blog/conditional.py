@@ -0,0 +1,85 @@
+"""
+Validators for conditional GET (ETag / Last-Modified) on public blog endpoints.
+
+They are used with django.views.decorators.http.condition, which calls them before
+the view runs and answers 304 Not Modified when the client's copy is current, so
+a match costs no rendering.
+
+Feeds and the sitemap are validated against the published content generation
+(apps.blog.cache), which every post save/delete and tag change bumps. Their
+Last-Modified is the later of MAX(updated_at) and the time of the last bump,
+which covers deletions and unpublishing, and it is cached per generation, so
+revalidating them normally needs no database query at all. Wrap them with
+published_content_condition().
+"""
+import hashlib
+from functools import wraps
+
+from django.core.cache import cache
+from django.db.models import Count, Exists, Max, OuterRef, Q
+from django.views.decorators.http import condition
+
+from .cache import get_content_changed_at, get_content_generation
+from .models import Post
+
+
+def published_content_etag(request, *args, **kwargs):
+    return f'"content-{get_content_generation()}"'
+
+
+def published_content_last_modified(request, *args, **kwargs):
+    key = f'blog:last_modified:{get_content_generation()}'
+    last_modified = cache.get(key)
+    if last_modified is None:
+        changed_at = get_content_changed_at()
+        last_modified = Post.objects.filter(status='published').aggregate(
+            last_modified=Max('updated_at')
+        )['last_modified']
+        last_modified = max(filter(None, (last_modified, changed_at)), default=None)
+        if last_modified is not None:
+            cache.set(key, last_modified, None)
+    return last_modified
+
+
+def published_content_condition(view):
+    """
+    condition() with the published content validators. Feeds and sitemaps set
+    Last-Modified from their newest item, which misses deletions, so the view's
+    own header is dropped for the one from published_content_last_modified().
+    """
+    @wraps(view)
+    def view_without_last_modified(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if response.has_header('Last-Modified'):
+            del response.headers['Last-Modified']
+        return response
+
+    return condition(
+        etag_func=published_content_etag,
+        last_modified_func=published_content_last_modified
+    )(view_without_last_modified)
+
+
+def post_detail_etag(request, pk, slug):
+    """
+    ETag for a post page, from one query over the post row and its active comments.
+
+    The post row carries the content timestamp and the like/comment counters; the
+    comment aggregates catch replies and moderation, and the content generation
+    catches tag changes. The page differs per signed-in user (like state, forms),
+    so the user id and whether they like the post are part of the tag. The like
+    state matters with LIKE_WRITE_BEHIND, where a like leaves like_count alone.
+    """
+    user_id = request.user.pk if request.user.is_authenticated else 0
+    row = Post.objects.filter(pk=pk).annotate(
+        active_comments=Count('comments', filter=Q(comments__active=True)),
+        last_comment_at=Max('comments__created_at', filter=Q(comments__active=True)),
+        user_likes=Exists(Post.likes.through.objects.filter(post_id=OuterRef('pk'), user_id=user_id)),
+    ).values_list(
+        'updated_at', 'like_count', 'comment_count', 'active_comments', 'last_comment_at', 'user_likes'
+    ).first()
+    if row is None:
+        return None
+
+    state = f'{get_content_generation()}:{user_id}:' + ':'.join(str(value) for value in row)
+    return f'"{hashlib.sha1(state.encode("utf-8")).hexdigest()}"'
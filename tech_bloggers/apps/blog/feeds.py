@@ -1,66 +1,104 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth.models import User
 from django.contrib.syndication.views import Feed
+from django.core.cache import cache
+from django.shortcuts import get_object_or_404
 from django.urls import reverse
 from django.utils.feedgenerator import Atom1Feed
-from django.contrib.sites.shortcuts import get_current_site
-from .models import Post
+from django.utils.text import Truncator
+from .cache import get_content_generation
+from .models import Post, Tag
+
 
+def get_feed_item_count():
+    return getattr(settings, 'FEED_ITEM_COUNT', 5)
 
-class LatestPostsFeed(Feed):
+
+class CachedFeed(Feed):
+    """
+    Feed whose serialized XML is cached per URL.
+
+    The cache key includes the published content generation, so publishing,
+    editing or deleting posts (or changing tags) invalidates every feed variant;
+    FEED_CACHE_TIMEOUT caps how long author names and the like can be stale.
+    """
+
+    def __call__(self, request, *args, **kwargs):
+        digest = hashlib.sha1(request.build_absolute_uri().encode('utf-8')).hexdigest()
+        key = f'blog:feed:{get_content_generation()}:{digest}'
+        response = cache.get(key)
+        if response is None:
+            response = super().__call__(request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, response, getattr(settings, 'FEED_CACHE_TIMEOUT', 3600))
+        return response
+
+
+class LatestPostsFeed(CachedFeed):
     """
     RSS feed for the latest published blog posts.
-    Returns the 5 most recent published posts.
+    Returns the FEED_ITEM_COUNT most recent published posts.
     """
     title = "Tech-In-Bytes - Latest Posts"
     description = "Latest posts from Tech-In-Bytes community"
-    
+
     def link(self):
-        return "/blog/"
-    
-    def items(self):
+        return reverse('blog:post_list')
+
+    def get_queryset(self, obj=None):
         """
-        Return the 5 latest published posts ordered by publication date.
+        Published posts with everything the items need loaded up front:
+        authors joined, tags prefetched and post bodies deferred.
         """
         return Post.objects.filter(
             status='published'
-        ).select_related('author').order_by('-published_at')[:5]
-    
+        ).select_related('author').prefetch_related('tags').defer(*Post.LIST_DEFERRED_FIELDS)
+
+    def items(self, obj=None):
+        """
+        Return the latest published posts ordered by publication date.
+        """
+        return self.get_queryset(obj).order_by('-published_at')[:get_feed_item_count()]
+
     def item_title(self, item):
         """Return the post title."""
         return item.title
-    
+
     def item_description(self, item):
         """
-        Return the post summary or truncated content.
+        Return the post summary or the stored plain-text excerpt.
         """
         if item.summary:
             return item.summary
-        # If no summary, truncate content to 200 characters
-        return item.content[:200] + "..." if len(item.content) > 200 else item.content
-    
+        # If no summary, truncate the excerpt to 200 characters
+        return Truncator(item.excerpt).chars(200, truncate='...')
+
     def item_link(self, item):
         """
         Return the absolute URL to the post detail page.
         """
-        return f"/blog/{item.pk}-{item.slug}/"
-    
+        return reverse('blog:post_detail', kwargs={'pk': item.pk, 'slug': item.slug})
+
     def item_author_name(self, item):
         """
         Return the author's full name or username.
         """
         return item.author.get_full_name() or item.author.username
-    
+
     def item_pubdate(self, item):
         """
         Return the publication date of the post.
         """
         return item.published_at
-    
+
     def item_updateddate(self, item):
         """
         Return the last updated date of the post.
         """
         return item.updated_at
-    
+
     def item_categories(self, item):
         """
         Return the tags associated with the post as categories.
@@ -74,3 +112,62 @@ class LatestPostsAtomFeed(LatestPostsFeed):
     """
     feed_type = Atom1Feed
     subtitle = LatestPostsFeed.description
+
+
+class TagPostsFeed(LatestPostsFeed):
+    """
+    RSS feed for the latest published posts with a given tag.
+    """
+
+    def get_object(self, request, slug):
+        return get_object_or_404(Tag, slug=slug)
+
+    def title(self, obj):
+        return f"Tech-In-Bytes - {obj.name}"
+
+    def description(self, obj):
+        return f"Latest {obj.name} posts from Tech-In-Bytes community"
+
+    def link(self, obj):
+        return f"{reverse('blog:post_list')}?category={obj.slug}"
+
+    def get_queryset(self, obj=None):
+        return super().get_queryset().filter(tags=obj)
+
+
+class TagPostsAtomFeed(TagPostsFeed):
+    """
+    Atom feed version of the tag feed.
+    """
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return self.description(obj)
+
+
+class AuthorPostsFeed(LatestPostsFeed):
+    """
+    RSS feed for the latest published posts by a given author.
+    """
+
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, obj):
+        return f"Tech-In-Bytes - Posts by {obj.get_full_name() or obj.username}"
+
+    def description(self, obj):
+        return f"Latest posts by {obj.get_full_name() or obj.username} on Tech-In-Bytes"
+
+    def get_queryset(self, obj=None):
+        return super().get_queryset().filter(author=obj)
+
+
+class AuthorPostsAtomFeed(AuthorPostsFeed):
+    """
+    Atom feed version of the author feed.
+    """
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return self.description(obj)
@@ -1,8 +1,10 @@
 from django import forms
-import bleach
 import re
+from urllib.parse import urlparse
 from django.conf import settings
 from .models import Post, Tag, PostImage
+from .tagstats import get_tag_list
+from .utils import sanitize_content
 
 
 class PostForm(forms.ModelForm):
@@ -44,12 +46,8 @@ class PostForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        # Add a custom field to pass available tags to template
-        self.fields['available_tags'] = forms.ModelMultipleChoiceField(
-            queryset=Tag.objects.all().order_by('name'),
-            required=False,
-            widget=forms.HiddenInput()
-        )
+        # Tags offered by the tag selector (shared reference data, no query per form)
+        self.available_tags = get_tag_list()
 
         # If editing an existing post, populate the tags_input field
         if self.instance and self.instance.pk:
@@ -85,23 +83,7 @@ class PostForm(forms.ModelForm):
         content = self.cleaned_data.get('content', '')
         if content:
             # Sanitize the HTML content
-            sanitized_content = bleach.clean(
-                content,
-                tags=settings.BLEACH_ALLOWED_TAGS,
-                attributes=settings.BLEACH_ALLOWED_ATTRIBUTES,
-                css_sanitizer=bleach.css_sanitizer.CSSSanitizer(allowed_css_properties=settings.BLEACH_ALLOWED_STYLES),
-                protocols=settings.BLEACH_ALLOWED_PROTOCOLS,
-                strip_comments=True
-            )
-            
-            # Remove empty font tags and other problematic tags
-            # Remove empty font tags
-            sanitized_content = re.sub(r'<font[^>]*>\s*</font>', '', sanitized_content)
-            # Remove font tags that only contain whitespace or other empty font tags
-            sanitized_content = re.sub(r'<font[^>]*>\s*(<font[^>]*>\s*</font>\s*)*</font>', '', sanitized_content)
-            # Clean up empty tags but preserve empty paragraphs (needed for table spacing)
-            # Remove empty spans, divs, strongs, ems, but keep empty <p> tags
-            sanitized_content = re.sub(r'<(span|div|strong|em|b|i|u)[^>]*>\s*</\1>', '', sanitized_content)
+            sanitized_content = sanitize_content(content)
             
             # Check per-post image limit if user is provided
             if self.user:
@@ -121,6 +103,24 @@ class PostForm(forms.ModelForm):
                         f'Maximum {max_images_per_post} images allowed per post. '
                         f'Please reduce the number of images to {max_images_per_post} or fewer.'
                     )
+
+                # Uploads that background processing could not re-encode have been deleted
+                referenced = {
+                    urlparse(src).path.split('/')[-1]
+                    for src in re.findall(r'<img[^>]+src=[\'"]([^\'"]+)[\'"]', sanitized_content, re.IGNORECASE)
+                }
+                failed = [
+                    image.original_filename
+                    for image in PostImage.objects.filter(
+                        uploaded_by=self.user, processing_status=PostImage.PROCESSING_FAILED
+                    ).only('image', 'original_filename')
+                    if image.image.name.split('/')[-1] in referenced
+                ]
+                if failed:
+                    self.add_error(None,
+                        f'These images could not be processed and were removed: {", ".join(failed)}. '
+                        f'Please delete them from your post and upload them again.'
+                    )
             
             return sanitized_content
         return content
@@ -132,6 +132,13 @@ class PostForm(forms.ModelForm):
         # Sanitize content before saving
         if 'content' in self.cleaned_data:
             instance.content = self.cleaned_data['content']
+
+        # Point the content at processed versions of background-processed uploads
+        if getattr(self, 'user', None):
+            from .models import PostImage
+            instance.content = PostImage.swap_processed_urls(
+                instance.content, PostImage.processed_images(uploaded_by=self.user)
+            )
         
         if commit:
             # Save the post
@@ -152,6 +159,13 @@ class PostForm(forms.ModelForm):
 
             # Remove PostImage records (and files) no longer referenced in content
             PostImage.sync_post_images_with_content(post=instance, content=instance.content)
+
+            # Published posts must not show originals that still carry their metadata
+            if instance.status == 'published':
+                PostImage.process_pending_images(instance)
+
+            # Swap in images processed since, and delete their originals
+            PostImage.apply_processed_images(instance)
             
         return instance
 
@@ -0,0 +1,112 @@
+"""
+Processing of images uploaded from the editor.
+
+reencode_image() downsizes an upload and re-encodes it without metadata (EXIF, GPS,
+color profiles). It is CPU work on bytes only, so it can run in another process.
+
+With IMAGE_PROCESSING_MODE = 'sync' it runs inside ImageUploadView. With
+'background', the view only validates the upload (inspect_upload() reads the header)
+and stores the original as it was sent. The process_images command then re-encodes
+pending uploads in a process pool and stores the result under a new name.
+PostImage.apply_processed_images() swaps the URLs in the post content and deletes
+the original. That happens when the post is saved, or as soon as the image is
+ready if it already belongs to a post. Publishing a post re-encodes its images
+that are still pending in the request (PostImage.process_pending_images()), so
+readers never get an original. That path uses fast=True, which skips the slow
+compression passes (JPEG/PNG optimize, WebP method 6) and keeps publishing quick.
+An upload that cannot be re-encoded is deleted, and PostForm asks the editor to
+upload it again.
+"""
+import uuid
+from dataclasses import dataclass
+from io import BytesIO
+
+from django.conf import settings
+from PIL import Image
+
+ALLOWED_FORMATS = {"JPEG", "PNG", "WEBP"}
+EXTENSIONS = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp"}
+CONTENT_TYPES = {"JPEG": "image/jpeg", "PNG": "image/png", "WEBP": "image/webp"}
+UPLOAD_DIRECTORY = 'post_images/content'
+
+
+@dataclass(frozen=True)
+class ImageLimits:
+    """Upload limits, passed explicitly so worker processes need no settings"""
+    max_width: int
+    max_height: int
+    max_pixels: int
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            max_width=getattr(settings, 'IMAGE_MAX_WIDTH', 2048),
+            max_height=getattr(settings, 'IMAGE_MAX_HEIGHT', 2048),
+            max_pixels=getattr(settings, 'IMAGE_MAX_PIXELS', 12000000),
+        )
+
+
+def use_background_processing():
+    return getattr(settings, 'IMAGE_PROCESSING_MODE', 'sync') == 'background'
+
+
+def content_image_path(image_format):
+    """A new, unique storage name for a content image in `image_format`"""
+    return f"{UPLOAD_DIRECTORY}/{uuid.uuid4().hex}.{EXTENSIONS.get(image_format, 'png')}"
+
+
+def inspect_upload(uploaded_file, limits):
+    """
+    Validate an upload without decoding it: returns (format, width, height).
+    Raises UnidentifiedImageError for files that are not images, and ValueError
+    for images over the pixel limit or failing Pillow's integrity check.
+    """
+    Image.MAX_IMAGE_PIXELS = limits.max_pixels
+    uploaded_file.seek(0)
+    with Image.open(uploaded_file) as img:
+        image_format = (img.format or '').upper()
+        width, height = img.size
+        if width * height > limits.max_pixels:
+            raise ValueError(f'Image has {width * height} pixels; the limit is {limits.max_pixels}.')
+        img.verify()
+    uploaded_file.seek(0)
+    return image_format, width, height
+
+
+def reencode_image(source, limits, fast=False):
+    """
+    Decode `source` (bytes or a file), downscale it to the size limits and re-encode
+    it without metadata. Formats other than JPEG, PNG and WebP become PNG. With
+    `fast`, trade file size for encoding time, for use inside a request.
+    Returns (data, format, width, height).
+    """
+    Image.MAX_IMAGE_PIXELS = limits.max_pixels
+    if isinstance(source, bytes):
+        source = BytesIO(source)
+    with Image.open(source) as img:
+        original_format = (img.format or '').upper()
+        target_format = original_format if original_format in ALLOWED_FORMATS | {"JPG"} else "PNG"
+
+        # Convert mode for JPEG (no alpha)
+        if target_format in {"JPEG", "JPG"} and img.mode in ("RGBA", "P"):
+            img = img.convert("RGB")
+
+        # Enforce dimension limits by downscaling if necessary
+        width, height = img.size
+        if width > limits.max_width or height > limits.max_height:
+            img.thumbnail((limits.max_width, limits.max_height))
+
+        # Re-encode without EXIF/metadata
+        buffer = BytesIO()
+        save_kwargs = {}
+        if target_format in {"JPEG", "JPG"}:
+            target_format = "JPEG"
+            save_kwargs.update({"quality": 85, "optimize": not fast})
+        elif target_format == "PNG":
+            save_kwargs.update({"compress_level": 1} if fast else {"optimize": True})
+        elif target_format == "WEBP":
+            save_kwargs.update({"quality": 85, "method": 0 if fast else 6})
+
+        img.save(buffer, format=target_format, **save_kwargs)
+        width, height = img.size
+    return buffer.getvalue(), target_format, width, height
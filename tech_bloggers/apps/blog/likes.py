@@ -0,0 +1,190 @@
+"""
+Post likes.
+
+toggle_like() inserts or deletes the (post, user) row directly, relying on the
+table's unique constraint instead of a check-then-write, and keeps
+Post.like_count in step with a single UPDATE.
+
+With LIKE_WRITE_BEHIND enabled, counter changes are accumulated as deltas in the
+cache instead, so hot posts don't serialize on their Post row. Posts with a
+buffered delta are also recorded in a dirty set, and the flush_like_counts
+management command applies the deltas of those posts only.
+"""
+import logging
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.memcached import BaseMemcachedCache
+from django.core.cache.backends.redis import RedisCache
+from django.db import IntegrityError, transaction
+
+from .models import Post
+from .signals import like_toggled
+
+logger = logging.getLogger(__name__)
+
+LIKE_DELTA_KEY = 'blog:like_delta:{}'
+# Set while a post is in the dirty set, so each post is added to it once per flush
+LIKE_DIRTY_KEY = 'blog:like_dirty:{}'
+DIRTY_POSTS_KEY = 'blog:like_dirty_posts'
+DIRTY_POSTS_LOCK_KEY = 'blog:like_dirty_posts:lock'
+DIRTY_POSTS_LOCK_TIMEOUT = 5
+# Shared backends whose incr() is atomic. The database and file caches do a get and
+# a set, and LocMem lives in one worker, where flush_like_counts never sees it
+ATOMIC_INCR_BACKENDS = (BaseMemcachedCache, RedisCache)
+_warned_backends = set()
+
+
+def has_liked(post, user):
+    """
+    Return True if `user` likes `post`.
+
+    Uses an existence check on the likes table's (post, user) unique index
+    instead of loading every user who liked the post.
+    """
+    if not user.is_authenticated:
+        return False
+    return Post.likes.through.objects.filter(post_id=post.pk, user_id=user.pk).exists()
+
+
+def liked_post_ids(posts, user):
+    """Return the IDs of `posts` that `user` likes, in one query"""
+    post_ids = [post.pk for post in posts]
+    if not user.is_authenticated or not post_ids:
+        return set()
+    return set(
+        Post.likes.through.objects.filter(user_id=user.pk, post_id__in=post_ids).values_list('post_id', flat=True)
+    )
+
+
+def mark_liked_posts(posts, user):
+    """Set `user_has_liked` on each of `posts` (e.g. a page of list cards) with one query"""
+    liked = liked_post_ids(posts, user)
+    for post in posts:
+        post.user_has_liked = post.pk in liked
+    return posts
+
+
+def write_behind_enabled():
+    """
+    Return LIKE_WRITE_BEHIND, unless the cache backend is not shared between
+    processes or cannot increment atomically: buffered likes would then be lost, so
+    counters are written directly.
+    """
+    if not getattr(settings, 'LIKE_WRITE_BEHIND', False):
+        return False
+    backend = type(caches[DEFAULT_CACHE_ALIAS])
+    if not issubclass(backend, ATOMIC_INCR_BACKENDS):
+        if backend not in _warned_backends:
+            _warned_backends.add(backend)
+            logger.warning(
+                'LIKE_WRITE_BEHIND is ignored: %s is not a shared cache with atomic incr()', backend.__name__
+            )
+        return False
+    return True
+
+
+def get_pending_like_delta(post_id):
+    """Return the like count change buffered in the cache for a post"""
+    return cache.get(LIKE_DELTA_KEY.format(post_id), 0)
+
+
+def buffer_like_delta(post_id, delta):
+    key = LIKE_DELTA_KEY.format(post_id)
+    # add() is a no-op if the key exists, so concurrent first writes don't clobber each other
+    cache.add(key, 0, timeout=None)
+    pending = cache.incr(key, delta)
+    mark_like_delta_dirty(post_id)
+    return pending
+
+
+@contextmanager
+def _dirty_posts_lock():
+    # add() only succeeds for one caller; the timeout frees the lock if its holder dies
+    while not cache.add(DIRTY_POSTS_LOCK_KEY, 1, timeout=DIRTY_POSTS_LOCK_TIMEOUT):
+        time.sleep(0.01)
+    try:
+        yield
+    finally:
+        cache.delete(DIRTY_POSTS_LOCK_KEY)
+
+
+def mark_like_delta_dirty(post_id):
+    """Add `post_id` to the dirty set, unless it is already there"""
+    if not cache.add(LIKE_DIRTY_KEY.format(post_id), 1, timeout=None):
+        return
+    with _dirty_posts_lock():
+        post_ids = cache.get(DIRTY_POSTS_KEY, set())
+        post_ids.add(post_id)
+        cache.set(DIRTY_POSTS_KEY, post_ids, timeout=None)
+
+
+def take_dirty_post_ids():
+    """
+    Empty the dirty set and return the IDs it held, sorted.
+
+    The per-post markers are dropped before the deltas are read, so a like buffered
+    during the flush marks its post again and is applied by the next one.
+    """
+    with _dirty_posts_lock():
+        post_ids = cache.get(DIRTY_POSTS_KEY, set())
+        cache.delete(DIRTY_POSTS_KEY)
+    cache.delete_many([LIKE_DIRTY_KEY.format(post_id) for post_id in post_ids])
+    return sorted(post_ids)
+
+
+def flush_like_deltas(post_ids):
+    """
+    Apply buffered like deltas for `post_ids` to Post.like_count.
+
+    Each applied delta is subtracted from (not deleted from) the cache, so likes
+    buffered while the flush runs are kept for the next one. Returns the number
+    of posts updated.
+    """
+    keys = {LIKE_DELTA_KEY.format(post_id): post_id for post_id in post_ids}
+    flushed = 0
+    for key, delta in cache.get_many(keys).items():
+        if not delta:
+            continue
+        Post.adjust_counter([keys[key]], 'like_count', delta)
+        cache.decr(key, delta)
+        flushed += 1
+    return flushed
+
+
+def toggle_like(post, user):
+    """
+    Like or unlike `post` for `user`.
+
+    Deletes the user's like if there is one, otherwise inserts it. A concurrent
+    duplicate insert (e.g. a double click) hits the unique constraint and counts
+    as liked without changing the counter, so counts stay exact.
+
+    Returns a (liked, like_count) tuple.
+    """
+    Like = Post.likes.through
+
+    with transaction.atomic():
+        deleted, _ = Like.objects.filter(post_id=post.pk, user_id=user.pk).delete()
+        if deleted:
+            liked, delta = False, -1
+        else:
+            try:
+                with transaction.atomic():
+                    Like.objects.create(post_id=post.pk, user_id=user.pk)
+                liked, delta = True, 1
+            except IntegrityError:
+                liked, delta = True, 0
+
+        if write_behind_enabled():
+            pending = buffer_like_delta(post.pk, delta) if delta else get_pending_like_delta(post.pk)
+            like_count = Post.objects.filter(pk=post.pk).values_list('like_count', flat=True).get()
+            like_count = max(like_count + pending, 0)
+        else:
+            Post.adjust_counter([post.pk], 'like_count', delta)
+            like_count = Post.objects.filter(pk=post.pk).values_list('like_count', flat=True).get()
+
+    like_toggled.send(sender=Post, post=post, user=user, liked=liked)
+    return liked, like_count
@@ -0,0 +1,94 @@
+import mimetypes
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image, UnidentifiedImageError
+from apps.blog.models import ImageUsage, PostImage
+
+
+def read_image_metadata(storage, name, dimensions=False):
+    """
+    Size (one HEAD request on S3), content type (from the extension) and, when
+    `dimensions` is set, width and height (downloads the file) of a stored image.
+    Returns None when the file is missing.
+    """
+    try:
+        metadata = {
+            'file_size': storage.size(name),
+            'content_type': mimetypes.guess_type(name)[0] or '',
+        }
+        if dimensions:
+            with storage.open(name) as image_file, Image.open(image_file) as img:
+                metadata['width'], metadata['height'] = img.size
+    except (OSError, UnidentifiedImageError):
+        return None
+    return metadata
+
+
+class Command(BaseCommand):
+    help = (
+        'Fill in the size and content type (and optionally dimensions) of content images '
+        'uploaded before they were stored, then recompute the per-user usage ledger'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=8,
+            help='Parallel storage requests (default: 8)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Images per batch written back to the database (default: 200)'
+        )
+        parser.add_argument(
+            '--dimensions',
+            action='store_true',
+            help='Also read width and height, which downloads every image instead of a HEAD request'
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Re-read images whose size is already stored too'
+        )
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--workers and --batch-size must be at least 1.')
+
+        images = PostImage.objects.all()
+        if not options['all']:
+            images = images.filter(file_size__isnull=True)
+        pending = list(images.order_by('pk').values_list('pk', 'image', 'uploaded_by'))
+        if not pending:
+            self.stdout.write(self.style.SUCCESS('Successfully checked images: nothing to backfill.'))
+            return
+
+        storage = PostImage._meta.get_field('image').storage
+        fields = ['file_size', 'content_type'] + (['width', 'height'] if options['dimensions'] else [])
+        updated = missing = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            for start in range(0, len(pending), options['batch_size']):
+                batch = pending[start:start + options['batch_size']]
+                results = pool.map(
+                    lambda row: read_image_metadata(storage, row[1], options['dimensions']), batch
+                )
+                changed = []
+                for (pk, _name, _user_id), metadata in zip(batch, results):
+                    if metadata is None:
+                        missing += 1
+                        continue
+                    changed.append(PostImage(pk=pk, **metadata))
+                PostImage.objects.bulk_update(changed, fields)
+                updated += len(changed)
+                if options['verbosity'] > 1:
+                    self.stdout.write(f'{start + len(batch)}/{len(pending)} images checked')
+
+        ImageUsage.refresh({user_id for _pk, _name, user_id in pending})
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully backfilled {updated} images ({missing} files missing).')
+        )
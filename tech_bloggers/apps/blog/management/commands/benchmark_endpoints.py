@@ -0,0 +1,116 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from apps.blog.benchmark import (
+    DEFAULT_TOLERANCES, BenchmarkOptions, BenchmarkRunner, check_budgets, compare_to_baseline
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the key endpoints in-process (latency percentiles, queries and allocation '
+        'peak per endpoint as JSON), check the p99 latency budgets and optionally compare '
+        'against a stored baseline'
+    )
+
+    def add_arguments(self, parser):
+        defaults = BenchmarkOptions()
+        parser.add_argument(
+            '--iterations', type=int, default=defaults.iterations,
+            help=f'Timed requests per endpoint (default: {defaults.iterations})'
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=defaults.warmup,
+            help=f'Untimed requests per endpoint before measuring (default: {defaults.warmup})'
+        )
+        parser.add_argument(
+            '--memory-iterations', type=int, default=defaults.memory_iterations,
+            help=f'Requests per endpoint traced with tracemalloc (default: {defaults.memory_iterations})'
+        )
+        parser.add_argument(
+            '--cold', action='store_true',
+            help="Invalidate the blog's cached content and pages before every request"
+        )
+        parser.add_argument(
+            '--allow-writes', action='store_true',
+            help='Run even with DEBUG off; the like and upload endpoints write to the database'
+        )
+        parser.add_argument(
+            '--only', action='append', default=[], metavar='NAME',
+            help='Benchmark only this endpoint (repeatable)'
+        )
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+        parser.add_argument('--baseline', help='Compare against this JSON report and fail on regressions')
+        parser.add_argument('--save-baseline', metavar='PATH', help='Also store the report as a baseline at PATH')
+        parser.add_argument(
+            '--latency-tolerance', type=float, default=DEFAULT_TOLERANCES['latency'],
+            help='Allowed relative growth of p95 latency (default: %(default)s)'
+        )
+        parser.add_argument(
+            '--latency-floor', type=float, default=DEFAULT_TOLERANCES['latency_floor_ms'],
+            help='Growth of p95 latency in milliseconds that is always allowed (default: %(default)s)'
+        )
+        parser.add_argument(
+            '--query-tolerance', type=int, default=DEFAULT_TOLERANCES['queries'],
+            help='Allowed extra queries per request (default: %(default)s)'
+        )
+        parser.add_argument(
+            '--memory-tolerance', type=float, default=DEFAULT_TOLERANCES['memory'],
+            help='Allowed relative growth of the allocation peak (default: %(default)s)'
+        )
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations must be at least 1.')
+        if not settings.DEBUG and not options['allow_writes']:
+            raise CommandError(
+                'The benchmark likes posts and uploads images as a "benchmark" user. Run it against a '
+                'development database with DEBUG on, or pass --allow-writes.'
+            )
+
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline']) as baseline_file:
+                    baseline = json.load(baseline_file)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"Could not read baseline {options['baseline']}: {exc}")
+
+        benchmark_options = BenchmarkOptions(
+            iterations=options['iterations'],
+            warmup=options['warmup'],
+            memory_iterations=options['memory_iterations'],
+            cold=options['cold'],
+            only=options['only'],
+        )
+        try:
+            report = BenchmarkRunner(benchmark_options).run()
+        except (ValueError, RuntimeError) as exc:
+            raise CommandError(str(exc))
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                output_file.write(output + '\n')
+        else:
+            self.stdout.write(output)
+        if options['save_baseline']:
+            with open(options['save_baseline'], 'w') as baseline_file:
+                baseline_file.write(output + '\n')
+
+        regressions = check_budgets(report)
+        if baseline is not None:
+            regressions += compare_to_baseline(report, baseline, {
+                'latency': options['latency_tolerance'],
+                'latency_floor_ms': options['latency_floor'],
+                'queries': options['query_tolerance'],
+                'memory': options['memory_tolerance'],
+            })
+        if regressions:
+            raise CommandError('Performance regressions:\n' + '\n'.join(regressions))
+        if baseline is None:
+            return
+        self.stderr.write(self.style.SUCCESS(
+            f"Successfully compared {len(report['endpoints'])} endpoints against the baseline."
+        ))
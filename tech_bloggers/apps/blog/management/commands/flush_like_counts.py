@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from apps.blog.likes import flush_like_deltas, take_dirty_post_ids, write_behind_enabled
+from apps.blog.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Apply like count changes buffered in the cache (LIKE_WRITE_BEHIND) to posts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of posts to check per cache round trip (default: 500)'
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Check every post instead of only those in the dirty set'
+        )
+
+    def handle(self, *args, **options):
+        if not write_behind_enabled():
+            reason = 'ignored for this cache backend' if settings.LIKE_WRITE_BEHIND else 'disabled'
+            self.stdout.write(
+                self.style.WARNING(f'LIKE_WRITE_BEHIND is {reason}; flushing any leftover deltas anyway.')
+            )
+
+        batch_size = options['batch_size']
+        if options['all']:
+            post_ids = list(Post.objects.order_by('pk').values_list('pk', flat=True))
+        else:
+            post_ids = take_dirty_post_ids()
+        flushed = 0
+        for start in range(0, len(post_ids), batch_size):
+            flushed += flush_like_deltas(post_ids[start:start + batch_size])
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully flushed like counts for {flushed} posts.')
+        )
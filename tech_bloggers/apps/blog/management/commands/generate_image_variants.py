@@ -0,0 +1,62 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from apps.blog.models import ImageVariant, Post, PostImage
+from apps.blog.variants import generate_variants_in_pool
+
+
+class Command(BaseCommand):
+    help = (
+        'Build the responsive variants (IMAGE_VARIANT_WIDTHS, WebP and JPEG) of featured '
+        'and content images that have none, in a pool of worker processes'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 2,
+            help='Worker processes (default: number of CPUs)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='Images read from storage per batch (default: 50)'
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Rebuild the variants of every image, e.g. after changing IMAGE_VARIANT_WIDTHS'
+        )
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--workers and --batch-size must be at least 1.')
+
+        if options['all']:
+            featured = Post.objects.exclude(image='').exclude(image__isnull=True).values_list('image', flat=True)
+            content = PostImage.objects.exclude(
+                processing_status__in=[PostImage.PROCESSING_PENDING, PostImage.PROCESSING_RUNNING]
+            ).values_list('image', flat=True)
+            pending = list(dict.fromkeys([*featured, *content]))
+        else:
+            pending = ImageVariant.sources_without_variants()
+        if not pending:
+            self.stdout.write(self.style.SUCCESS('Successfully checked images: nothing to generate.'))
+            return
+
+        generated = failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            for start in range(0, len(pending), options['batch_size']):
+                batch = pending[start:start + options['batch_size']]
+                done, errors = generate_variants_in_pool(pool, batch)
+                generated += done
+                failed += errors
+                if options['verbosity'] > 1:
+                    self.stdout.write(f'{start + len(batch)}/{len(pending)} images done')
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully built variants of {generated} images ({failed} failed).')
+        )
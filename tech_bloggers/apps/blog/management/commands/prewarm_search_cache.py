@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from apps.blog.search import get_popular_queries, get_search_result_ids
+
+
+class Command(BaseCommand):
+    help = 'Prewarm the search result cache for the most frequent search queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=50,
+            help='Number of most frequent queries to prewarm (default: 50)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='List the queries that would be prewarmed without running them'
+        )
+
+    def handle(self, *args, **options):
+        popular = get_popular_queries(options['top'])
+
+        if not popular:
+            self.stdout.write(
+                self.style.SUCCESS('No search queries have been recorded yet.')
+            )
+            return
+
+        if options['dry_run']:
+            self.stdout.write(
+                self.style.WARNING(f'DRY RUN: Would prewarm {len(popular)} queries:')
+            )
+            for query, count in popular:
+                self.stdout.write(f'  - "{query}" ({count} searches)')
+            return
+
+        for query, count in popular:
+            post_ids = get_search_result_ids(query, '')
+            if post_ids is None:
+                self.stdout.write(f'  - "{query}": too many results to cache')
+            else:
+                self.stdout.write(f'  - "{query}": {len(post_ids)} results')
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully prewarmed {len(popular)} search queries.')
+        )
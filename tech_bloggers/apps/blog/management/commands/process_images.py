@@ -0,0 +1,99 @@
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from apps.blog.images import ImageLimits, reencode_image
+from apps.blog.models import PostImage
+from apps.blog.variants import generate_variants_in_pool, pending_variant_sources
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        'Re-encode editor uploads stored in background mode (IMAGE_PROCESSING_MODE=background) '
+        'and build the responsive variants of new images (variants_pending), in a pool of worker processes'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 2,
+            help='Worker processes (default: number of CPUs)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=20,
+            help='Images claimed per round (default: 20)'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=2.0,
+            help='Seconds to wait when there is nothing to process (default: 2)'
+        )
+        parser.add_argument(
+            '--stale-after',
+            type=int,
+            default=300,
+            help='Reclaim images whose processing started this many seconds ago (default: 300)'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process what is pending and exit instead of polling'
+        )
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--workers and --batch-size must be at least 1.')
+
+        limits = ImageLimits.from_settings()
+        processed = failed = variants = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            while True:
+                close_old_connections()
+                images = PostImage.claim_pending(options['batch_size'], options['stale_after'])
+                sources = pending_variant_sources(options['batch_size'])
+                if sources:
+                    variants += generate_variants_in_pool(pool, sources)[0]
+                if not images and not sources:
+                    if options['once']:
+                        break
+                    time.sleep(options['interval'])
+                    continue
+
+                futures = []
+                for image in images:
+                    try:
+                        with image.image.open('rb') as source:
+                            data = source.read()
+                    except OSError:
+                        logger.warning('Image %s is missing from storage', image.image.name)
+                        image.mark_failed()
+                        failed += 1
+                        continue
+                    futures.append((image, pool.submit(reencode_image, data, limits)))
+
+                for image, future in futures:
+                    try:
+                        image.finish_processing(*future.result())
+                        processed += 1
+                    except Exception:
+                        logger.exception('Processing image %s failed', image.image.name)
+                        image.mark_failed()
+                        failed += 1
+                if options['verbosity'] > 1:
+                    self.stdout.write(f'{processed} images processed, {failed} failed, {variants} with variants')
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Successfully processed {processed} images ({failed} failed) '
+                f'and built variants of {variants} images.'
+            )
+        )
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from apps.blog.models import Post
+from apps.blog.related import refresh_related_posts
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored related posts (by shared tags) of every post'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=0,
+            help='Number of posts to recompute per query (default: all posts in one query)'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size <= 0:
+            written = refresh_related_posts()
+        else:
+            post_ids = list(Post.objects.order_by('pk').values_list('pk', flat=True))
+            written = 0
+            for start in range(0, len(post_ids), batch_size):
+                written += refresh_related_posts(post_ids[start:start + batch_size])
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully stored {written} related post entries.')
+        )
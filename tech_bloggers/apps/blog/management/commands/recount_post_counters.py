@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from apps.blog.models import Post, TagStat
+
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized like and comment counters on posts and the tag statistics'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--post',
+            type=int,
+            help='Recount a single post (by id) and its tags instead of everything'
+        )
+
+    def handle(self, *args, **options):
+        queryset = Post.objects.all()
+        tag_ids = None
+        if options['post']:
+            queryset = queryset.filter(pk=options['post'])
+            tag_ids = list(Post.tags.through.objects.filter(post_id=options['post']).values_list('tag_id', flat=True))
+
+        updated = Post.recount_counters(queryset)
+        tags = TagStat.refresh(tag_ids)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Successfully recounted likes and comments for {updated} posts and statistics for {tags} tags.'
+            )
+        )
@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand
+from apps.blog.models import Post
+from apps.blog.utils import get_sanitizer_version
+
+
+class Command(BaseCommand):
+    help = 'Render sanitized HTML and excerpts for posts that are missing them or were rendered with old bleach settings'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Re-render every post, not only stale ones'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Number of posts to update per query (default: 200)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show how many posts would be rendered without changing anything'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        current_version = get_sanitizer_version()
+
+        posts = Post.objects.all()
+        if not options['all']:
+            posts = posts.exclude(sanitizer_version=current_version)
+
+        count = posts.count()
+        if count == 0:
+            self.stdout.write(
+                self.style.SUCCESS(f'All posts are already rendered with sanitizer version {current_version}.')
+            )
+            return
+
+        if options['dry_run']:
+            self.stdout.write(
+                self.style.WARNING(f'DRY RUN: Would render {count} posts with sanitizer version {current_version}.')
+            )
+            return
+
+        rendered = 0
+        batch = []
+        for post in posts.only('id', 'content').order_by('pk').iterator(chunk_size=batch_size):
+            post.render_content()
+            batch.append(post)
+            if len(batch) >= batch_size:
+                rendered += self._flush(batch)
+        rendered += self._flush(batch)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully rendered {rendered} posts with sanitizer version {current_version}.')
+        )
+
+    def _flush(self, batch):
+        """Write a batch of rendered posts without touching updated_at"""
+        if not batch:
+            return 0
+        Post.objects.bulk_update(batch, ['rendered_content', 'sanitizer_version', 'excerpt', 'word_count'])
+        count = len(batch)
+        batch.clear()
+        return count
@@ -0,0 +1,92 @@
+import time
+from datetime import datetime, time as dt_time, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from apps.blog.seed import SeedOptions, seed_corpus
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a deterministic synthetic corpus (users, posts with realistic HTML, tags, '
+        'likes and comment threads) for performance testing'
+    )
+
+    def add_arguments(self, parser):
+        defaults = SeedOptions()
+        parser.add_argument('--users', type=int, default=defaults.users, help=f'Users to create (default: {defaults.users})')
+        parser.add_argument('--posts', type=int, default=defaults.posts, help=f'Posts to create (default: {defaults.posts})')
+        parser.add_argument('--tags', type=int, default=defaults.tags, help=f'Size of the tag vocabulary (default: {defaults.tags})')
+        parser.add_argument(
+            '--avg-likes', type=float, default=defaults.avg_likes,
+            help=f'Mean likes per published post, power-law distributed (default: {defaults.avg_likes})'
+        )
+        parser.add_argument(
+            '--avg-comments', type=float, default=defaults.avg_comments,
+            help=f'Mean comments per published post, power-law distributed (default: {defaults.avg_comments})'
+        )
+        parser.add_argument(
+            '--draft-ratio', type=float, default=defaults.draft_ratio,
+            help=f'Share of posts left as drafts (default: {defaults.draft_ratio})'
+        )
+        parser.add_argument(
+            '--days', type=int, default=defaults.days,
+            help=f'Spread publication dates over this many days (default: {defaults.days})'
+        )
+        parser.add_argument(
+            '--until', default=defaults.until.date().isoformat(),
+            help='Latest generated date, YYYY-MM-DD (default: %(default)s); fixed so runs are reproducible'
+        )
+        parser.add_argument(
+            '--body-variants', type=int, default=defaults.body_variants,
+            help=f'Distinct post bodies to render and reuse (default: {defaults.body_variants})'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=defaults.batch_size,
+            help=f'Rows per bulk_create batch (default: {defaults.batch_size})'
+        )
+        parser.add_argument('--seed', type=int, default=defaults.seed, help=f'Random seed (default: {defaults.seed})')
+        parser.add_argument(
+            '--prefix', default=defaults.prefix,
+            help=f'Username prefix for generated users (default: {defaults.prefix})'
+        )
+        parser.add_argument(
+            '--password', default=defaults.password,
+            help='Password of every generated user (default: %(default)s)'
+        )
+        parser.add_argument(
+            '--skip-derived', action='store_true',
+            help='Do not refresh tag statistics, related posts and search vectors afterwards'
+        )
+
+    def handle(self, *args, **options):
+        until = parse_date(options['until'])
+        if until is None:
+            raise CommandError('--until must be a date in YYYY-MM-DD format.')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+
+        seed_options = SeedOptions(
+            users=options['users'],
+            posts=options['posts'],
+            tags=options['tags'],
+            avg_likes=options['avg_likes'],
+            avg_comments=options['avg_comments'],
+            draft_ratio=options['draft_ratio'],
+            days=options['days'],
+            until=datetime.combine(until, dt_time.min, tzinfo=dt_timezone.utc),
+            body_variants=options['body_variants'],
+            batch_size=options['batch_size'],
+            seed=options['seed'],
+            prefix=options['prefix'],
+            password=options['password'],
+            derived=not options['skip_derived'],
+        )
+        log = (lambda message: self.stdout.write(message)) if options['verbosity'] > 1 else None
+
+        started = time.monotonic()
+        counts = seed_corpus(seed_options, log=log)
+        elapsed = time.monotonic() - started
+
+        summary = ', '.join(f'{count} {name}' for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f'Successfully seeded {summary} in {elapsed:.1f}s.'))
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:42
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    # GIN indexes and tsvector are PostgreSQL-only; SQLite keeps the icontains fallback
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Post = apps.get_model('blog', 'Post')
+    schema_editor.add_index(
+        Post, django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='blog_post_search_idx')
+    )
+    # Index existing rows with the same text search configuration queries use
+    config = getattr(settings, 'SEARCH_CONFIG', 'english')
+    schema_editor.execute("""
+        UPDATE blog_post SET search_vector =
+            setweight(to_tsvector(%(config)s::regconfig, coalesce(title, '')), 'A') ||
+            setweight(to_tsvector(%(config)s::regconfig, coalesce(summary, '')), 'B') ||
+            setweight(to_tsvector(%(config)s::regconfig, coalesce((
+                SELECT string_agg(t.name, ' ')
+                FROM blog_tag t JOIN blog_post_tags pt ON pt.tag_id = t.id
+                WHERE pt.post_id = blog_post.id
+            ), '')), 'C') ||
+            setweight(to_tsvector(%(config)s::regconfig, coalesce(content, '')), 'D')
+    """, {'config': config})
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Post = apps.get_model('blog', 'Post')
+    schema_editor.remove_index(
+        Post, django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='blog_post_search_idx')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0008_post_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='post',
+                    index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='blog_post_search_idx'),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(create_search_index, drop_search_index),
+            ],
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:44
+
+import django.contrib.postgres.indexes
+from django.conf import settings
+from django.db import migrations
+
+
+def title_trigram_index():
+    return django.contrib.postgres.indexes.GinIndex(
+        fields=['title'], name='blog_post_title_trgm_idx', opclasses=['gin_trgm_ops']
+    )
+
+
+def create_title_trigram_index(apps, schema_editor):
+    # pg_trgm is PostgreSQL-only; other databases fall back to icontains suggestions
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.add_index(apps.get_model('blog', 'Post'), title_trigram_index())
+
+
+def drop_title_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.remove_index(apps.get_model('blog', 'Post'), title_trigram_index())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0009_post_search_vector'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='post',
+                    index=django.contrib.postgres.indexes.GinIndex(fields=['title'], name='blog_post_title_trgm_idx', opclasses=['gin_trgm_ops']),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(create_title_trigram_index, drop_title_trigram_index),
+            ],
+        ),
+    ]
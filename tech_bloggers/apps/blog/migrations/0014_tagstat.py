@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Q
+
+
+def populate_tag_stats(apps, schema_editor):
+    Tag = apps.get_model('blog', 'Tag')
+    TagStat = apps.get_model('blog', 'TagStat')
+    published = Q(post__status='published')
+    TagStat.objects.bulk_create([
+        TagStat(tag_id=pk, published_post_count=count, last_used_at=last_used)
+        for pk, count, last_used in Tag.objects.annotate(
+            count=Count('post', filter=published),
+            last_used=Max('post__published_at', filter=published),
+        ).values_list('pk', 'count', 'last_used')
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0013_relatedpost'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TagStat',
+            fields=[
+                ('tag', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='blog.tag')),
+                ('published_post_count', models.PositiveIntegerField(default=0)),
+                ('last_used_at', models.DateTimeField(blank=True, help_text="Publication date of the tag's newest published post", null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-published_post_count', '-last_used_at'], name='blog_tagstat_popular_idx')],
+            },
+        ),
+        migrations.RunPython(populate_tag_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:08
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_image_usage(apps, schema_editor):
+    # Sizes of existing images are unknown until backfill_image_metadata runs,
+    # which refreshes the byte totals
+    PostImage = apps.get_model('blog', 'PostImage')
+    ImageUsage = apps.get_model('blog', 'ImageUsage')
+    ImageUsage.objects.bulk_create([
+        ImageUsage(user_id=user_id, image_count=count)
+        for user_id, count in PostImage.objects.values('uploaded_by').annotate(
+            count=Count('pk')
+        ).values_list('uploaded_by', 'count').order_by()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('blog', '0014_tagstat'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageUsage',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='image_usage', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('image_count', models.PositiveIntegerField(default=0)),
+                ('total_bytes', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='postimage',
+            name='content_type',
+            field=models.CharField(blank=True, editable=False, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='postimage',
+            name='file_size',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, help_text='Size in bytes', null=True),
+        ),
+        migrations.AddField(
+            model_name='postimage',
+            name='height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='postimage',
+            name='width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(populate_image_usage, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0017_image_variants'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='variants_pending',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='postimage',
+            name='variants_pending',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('variants_pending', True)), fields=['id'], name='blog_post_variants_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='postimage',
+            index=models.Index(condition=models.Q(('variants_pending', True)), fields=['id'], name='blog_postimage_variants_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:15
+
+from django.db import migrations
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def recount_comments(apps, schema_editor):
+    # 0008 counted inactive comments too; comment_count only counts active top-level ones
+    Post = apps.get_model('blog', 'Post')
+    Comment = apps.get_model('blog', 'Comment')
+    comments = Comment.objects.filter(
+        post_id=OuterRef('pk'), parent__isnull=True, active=True
+    ).order_by().values('post_id')
+    Post.objects.update(
+        comment_count=Coalesce(Subquery(comments.annotate(total=Count('pk')).values('total')), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0018_variants_pending'),
+    ]
+
+    operations = [
+        migrations.RunPython(recount_comments, migrations.RunPython.noop),
+    ]
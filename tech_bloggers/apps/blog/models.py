@@ -1,16 +1,34 @@
+import html
+import logging
 import re
 from urllib.parse import urlparse
 
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db.models import Count, F, Max, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce, Greatest
 from django.contrib.auth.models import User
+from django.utils import timezone
+from django.utils.html import strip_tags
 from django.utils.text import slugify
 from django.core.exceptions import ValidationError
-from django.db.models.signals import post_delete, pre_save
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
+from django.utils.safestring import mark_safe
 from PIL import Image, UnidentifiedImageError
 from django.conf import settings
 
+from apps.core.refdata import reference_data
 from apps.core.utils import delete_stored_file
+from .cache import bump_content_generation, bump_engagement_generation, purge_post_pages
+from .related import refresh_affected_related_posts, refresh_related_post_pages
+from .search import tag_prefix_index, update_search_vectors
+from .signals import like_toggled
+from .variants import delete_variants, schedule_variants
+from .utils import get_sanitizer_version, sanitize_content
+
+logger = logging.getLogger(__name__)
 
 def validate_image(image):
     # Size in bytes
@@ -54,24 +72,81 @@ def validate_image(image):
             pass
     
 
+# Block-level tags that separate words when the post body is flattened to plain text
+BLOCK_TAG_RE = re.compile(r'</?(?:p|br|hr|div|li|ul|ol|blockquote|pre|h[1-6]|table|tr|td|th)\b[^>]*>', re.IGNORECASE)
+
+
 class Tag(models.Model):
     name = models.CharField(max_length=50, unique=True)
     slug = models.SlugField(unique=True)
 
     def __str__(self):
         return self.name
+
+
+class TagStat(models.Model):
+    """
+    Materialized per-tag statistics over published posts, kept current by the
+    receivers below; read through apps.blog.tagstats.
+    """
+    tag = models.OneToOneField(Tag, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    published_post_count = models.PositiveIntegerField(default=0)
+    last_used_at = models.DateTimeField(
+        null=True, blank=True, help_text="Publication date of the tag's newest published post"
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-published_post_count', '-last_used_at'], name='blog_tagstat_popular_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.tag}: {self.published_post_count} published posts"
+
+    @classmethod
+    def refresh(cls, tag_ids=None):
+        """Recompute the statistics of `tag_ids` (every tag when None) in one aggregate and one upsert"""
+        tags = Tag.objects.all() if tag_ids is None else Tag.objects.filter(pk__in=tag_ids)
+        published = Q(post__status='published')
+        rows = tags.annotate(
+            count=Count('post', filter=published),
+            last_used=Max('post__published_at', filter=published),
+        ).values_list('pk', 'count', 'last_used')
+        refreshed = cls.objects.bulk_create(
+            [cls(tag_id=pk, published_post_count=count, last_used_at=last_used) for pk, count, last_used in rows],
+            update_conflicts=True,
+            unique_fields=['tag'],
+            update_fields=['published_post_count', 'last_used_at'],
+        )
+        reference_data.invalidate('blog.tags')
+        return len(refreshed)
     
 
 class Post(models.Model):
     STATUS_CHOICES = [("draft", "Draft"), ("published", "Published")]
+    # Heavy columns that card/list views never display
+    LIST_DEFERRED_FIELDS = ('content', 'rendered_content')
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True, blank=True)
     content = models.TextField(max_length=50000)  # Reasonable limit for blog content
     summary = models.TextField(blank=True, max_length=1000)  # Reasonable limit for summary
+    # Sanitized HTML rendered from `content` at save time, stamped with the bleach config used
+    rendered_content = models.TextField(blank=True, editable=False)
+    sanitizer_version = models.CharField(max_length=12, blank=True, editable=False)
+    # Plain-text preview and word count derived from the render, so list pages can defer `content`
+    excerpt = models.CharField(max_length=300, blank=True, editable=False)
+    word_count = models.PositiveIntegerField(default=0, editable=False)
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name="blog_posts")
     tags = models.ManyToManyField(Tag, blank=True)
     image = models.ImageField(upload_to="post_images/", blank=True, null=True, validators=[validate_image])
     likes = models.ManyToManyField(User, related_name='liked_posts', blank=True)
+    # Denormalized counters kept in step by the like/comment signal handlers below
+    like_count = models.PositiveIntegerField(default=0, editable=False)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)  # Active top-level comments only
+    # Weighted full-text vector (PostgreSQL only, see apps.blog.search)
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Set when the featured image changes, until process_images has built its variants
+    variants_pending = models.BooleanField(default=False, editable=False)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="draft")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -79,7 +154,18 @@ class Post(models.Model):
 
     class Meta:
         ordering = ['-published_at']
-        indexes = [models.Index(fields=['published_at'])]
+        indexes = [
+            models.Index(fields=['published_at']),
+            # Keyset pagination: (published_at, id) for listings, (author, created_at, id) for manage
+            models.Index(fields=['-published_at', '-id'], name='blog_post_keyset_idx'),
+            models.Index(fields=['author', '-created_at', '-id'], name='blog_post_author_keyset_idx'),
+            models.Index(fields=['-like_count', '-published_at'], name='blog_post_like_rank_idx'),
+            models.Index(fields=['-comment_count'], name='blog_post_comment_rank_idx'),
+            GinIndex(fields=['search_vector'], name='blog_post_search_idx'),
+            GinIndex(fields=['title'], opclasses=['gin_trgm_ops'], name='blog_post_title_trgm_idx'),
+            # Only the few rows waiting for variants are indexed
+            models.Index(fields=['id'], condition=Q(variants_pending=True), name='blog_post_variants_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.slug:
@@ -88,15 +174,69 @@ class Post(models.Model):
             if len(slug) > 50:
                 slug = slug[:50]
             self.slug = slug
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'content' in update_fields:
+            self.render_content()
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {
+                    'rendered_content', 'sanitizer_version', 'excerpt', 'word_count'
+                }
         super().save(*args, **kwargs)
 
     def __str__(self):
         return self.title
+
+    def render_content(self):
+        """
+        Sanitize `content` into `rendered_content` using the current bleach settings,
+        and derive the plain-text excerpt and word count from the result.
+        """
+        self.rendered_content = sanitize_content(self.content)
+        self.sanitizer_version = get_sanitizer_version()
+
+        # Keep words in adjacent blocks apart, then strip tags and decode HTML entities
+        # (e.g., &rsquo; -> ', &amp; -> &)
+        text = BLOCK_TAG_RE.sub(' ', self.rendered_content)
+        words = html.unescape(strip_tags(text)).split()
+        self.word_count = len(words)
+        excerpt_length = self._meta.get_field('excerpt').max_length
+        self.excerpt = ' '.join(words)[:excerpt_length]
+
+    @property
+    def rendered_html(self):
+        """
+        Return the sanitized post body for display.
+        Falls back to sanitizing on the fly if the stored render is missing or stale.
+        """
+        if self.sanitizer_version != get_sanitizer_version():
+            return mark_safe(sanitize_content(self.content))
+        return mark_safe(self.rendered_content)
     
     @property
     def top_level_comment_count(self):
-        """Return the count of top-level comments (excluding replies)"""
-        return self.comments.filter(parent__isnull=True).count()
+        """Return the count of active top-level comments (excluding replies)"""
+        return self.comment_count
+
+    @classmethod
+    def recount_counters(cls, queryset=None):
+        """Recompute like_count and comment_count from source rows in a single UPDATE"""
+        likes = cls.likes.through.objects.filter(post_id=OuterRef('pk')).order_by().values('post_id')
+        comments = Comment.objects.filter(
+            post_id=OuterRef('pk'), parent__isnull=True, active=True
+        ).order_by().values('post_id')
+        queryset = cls.objects.all() if queryset is None else queryset
+        return queryset.update(
+            like_count=Coalesce(Subquery(likes.annotate(total=Count('pk')).values('total')), 0),
+            comment_count=Coalesce(Subquery(comments.annotate(total=Count('pk')).values('total')), 0),
+        )
+
+    @classmethod
+    def adjust_counter(cls, post_ids, field, delta):
+        """Atomically add `delta` to a counter column, never going below zero"""
+        if not post_ids or not delta:
+            return 0
+        return cls.objects.filter(pk__in=post_ids).update(**{field: Greatest(F(field) + delta, 0)})
     
 
 class Comment(models.Model):
@@ -109,28 +249,81 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['created_at']
-        indexes = [models.Index(fields=['created_at'])]
+        indexes = [
+            models.Index(fields=['created_at']),
+            models.Index(fields=['post', 'parent', 'created_at'], name='blog_comment_tree_idx'),
+        ]
 
     def __str__(self):
         return f"Comment by {self.author} on {self.post}."
 
 
+class RelatedPost(models.Model):
+    """
+    Precomputed "related posts" for a post: its top published posts by number of
+    shared tags. Maintained by apps.blog.related.
+    """
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='related_entries')
+    related = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='+')
+    score = models.PositiveIntegerField(help_text="Number of shared tags")
+
+    class Meta:
+        ordering = ['post', '-score']
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'related'], name='blog_relatedpost_unique'),
+        ]
+        indexes = [models.Index(fields=['post', '-score'], name='blog_relatedpost_rank_idx')]
+
+    def __str__(self):
+        return f"{self.related} related to {self.post} ({self.score})"
+
+
 class PostImage(models.Model):
     """
     Model for images uploaded within blog post content via TinyMCE
     """
+    PROCESSING_READY = 'ready'
+    PROCESSING_PENDING = 'pending'
+    PROCESSING_RUNNING = 'processing'
+    PROCESSING_FAILED = 'failed'
+    PROCESSING_CHOICES = [
+        (PROCESSING_READY, 'Ready'),
+        (PROCESSING_PENDING, 'Pending'),
+        (PROCESSING_RUNNING, 'Processing'),
+        (PROCESSING_FAILED, 'Failed'),
+    ]
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='content_images', null=True, blank=True)
     image = models.ImageField(upload_to='post_images/content/', validators=[validate_image])
     uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     alt_text = models.CharField(max_length=200, blank=True, help_text="Alternative text for accessibility")
     original_filename = models.CharField(max_length=255, blank=True)
+    # Stored at upload time so quota checks never touch storage; null until backfilled
+    # for images uploaded before these fields existed (see backfill_image_metadata)
+    file_size = models.PositiveBigIntegerField(null=True, blank=True, editable=False, help_text="Size in bytes")
+    width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    content_type = models.CharField(max_length=50, blank=True, editable=False)
+    # Background processing (see apps.blog.images): uploads stay 'pending' until the
+    # process_images command has re-encoded them
+    processing_status = models.CharField(
+        max_length=10, choices=PROCESSING_CHOICES, default=PROCESSING_READY, editable=False
+    )
+    processing_started_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # Name of the original upload once processed, so content still pointing at it
+    # can be swapped to the processed image; the file itself is deleted once swapped
+    source_name = models.CharField(max_length=255, blank=True, editable=False)
+    source_stored = models.BooleanField(default=False, editable=False)
+    # Set once the image is ready, until process_images has built its variants
+    variants_pending = models.BooleanField(default=False, editable=False)
 
     class Meta:
         ordering = ['-uploaded_at']
         indexes = [
             models.Index(fields=['post', 'uploaded_at']),
-            models.Index(fields=['uploaded_by'])
+            models.Index(fields=['uploaded_by']),
+            models.Index(fields=['processing_status', 'uploaded_at'], name='blog_postimage_queue_idx'),
+            models.Index(fields=['id'], condition=Q(variants_pending=True), name='blog_postimage_variants_idx'),
         ]
 
     def __str__(self):
@@ -147,6 +340,8 @@ class PostImage(models.Model):
     
     def get_file_size_mb(self):
         """Get file size in megabytes"""
+        if self.file_size is not None:
+            return round(self.file_size / (1024 * 1024), 2)
         try:
             if self.image and hasattr(self.image, 'size'):
                 return round(self.image.size / (1024 * 1024), 2)
@@ -157,20 +352,12 @@ class PostImage(models.Model):
     @classmethod
     def get_user_image_count(cls, user):
         """Get total number of images uploaded by a user"""
-        return cls.objects.filter(uploaded_by=user).count()
+        return ImageUsage.for_user(user).image_count
     
     @classmethod
     def get_user_storage_mb(cls, user):
         """Get total storage used by a user in megabytes"""
-        images = cls.objects.filter(uploaded_by=user)
-        total_size = 0
-        for img in images:
-            try:
-                if img.image and hasattr(img.image, 'size'):
-                    total_size += img.image.size
-            except (ValueError, OSError):
-                continue
-        return round(total_size / (1024 * 1024), 2)
+        return ImageUsage.for_user(user).storage_mb
     
     @classmethod
     def get_post_image_count(cls, post):
@@ -202,13 +389,157 @@ class PostImage(models.Model):
         for post_image in cls.objects.filter(post=post):
             image_name = getattr(post_image.image, "name", "")
             filename = image_name.split('/')[-1]
+            # Content may still point at the original of a just-processed image
+            source_filename = post_image.source_name.split('/')[-1]
 
-            if not filename or filename not in referenced_filenames:
+            if not filename or (filename not in referenced_filenames and source_filename not in referenced_filenames):
                 post_image.delete()
                 deleted_count += 1
 
         return deleted_count
 
+    @classmethod
+    def claim_pending(cls, limit, stale_after=300, post=None):
+        """
+        Mark up to `limit` images waiting for processing (or whose processing started
+        more than `stale_after` seconds ago, i.e. whose worker died) as being
+        processed, and return them. Rows locked by another worker are skipped.
+        With `post`, only that post's images are claimed and `limit` may be None.
+        """
+        from django.db import transaction
+        from datetime import timedelta
+
+        now = timezone.now()
+        waiting = Q(processing_status=cls.PROCESSING_PENDING) | Q(
+            processing_status=cls.PROCESSING_RUNNING,
+            processing_started_at__lt=now - timedelta(seconds=stale_after),
+        )
+        queryset = cls.objects.filter(waiting) if post is None else cls.objects.filter(waiting, post=post)
+        with transaction.atomic():
+            ids = list(
+                queryset.select_for_update(skip_locked=True)
+                .order_by('uploaded_at').values_list('pk', flat=True)[:limit]
+            )
+            cls.objects.filter(pk__in=ids).update(
+                processing_status=cls.PROCESSING_RUNNING, processing_started_at=now
+            )
+        return list(cls.objects.filter(pk__in=ids).order_by('uploaded_at'))
+
+    def finish_processing(self, data, image_format, width, height):
+        """
+        Store the processed image under a new name and make it the current file. The
+        original stays stored until post content no longer uses it.
+        """
+        from django.core.files.base import ContentFile
+        from django.db import transaction
+        from .images import CONTENT_TYPES, content_image_path
+
+        storage = self.image.storage
+        new_name = storage.save(content_image_path(image_format), ContentFile(data))
+        size_change = len(data) - (self.file_size or 0)
+        with transaction.atomic():
+            updated = PostImage.objects.filter(pk=self.pk, processing_status=self.PROCESSING_RUNNING).update(
+                image=new_name,
+                source_name=self.image.name,
+                source_stored=True,
+                file_size=len(data),
+                width=width,
+                height=height,
+                content_type=CONTENT_TYPES.get(image_format, 'image/png'),
+                processing_status=self.PROCESSING_READY,
+                variants_pending=True,
+            )
+            if updated:
+                ImageUsage.adjust(self.uploaded_by_id, 0, size_change, create=False)
+        if not updated:
+            # Deleted (or reclaimed) while processing
+            storage.delete(new_name)
+            return False
+
+        post_id = PostImage.objects.filter(pk=self.pk).values_list('post_id', flat=True).first()
+        if post_id:
+            PostImage.apply_processed_images(Post(pk=post_id))
+        return True
+
+    def mark_failed(self):
+        """
+        The original could not be re-encoded, so its metadata cannot be stripped
+        either: delete it rather than serve it. The row stays, so that PostForm can
+        tell the editor which upload to replace.
+        """
+        from django.db import transaction
+
+        with transaction.atomic():
+            updated = PostImage.objects.filter(pk=self.pk).exclude(
+                processing_status=self.PROCESSING_FAILED
+            ).update(processing_status=self.PROCESSING_FAILED, file_size=0)
+            if updated:
+                ImageUsage.adjust(self.uploaded_by_id, 0, -(self.file_size or 0), create=False)
+        if updated:
+            delete_stored_file(self.image)
+
+    @classmethod
+    def process_pending_images(cls, post):
+        """
+        Re-encode the images of `post` still waiting for process_images in this
+        process, so that publishing never shows an original with its metadata.
+        This runs in the publishing request, so it uses the fast encoder settings.
+        Images a worker is already processing are left to it. Returns the number
+        of images processed.
+        """
+        from .images import ImageLimits, reencode_image
+
+        limits = ImageLimits.from_settings()
+        processed = 0
+        for image in cls.claim_pending(None, post=post):
+            try:
+                with image.image.open('rb') as source:
+                    result = reencode_image(source.read(), limits, fast=True)
+            except Exception:
+                logger.exception('Processing image %s failed', image.image.name)
+                image.mark_failed()
+                continue
+            if image.finish_processing(*result):
+                processed += 1
+        return processed
+
+    @classmethod
+    def swap_processed_urls(cls, content, images):
+        """`content` with references to the originals of processed `images` replaced"""
+        for image in images:
+            if image.source_name and image.source_name in content:
+                content = content.replace(image.source_name, image.image.name)
+        return content
+
+    @classmethod
+    def processed_images(cls, **filters):
+        return cls.objects.filter(processing_status=cls.PROCESSING_READY, **filters).exclude(source_name='')
+
+    @classmethod
+    def apply_processed_images(cls, post):
+        """
+        Point the content of `post` at its processed images instead of their originals,
+        then delete the originals. Returns the number of originals deleted.
+        """
+        from django.db import transaction
+
+        images = list(cls.processed_images(post=post))
+        if not images:
+            return 0
+        with transaction.atomic():
+            # Lock the post so a concurrent edit is not overwritten with stale content
+            locked = Post.objects.select_for_update().get(pk=post.pk)
+            content = cls.swap_processed_urls(locked.content, images)
+            if content != locked.content:
+                locked.content = content
+                locked.save(update_fields=['content', 'updated_at'])
+            post.content = content
+        stored = [image for image in images if image.source_stored]
+        for image in stored:
+            image.image.storage.delete(image.source_name)
+        cls.objects.filter(pk__in=[image.pk for image in stored]).update(source_stored=False)
+        return len(stored)
+
     @classmethod
     def get_orphaned_images(cls, hours_threshold=24):
         """Get images that are orphaned (no post association) older than threshold"""
@@ -230,39 +561,197 @@ class PostImage(models.Model):
         return count
 
 
+class ImageUsage(models.Model):
+    """
+    Per-user ledger of uploaded content images, kept current by the PostImage
+    receivers below so quota checks are a single primary key read.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='image_usage')
+    image_count = models.PositiveIntegerField(default=0)
+    total_bytes = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user}: {self.image_count} images, {self.storage_mb}MB"
+
+    @property
+    def storage_mb(self):
+        return round(self.total_bytes / (1024 * 1024), 2)
+
+    @classmethod
+    def for_user(cls, user):
+        """The user's usage (an unsaved, empty one when they have never uploaded)"""
+        return cls.objects.filter(user_id=user.pk).first() or cls(user_id=user.pk)
+
+    @classmethod
+    def adjust(cls, user_id, images, size, create=True):
+        """
+        Atomically add `images` and `size` bytes to the user's usage, never going
+        below zero. The row is created first when missing and `create` is set.
+        """
+        changes = {
+            'image_count': Greatest(F('image_count') + images, 0),
+            'total_bytes': Greatest(F('total_bytes') + size, 0),
+            'updated_at': timezone.now(),
+        }
+        updated = cls.objects.filter(user_id=user_id).update(**changes)
+        if not updated and create:
+            cls.objects.bulk_create([cls(user_id=user_id)], ignore_conflicts=True)
+            updated = cls.objects.filter(user_id=user_id).update(**changes)
+        return updated
+
+    @classmethod
+    def refresh(cls, user_ids=None):
+        """Recompute the usage of `user_ids` (every uploader when None) in one aggregate and one upsert"""
+        images = PostImage.objects.all() if user_ids is None else PostImage.objects.filter(uploaded_by__in=user_ids)
+        totals = {
+            user_id: (count, size or 0)
+            for user_id, count, size in images.values('uploaded_by').annotate(
+                count=Count('pk'), size=Sum('file_size')
+            ).values_list('uploaded_by', 'count', 'size').order_by()
+        }
+        for user_id in user_ids or ():
+            totals.setdefault(user_id, (0, 0))
+        now = timezone.now()
+        refreshed = cls.objects.bulk_create(
+            [
+                cls(user_id=user_id, image_count=count, total_bytes=size, updated_at=now)
+                for user_id, (count, size) in totals.items()
+            ],
+            update_conflicts=True,
+            unique_fields=['user'],
+            update_fields=['image_count', 'total_bytes', 'updated_at'],
+        )
+        return len(refreshed)
+
+
+class ImageVariant(models.Model):
+    """
+    A stored size of a featured or content image, keyed by the storage name of the
+    original (see apps.blog.variants). Each original also has a row for itself, so
+    templates know its width and height. The width is 0 when it could not be read.
+    """
+    source_name = models.CharField(max_length=255)
+    name = models.CharField(max_length=255)
+    format = models.CharField(max_length=10)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    file_size = models.PositiveBigIntegerField(null=True, blank=True, help_text="Size in bytes")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['source_name', 'format', 'width'], name='blog_imagevariant_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.width}w {self.format})"
+
+    @property
+    def is_original(self):
+        return self.name == self.source_name
+
+    @classmethod
+    def source_in_use(cls, source_name):
+        """Whether `source_name` is still the featured image of a post or a content image"""
+        return (
+            Post.objects.filter(image=source_name).exists()
+            or PostImage.objects.filter(image=source_name).exists()
+        )
+
+    @classmethod
+    def sources_without_variants(cls, limit=None):
+        """
+        Storage names of featured and content images that have no variants yet, for
+        backfills (new images are flagged instead, see variants.schedule_variants()).
+        Content images still waiting to be re-encoded are skipped.
+        """
+        generated = cls.objects.values('source_name')
+        featured = Post.objects.exclude(image='').exclude(image__isnull=True).exclude(
+            image__in=generated
+        ).order_by('-pk').values_list('image', flat=True)
+        content = PostImage.objects.exclude(
+            processing_status__in=[PostImage.PROCESSING_PENDING, PostImage.PROCESSING_RUNNING]
+        ).exclude(image__in=generated).order_by('-pk').values_list('image', flat=True)
+        if limit is not None:
+            featured, content = featured[:limit], content[:limit]
+        names = list(dict.fromkeys([*featured, *content]))
+        return names if limit is None else names[:limit]
+
+
 
 @receiver(pre_save, sender=Post)
 def delete_old_post_image(sender, instance, **kwargs):
-    """Delete the old post image file when a new one is uploaded"""
+    """Delete the old post image file (and its variants) when a new one is uploaded"""
+    new_name = getattr(instance.image, "name", None)
+    instance._image_changed = bool(new_name)
     if instance.pk:  # Only for existing posts
         try:
             old_post = Post.objects.get(pk=instance.pk)
-            if old_post.image:
-                old_name = old_post.image.name
-                new_name = getattr(instance.image, "name", None)
+            old_name = old_post.image.name if old_post.image else None
+            instance._image_changed = bool(new_name) and new_name != old_name
 
-                # Delete when the image changed or was cleared
-                if old_name and (not new_name or old_name != new_name):
-                    delete_stored_file(old_post.image)
+            # Delete when the image changed or was cleared
+            if old_name and (not new_name or old_name != new_name):
+                delete_variants([old_name])
+                delete_stored_file(old_post.image)
         except Post.DoesNotExist:
             pass
 
 
+@receiver(post_save, sender=Post)
+def generate_post_image_variants(sender, instance, **kwargs):
+    """Queue responsive variants of a newly set featured image (see apps.blog.variants)"""
+    if getattr(instance, '_image_changed', False):
+        instance._image_changed = False
+        schedule_variants(instance.image.name)
+
+
 @receiver(post_delete, sender=Post)
 def delete_post_image_file(sender, instance, **kwargs):
     """
     Delete the post image file from the filesystem when a Post instance is deleted.
     """
     if instance.image:
+        delete_variants([instance.image.name])
         delete_stored_file(instance.image)
 
 
+@receiver(post_save, sender=PostImage)
+def count_post_image_usage(sender, instance, created, **kwargs):
+    """Add new content images to the uploader's usage ledger"""
+    if created:
+        ImageUsage.adjust(instance.uploaded_by_id, 1, instance.file_size or 0)
+
+
+@receiver(post_save, sender=PostImage)
+def generate_content_image_variants(sender, instance, created, **kwargs):
+    """
+    Queue responsive variants of new content images. Pending uploads are queued by
+    finish_processing() once re-encoded.
+    """
+    if created and instance.processing_status == PostImage.PROCESSING_READY:
+        schedule_variants(instance.image.name)
+
+
+@receiver(post_delete, sender=PostImage)
+def release_post_image_usage(sender, instance, **kwargs):
+    """
+    Remove deleted content images from the uploader's usage ledger. Never creates the
+    row: when the uploader is being deleted, the ledger row goes with them.
+    """
+    ImageUsage.adjust(instance.uploaded_by_id, -1, -(instance.file_size or 0), create=False)
+
+
 @receiver(post_delete, sender=PostImage)
 def delete_post_content_image_file(sender, instance, **kwargs):
     """
     Delete the content image file from the filesystem when a PostImage instance is deleted.
     """
     if instance.image:
+        if instance.source_stored:
+            instance.image.storage.delete(instance.source_name)
+        delete_variants([instance.image.name])
         delete_stored_file(instance.image)
 
 
@@ -276,4 +765,302 @@ def delete_orphaned_post_images(sender, instance, **kwargs):
     orphaned_images = PostImage.objects.filter(post=instance)
     for post_image in orphaned_images:
         # The PostImage signal will handle file deletion
-        post_image.delete()
\ No newline at end of file
+        post_image.delete()
+
+
+@receiver(pre_save, sender=Comment)
+def remember_previous_comment_active(sender, instance, update_fields=None, **kwargs):
+    """Record the stored active flag so moderation can be counted in post_save"""
+    if update_fields is not None and 'active' not in update_fields:
+        instance._previous_active = instance.active
+    elif instance.pk:
+        instance._previous_active = Comment.objects.filter(
+            pk=instance.pk
+        ).values_list('active', flat=True).first()
+    else:
+        instance._previous_active = None
+
+
+@receiver(post_save, sender=Comment)
+def update_post_comment_count(sender, instance, created, **kwargs):
+    """Count new active top-level comments, and hiding or restoring existing ones"""
+    if instance.parent_id is not None:
+        return
+    was_active = False if created else getattr(instance, '_previous_active', instance.active)
+    if was_active != instance.active:
+        Post.adjust_counter([instance.post_id], 'comment_count', 1 if instance.active else -1)
+
+
+@receiver(post_delete, sender=Comment)
+def decrement_post_comment_count(sender, instance, **kwargs):
+    """Uncount deleted active top-level comments on the post"""
+    if instance.parent_id is None and instance.active:
+        Post.adjust_counter([instance.post_id], 'comment_count', -1)
+
+
+@receiver(m2m_changed, sender=Post.likes.through)
+def remember_removed_likes(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Record the post IDs of the likes that really exist before a remove or clear,
+    for the post_remove/post_clear receivers below. forget_removed_likes() drops
+    them again once those have run.
+    """
+    if action in ('pre_remove', 'pre_clear'):
+        rows = sender.objects.filter(**{'user_id' if reverse else 'post_id': instance.pk})
+        if action == 'pre_remove':
+            rows = rows.filter(**{'post_id__in' if reverse else 'user_id__in': pk_set})
+        instance._removed_like_post_ids = list(rows.values_list('post_id', flat=True))
+
+
+@receiver(m2m_changed, sender=Post.likes.through)
+def update_post_like_count(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Keep Post.like_count in step with the likes M2M from either side
+    (post.likes.add(...) or user.liked_posts.add(...)).
+    """
+    if action == 'post_add':
+        # Django only reports the rows that were actually inserted
+        if reverse:
+            Post.adjust_counter(pk_set, 'like_count', 1)
+        else:
+            Post.adjust_counter([instance.pk], 'like_count', len(pk_set))
+    elif action in ('post_remove', 'post_clear'):
+        removed = getattr(instance, '_removed_like_post_ids', [])
+        if reverse:
+            Post.adjust_counter(removed, 'like_count', -1)
+        else:
+            Post.adjust_counter([instance.pk], 'like_count', -len(removed))
+
+
+@receiver(pre_delete, sender=User)
+def uncount_deleted_user_likes(sender, instance, **kwargs):
+    """Deleting a user cascades their likes without M2M signals, so uncount them here"""
+    Post.adjust_counter(
+        list(Post.likes.through.objects.filter(user_id=instance.pk).values_list('post_id', flat=True)),
+        'like_count',
+        -1
+    )
+
+
+@receiver(post_save, sender=Post)
+def update_post_search_vector(sender, instance, update_fields=None, **kwargs):
+    """Refresh the stored search vector when searchable fields change"""
+    if update_fields is None or {'title', 'summary', 'content'} & set(update_fields):
+        update_search_vectors(Post.objects.filter(pk=instance.pk))
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def update_tagged_post_search_vector(sender, instance, action, reverse, pk_set, **kwargs):
+    """Refresh search vectors when tags are added to or removed from posts"""
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            update_search_vectors(Post.objects.filter(pk=instance.pk))
+    elif action == 'pre_clear':
+        # instance is a Tag; remember its posts before the rows disappear
+        instance._cleared_post_ids = list(instance.post_set.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        post_ids = pk_set if action != 'post_clear' else getattr(instance, '_cleared_post_ids', [])
+        update_search_vectors(Post.objects.filter(pk__in=post_ids))
+
+
+@receiver(post_save, sender=Tag)
+def update_renamed_tag_search_vectors(sender, instance, created, **kwargs):
+    """Tag names are part of the search vector, so re-index the tag's posts on rename"""
+    tag_prefix_index.invalidate()
+    if not created:
+        update_search_vectors(Post.objects.filter(tags=instance))
+
+
+@receiver(post_delete, sender=Tag)
+def invalidate_tag_prefix_index(sender, instance, **kwargs):
+    tag_prefix_index.invalidate()
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_published_content(sender, **kwargs):
+    """Publishing, editing or deleting posts (or renaming tags) invalidates content caches"""
+    bump_content_generation()
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def invalidate_published_content_on_tag_change(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_content_generation()
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_engagement_on_comment(sender, **kwargs):
+    """Comment counts feed the homepage rankings"""
+    bump_engagement_generation()
+
+
+@receiver(m2m_changed, sender=Post.likes.through)
+def invalidate_engagement_on_like(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_engagement_generation()
+
+
+@receiver(like_toggled)
+def invalidate_engagement_on_like_toggle(sender, post, **kwargs):
+    bump_engagement_generation()
+    purge_post_pages([post], content=False)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def purge_post_page_cache(sender, instance, **kwargs):
+    purge_post_pages([instance])
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def purge_commented_post_page_cache(sender, instance, **kwargs):
+    purge_post_pages(Post.objects.filter(pk=instance.post_id).only('pk', 'slug'), content=False)
+
+
+@receiver(m2m_changed, sender=Post.likes.through)
+def purge_liked_post_page_cache(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        purge_post_pages([instance], content=False)
+    else:
+        # instance is a User; use the removals recorded by remember_removed_likes
+        post_ids = pk_set if action == 'post_add' else getattr(instance, '_removed_like_post_ids', [])
+        purge_post_pages(Post.objects.filter(pk__in=post_ids).only('pk', 'slug'), content=False)
+
+
+@receiver(m2m_changed, sender=Post.likes.through)
+def forget_removed_likes(sender, instance, action, **kwargs):
+    """Registered after every receiver that reads them, so the IDs do not outlive the change"""
+    if action in ('post_remove', 'post_clear'):
+        instance.__dict__.pop('_removed_like_post_ids', None)
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def purge_tagged_post_page_cache(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        purge_post_pages([instance])
+    else:
+        post_ids = pk_set if action != 'post_clear' else getattr(instance, '_cleared_post_ids', [])
+        purge_post_pages(Post.objects.filter(pk__in=post_ids).only('pk', 'slug'))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def purge_tag_page_cache(sender, instance, **kwargs):
+    """Tag names appear on listings, feeds and the pages of the tag's posts"""
+    purge_post_pages(Post.objects.filter(tags=instance).only('pk', 'slug'))
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous_post_status(sender, instance, update_fields=None, **kwargs):
+    """Record the stored status so post_save receivers can detect publishing and unpublishing"""
+    if update_fields is not None and 'status' not in update_fields:
+        instance._previous_status = instance.status
+    elif instance.pk:
+        instance._previous_status = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('status', flat=True).first()
+    else:
+        instance._previous_status = None
+
+
+def post_status_changed(instance, created):
+    return created or getattr(instance, '_previous_status', instance.status) != instance.status
+
+
+@receiver(post_save, sender=Post)
+def refresh_related_posts_on_status_change(sender, instance, created, **kwargs):
+    """Publishing or unpublishing a post adds it to or drops it from its neighbours' lists"""
+    if post_status_changed(instance, created):
+        refresh_affected_related_posts([instance.pk])
+
+
+@receiver(pre_delete, sender=Post)
+def remember_posts_listing_deleted_post(sender, instance, **kwargs):
+    instance._listed_by_post_ids = list(
+        RelatedPost.objects.filter(related=instance).values_list('post_id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Post)
+def refresh_related_posts_on_delete(sender, instance, **kwargs):
+    # The deleted post's own rows cascade; refill the lists it was part of
+    refresh_related_post_pages(getattr(instance, '_listed_by_post_ids', []))
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def refresh_related_posts_on_tag_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        refresh_affected_related_posts([instance.pk])
+    else:
+        # instance is a Tag; post_clear uses the posts recorded by update_tagged_post_search_vector
+        post_ids = pk_set if action != 'post_clear' else getattr(instance, '_cleared_post_ids', [])
+        refresh_affected_related_posts(post_ids)
+
+
+@receiver(pre_delete, sender=Tag)
+def remember_deleted_tag_posts(sender, instance, **kwargs):
+    instance._tagged_post_ids = list(instance.post_set.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Tag)
+def refresh_related_posts_on_tag_delete(sender, instance, **kwargs):
+    # Deleting a tag cascades its post links without M2M signals
+    refresh_affected_related_posts(getattr(instance, '_tagged_post_ids', []))
+
+
+@receiver(post_save, sender=Tag)
+def create_tag_stats(sender, instance, created, **kwargs):
+    if created:
+        TagStat.objects.get_or_create(tag=instance)
+    reference_data.invalidate('blog.tags')
+
+
+@receiver(post_delete, sender=Tag)
+def invalidate_tag_list(sender, instance, **kwargs):
+    reference_data.invalidate('blog.tags')
+
+
+@receiver(post_save, sender=Post)
+def refresh_tag_stats_on_status_change(sender, instance, created, **kwargs):
+    """Publishing or unpublishing a post changes the counts of all its tags"""
+    if not created and post_status_changed(instance, created):
+        TagStat.refresh(list(instance.tags.values_list('pk', flat=True)))
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def refresh_tag_stats_on_tag_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        # instance is a Tag
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            TagStat.refresh([instance.pk])
+    elif action == 'pre_clear':
+        instance._cleared_tag_ids = list(instance.tags.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove', 'post_clear') and instance.status == 'published':
+        # Draft posts do not count towards tag statistics
+        tag_ids = pk_set if action != 'post_clear' else getattr(instance, '_cleared_tag_ids', [])
+        if tag_ids:
+            TagStat.refresh(tag_ids)
+
+
+@receiver(pre_delete, sender=Post)
+def remember_deleted_post_tags(sender, instance, **kwargs):
+    instance._deleted_tag_ids = list(instance.tags.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Post)
+def refresh_tag_stats_on_post_delete(sender, instance, **kwargs):
+    # Deleting a post cascades its tag links without M2M signals
+    tag_ids = getattr(instance, '_deleted_tag_ids', [])
+    if instance.status == 'published' and tag_ids:
+        TagStat.refresh(tag_ids)
@@ -0,0 +1,175 @@
+"""
+Keyset (cursor) pagination for post listings.
+
+Offset pagination issues a COUNT(*) and scans past every skipped row, so deep pages get
+slower the further a reader (or crawler) goes. Cursor pagination instead seeks on the
+listing's sort key, e.g. ``(published_at, id)``, which an index serves directly: every
+page costs the same as the first one.
+
+Cursors are opaque, signed tokens holding the sort key of the first/last row of a page,
+so they cannot be tampered with to craft arbitrary queries.
+"""
+from django.core import signing
+from django.db.models import Q
+from django.http import Http404, JsonResponse
+from django.urls import reverse
+from django.utils.dateparse import parse_datetime
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class CursorPage:
+    """A page of results plus the tokens for the neighbouring pages"""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class CursorPaginator:
+    """
+    Paginate `queryset` newest first on (`ordering_field`, pk).
+
+    `ordering_field` must be a datetime field; rows where it is NULL are skipped.
+    """
+    salt = 'blog.pagination.cursor'
+
+    def __init__(self, queryset, per_page, ordering_field='published_at'):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering_field = ordering_field
+
+    def encode_cursor(self, obj, backwards=False):
+        value = getattr(obj, self.ordering_field)
+        return signing.dumps([value.isoformat(), obj.pk, int(backwards)], salt=self.salt)
+
+    def decode_cursor(self, cursor):
+        try:
+            value, pk, backwards = signing.loads(cursor, salt=self.salt)
+            value = parse_datetime(value)
+        except (signing.BadSignature, TypeError, ValueError):
+            raise InvalidCursor(cursor)
+        if value is None or not isinstance(pk, int):
+            raise InvalidCursor(cursor)
+        return value, pk, bool(backwards)
+
+    def page(self, cursor=None):
+        field = self.ordering_field
+        queryset = self.queryset.filter(**{f'{field}__isnull': False})
+        backwards = False
+
+        if cursor:
+            value, pk, backwards = self.decode_cursor(cursor)
+            if backwards:
+                queryset = queryset.filter(
+                    Q(**{f'{field}__gt': value}) | Q(**{field: value, 'pk__gt': pk})
+                ).order_by(field, 'pk')
+            else:
+                queryset = queryset.filter(
+                    Q(**{f'{field}__lt': value}) | Q(**{field: value, 'pk__lt': pk})
+                ).order_by(f'-{field}', '-pk')
+        else:
+            queryset = queryset.order_by(f'-{field}', '-pk')
+
+        # Fetch one extra row to know whether there is another page in this direction
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, bool(cursor)
+
+        if not rows:
+            return CursorPage([])
+        return CursorPage(
+            rows,
+            next_cursor=self.encode_cursor(rows[-1]) if has_next else None,
+            previous_cursor=self.encode_cursor(rows[0], backwards=True) if has_previous else None,
+        )
+
+
+class CursorPaginationMixin:
+    """
+    Opt-in cursor pagination for post ListViews.
+
+    A ``cursor`` query parameter (empty for the first page) switches the view from
+    page numbers to keyset pagination; adding ``format=json`` returns the page as
+    JSON for infinite scroll.
+    """
+    cursor_param = 'cursor'
+    cursor_ordering_field = 'published_at'
+
+    def use_cursor_pagination(self):
+        return self.cursor_param in self.request.GET
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.use_cursor_pagination():
+            return super().paginate_queryset(queryset, page_size)
+
+        paginator = CursorPaginator(queryset, page_size, self.cursor_ordering_field)
+        try:
+            page = paginator.page(self.request.GET.get(self.cursor_param))
+        except InvalidCursor:
+            raise Http404('Invalid page cursor.')
+        return paginator, page, page.object_list, page.has_next or page.has_previous
+
+    def get_cursor_url(self, cursor, **params):
+        if cursor is None:
+            return None
+        query = self.request.GET.copy()
+        query.pop('page', None)
+        query[self.cursor_param] = cursor
+        query.update(params)
+        return f'?{query.urlencode()}'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['cursor_pagination'] = self.use_cursor_pagination()
+        if context['cursor_pagination']:
+            page = context['page_obj']
+            context['next_page_url'] = self.get_cursor_url(page.next_cursor)
+            context['previous_page_url'] = self.get_cursor_url(page.previous_cursor)
+        return context
+
+    def serialize_post(self, post):
+        return {
+            'id': post.pk,
+            'title': post.title,
+            'url': reverse('blog:post_detail', kwargs={'pk': post.pk, 'slug': post.slug}),
+            'excerpt': post.excerpt,
+            'author': post.author.username,
+            'status': post.status,
+            'published_at': post.published_at.isoformat() if post.published_at else None,
+            'like_count': post.like_count,
+            'comment_count': post.comment_count,
+            'liked': getattr(post, 'user_has_liked', False),
+        }
+
+    def render_to_response(self, context, **response_kwargs):
+        if context['cursor_pagination'] and self.request.GET.get('format') == 'json':
+            page = context['page_obj']
+            return JsonResponse({
+                'posts': [self.serialize_post(post) for post in page.object_list],
+                'next_cursor': page.next_cursor,
+                'previous_cursor': page.previous_cursor,
+            })
+        return super().render_to_response(context, **response_kwargs)
@@ -0,0 +1,174 @@
+"""
+Related posts by shared tags.
+
+Counting tag overlaps per request means joining the tag M2M to itself and grouping
+by post, which gets expensive as the corpus grows. Instead the top
+RELATED_POSTS_COUNT matches of every post are stored in RelatedPost and refreshed
+for the affected posts whenever tags change or a post is published, unpublished
+or deleted (see the receivers in models.py). Reads are a single indexed query,
+cached per content generation.
+
+Candidates are the RELATED_POSTS_CANDIDATES newest published posts of each tag,
+which keeps the number of pairs linear in the number of posts even for tags used
+by a large share of the corpus. Incremental refreshes only reach those candidates,
+so older posts sharing a changed tag catch up at the nightly rebuild_related_posts
+run (see deployment/README.md, "Scheduled Jobs").
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Max, Window
+from django.db.models.functions import RowNumber
+from django.urls import reverse
+
+from apps.core.pagecache import purge_pages
+from .cache import get_content_generation
+
+
+def get_related_posts_count():
+    return getattr(settings, 'RELATED_POSTS_COUNT', 3)
+
+
+def get_related_candidates_count():
+    return getattr(settings, 'RELATED_POSTS_CANDIDATES', 50)
+
+
+def candidate_rows(tag_ids=None):
+    """
+    Post/tag rows of the newest RELATED_POSTS_CANDIDATES published posts of every
+    tag (only `tag_ids`, a list or subquery, when given)
+    """
+    from .models import Post
+
+    rows = Post.tags.through.objects.filter(post__status='published')
+    if tag_ids is not None:
+        rows = rows.filter(tag_id__in=tag_ids)
+    return rows.annotate(
+        tag_rank=Window(
+            RowNumber(),
+            partition_by=[F('tag_id')],
+            order_by=[F('post__published_at').desc(nulls_last=True), F('post_id').desc()],
+        )
+    ).filter(tag_rank__lte=get_related_candidates_count())
+
+
+def tag_overlap_queryset(post_ids=None):
+    """
+    (source_id, post_id, score) rows: the top RELATED_POSTS_COUNT candidates sharing
+    the most tags with each source post (only `post_ids` when given).
+
+    One set-based query: candidate post/tag rows joined to every post with the same
+    tag, grouped by the pair and ranked per source with a window function.
+    """
+    from .models import Post
+
+    if post_ids is None:
+        candidates = candidate_rows()
+    else:
+        candidates = candidate_rows(
+            Post.tags.through.objects.filter(post_id__in=post_ids).values('tag_id')
+        )
+    rows = Post.tags.through.objects.filter(pk__in=candidates.values('pk'))
+    if post_ids is not None:
+        rows = rows.filter(tag__post__in=post_ids)
+    return rows.annotate(
+        source_id=F('tag__post')
+    ).exclude(
+        source_id=F('post_id')
+    ).values('source_id', 'post_id').annotate(
+        score=Count('tag_id'),
+        published_at=Max('post__published_at'),
+    ).annotate(
+        position=Window(
+            RowNumber(),
+            partition_by=[F('source_id')],
+            order_by=[F('score').desc(), F('published_at').desc(nulls_last=True), F('post_id').desc()],
+        )
+    ).filter(position__lte=get_related_posts_count()).values_list('source_id', 'post_id', 'score')
+
+
+def refresh_related_posts(post_ids=None):
+    """
+    Recompute the stored related posts of `post_ids` (every post when None).
+    Returns the number of RelatedPost rows written.
+    """
+    from .models import RelatedPost
+
+    if post_ids is not None:
+        post_ids = set(post_ids)
+        if not post_ids:
+            return 0
+
+    entries = [
+        RelatedPost(post_id=source_id, related_id=related_id, score=score)
+        for source_id, related_id, score in tag_overlap_queryset(post_ids)
+    ]
+    with transaction.atomic():
+        stale = RelatedPost.objects.all()
+        if post_ids is not None:
+            stale = stale.filter(post_id__in=post_ids)
+        stale.delete()
+        created = RelatedPost.objects.bulk_create(entries)
+    return len(created)
+
+
+def affected_post_ids(post_ids):
+    """
+    Posts whose related list may change when the tags or status of `post_ids`
+    change: the posts themselves, every post currently listing one of them, and
+    the candidates of their tags. Older posts sharing a tag pick up new matches at
+    the next rebuild_related_posts run.
+    """
+    from .models import Post, RelatedPost
+
+    post_ids = set(post_ids)
+    if not post_ids:
+        return set()
+    tag_ids = Post.tags.through.objects.filter(post_id__in=post_ids).values('tag_id')
+    candidates = candidate_rows(tag_ids).values_list('post_id', flat=True)
+    listing = RelatedPost.objects.filter(related__in=post_ids).values_list('post_id', flat=True)
+    return post_ids | set(candidates) | set(listing)
+
+
+def refresh_related_post_pages(post_ids):
+    """Refresh the related lists of `post_ids` and purge their cached detail pages"""
+    from .models import Post
+
+    post_ids = set(post_ids)
+    if not post_ids:
+        return
+    refresh_related_posts(post_ids)
+    purge_pages([
+        reverse('blog:post_detail', kwargs={'pk': pk, 'slug': slug})
+        for pk, slug in Post.objects.filter(pk__in=post_ids).values_list('pk', 'slug')
+    ])
+
+
+def refresh_affected_related_posts(post_ids):
+    """Refresh every related list that may change with the tags or status of `post_ids`"""
+    refresh_related_post_pages(affected_post_ids(post_ids))
+
+
+def get_related_posts(post):
+    """
+    Return the stored related posts of `post`, best match first.
+
+    One query on the (post, -score) index with the related posts and their
+    authors joined, cached until published content changes.
+    """
+    from .models import RelatedPost
+
+    key = f'blog:related:{get_content_generation()}:{post.pk}'
+    related = cache.get(key)
+    if related is None:
+        related = [
+            entry.related for entry in RelatedPost.objects.filter(
+                post_id=post.pk, related__status='published'
+            ).select_related(
+                'related__author'
+            ).defer(
+                'related__content', 'related__rendered_content', 'related__search_vector'
+            ).order_by('-score', '-related__published_at')
+        ]
+        cache.set(key, related, getattr(settings, 'RELATED_POSTS_CACHE_TIMEOUT', 3600))
+    return related
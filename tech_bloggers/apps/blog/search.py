@@ -0,0 +1,220 @@
+"""
+Post search.
+
+On PostgreSQL, posts carry a stored, weighted tsvector (title > summary > tags > content)
+backed by a GIN index, and results are ranked with SearchRank. Other databases (SQLite in
+development) fall back to the original icontains search.
+
+Search results (up to SEARCH_CACHE_MAX_RESULTS) are cached as ordered post IDs keyed on
+the normalized query and category (see apps.blog.cache for invalidation), and query
+frequencies are tracked so popular searches can be prewarmed after deploys.
+
+Search-as-you-type suggestions use a pg_trgm trigram index on post titles (icontains on
+other databases) plus an in-memory prefix index of tag names, and never read post bodies.
+"""
+import hashlib
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity
+from django.db import connections
+from django.db.models import F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .cache import get_content_generation
+
+POPULAR_QUERIES_KEY = 'blog:search:popular'
+# Cached instead of an ID list for searches with more than SEARCH_CACHE_MAX_RESULTS matches
+TOO_MANY_RESULTS = 'too-many'
+
+
+def full_text_search_supported(using='default'):
+    """Return True when the database can use the stored search vector"""
+    return connections[using].vendor == 'postgresql'
+
+
+def get_search_config():
+    return getattr(settings, 'SEARCH_CONFIG', 'english')
+
+
+def build_search_vector():
+    """Weighted search vector expression for Post rows, including tag names"""
+    from .models import Tag
+
+    config = get_search_config()
+    tag_names = Subquery(
+        Tag.objects.filter(post=OuterRef('pk')).order_by().values('post').annotate(
+            names=StringAgg('name', delimiter=' ')
+        ).values('names')
+    )
+    return (
+        SearchVector('title', weight='A', config=config)
+        + SearchVector('summary', weight='B', config=config)
+        + SearchVector(Coalesce(tag_names, Value('')), weight='C', config=config)
+        + SearchVector('content', weight='D', config=config)
+    )
+
+
+def update_search_vectors(queryset):
+    """Recompute the stored search vector for every post in `queryset`"""
+    if not full_text_search_supported(queryset.db):
+        return 0
+    return queryset.update(search_vector=build_search_vector())
+
+
+def search_posts(queryset, query):
+    """Filter `queryset` to posts matching `query`, best matches first where supported"""
+    if full_text_search_supported(queryset.db):
+        search_query = SearchQuery(query, search_type='websearch', config=get_search_config())
+        return queryset.filter(search_vector=search_query).annotate(
+            rank=SearchRank(F('search_vector'), search_query)
+        ).order_by('-rank', '-published_at')
+
+    return queryset.filter(
+        Q(title__icontains=query) |
+        Q(content__icontains=query) |
+        Q(summary__icontains=query) |
+        Q(tags__name__icontains=query)
+    ).distinct()
+
+
+def normalize_query(query):
+    """Lowercase and collapse whitespace so equivalent searches share a cache entry"""
+    return ' '.join((query or '').lower().split())[:100]
+
+
+def published_search_queryset(query='', category=''):
+    """Published posts matching a (normalized) search query and/or tag slug"""
+    from .models import Post
+
+    queryset = Post.objects.filter(status='published')
+    if query:
+        queryset = search_posts(queryset, query)
+    if category:
+        queryset = queryset.filter(tags__slug=category)
+    return queryset
+
+
+def get_search_result_ids(query, category, queryset=None):
+    """
+    Return the ordered post IDs for a search, from cache when possible, or None when
+    the search matches more than SEARCH_CACHE_MAX_RESULTS posts.
+
+    Only IDs are cached; pages are sliced from the list and hydrated by primary key,
+    so every page of a search shares one entry and no COUNT(*) over the search join
+    is needed. A truncated list would lose results and miscount pages, so larger
+    result sets are only remembered as too large and paginated over the queryset.
+    """
+    digest = hashlib.sha1(f'{query}\x00{category}'.encode('utf-8')).hexdigest()
+    key = f'blog:search:{get_content_generation()}:{digest}'
+    post_ids = cache.get(key)
+    if post_ids is None:
+        if queryset is None:
+            queryset = published_search_queryset(query, category)
+        max_results = getattr(settings, 'SEARCH_CACHE_MAX_RESULTS', 500)
+        post_ids = list(queryset.values_list('pk', flat=True)[:max_results + 1])
+        if len(post_ids) > max_results:
+            post_ids = TOO_MANY_RESULTS
+        cache.set(key, post_ids, getattr(settings, 'SEARCH_CACHE_TIMEOUT', 900))
+    return None if post_ids == TOO_MANY_RESULTS else post_ids
+
+
+def record_search_query(query):
+    """
+    Count a search in a small frequency table stored in the cache.
+
+    The read-modify-write is not atomic, so counts are approximate under
+    concurrency, which is fine for choosing which queries to prewarm.
+    """
+    if not query:
+        return
+    counts = cache.get(POPULAR_QUERIES_KEY) or {}
+    counts[query] = counts.get(query, 0) + 1
+    max_tracked = getattr(settings, 'SEARCH_POPULAR_MAX_TRACKED', 500)
+    if len(counts) > max_tracked:
+        # Keep the most frequent half so new queries can still get in
+        counts = dict(sorted(counts.items(), key=lambda item: item[1], reverse=True)[:max_tracked // 2])
+    cache.set(POPULAR_QUERIES_KEY, counts, timeout=None)
+
+
+def get_popular_queries(limit):
+    """Return the `limit` most frequent recorded searches as (query, count) pairs"""
+    counts = cache.get(POPULAR_QUERIES_KEY) or {}
+    return sorted(counts.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+
+def suggest_posts(query, limit):
+    """Return up to `limit` published post titles matching `query`, typo-tolerant where supported"""
+    from .models import Post
+
+    queryset = Post.objects.filter(status='published')
+    if full_text_search_supported(queryset.db):
+        # `%>` (trigram_word_similar) is served by the title trigram GIN index and also
+        # matches partially typed words; icontains (UPPER(title) LIKE) could not use it
+        queryset = queryset.filter(
+            title__trigram_word_similar=query
+        ).annotate(
+            similarity=TrigramWordSimilarity(query, 'title')
+        ).order_by('-similarity', '-published_at')
+    else:
+        queryset = queryset.filter(title__icontains=query).order_by('-published_at')
+    return list(queryset.values('pk', 'slug', 'title')[:limit])
+
+
+class TagPrefixIndex:
+    """
+    Sorted in-memory index of tag name words for prefix lookups.
+
+    Every word of a tag name is indexed, so "dev" matches "Web Development".
+    The index is rebuilt lazily after `invalidate()` (called from Tag signals)
+    or once `ttl` seconds have passed, which bounds staleness across workers.
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._keys = []
+        self._entries = []
+        self._loaded_at = None
+
+    def invalidate(self):
+        self._loaded_at = None
+
+    def _load(self):
+        from .models import Tag
+
+        pairs = []
+        for name, slug in Tag.objects.order_by().values_list('name', 'slug'):
+            for word in {name.lower(), *name.lower().split()}:
+                pairs.append((word, name, slug))
+        pairs.sort()
+        self._keys = [word for word, _, _ in pairs]
+        self._entries = [(name, slug) for _, name, slug in pairs]
+        self._loaded_at = time.monotonic()
+
+    def match(self, prefix, limit):
+        prefix = prefix.lower().strip()
+        if not prefix:
+            return []
+        with self._lock:
+            if self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl:
+                self._load()
+            keys, entries = self._keys, self._entries
+
+        matches = []
+        seen = set()
+        index = bisect_left(keys, prefix)
+        while index < len(keys) and keys[index].startswith(prefix) and len(matches) < limit:
+            name, slug = entries[index]
+            if slug not in seen:
+                seen.add(slug)
+                matches.append({'name': name, 'slug': slug})
+            index += 1
+        return matches
+
+
+tag_prefix_index = TagPrefixIndex(ttl=getattr(settings, 'SEARCH_TAG_INDEX_TTL', 300))
@@ -0,0 +1,318 @@
+"""
+Deterministic synthetic corpus for performance testing (see the seed_performance_data
+command).
+
+Rows are written with bulk_create in batches with explicit primary keys, so replies
+can point at their parent comments without a round trip, and no per-row signals
+run. The denormalized data the signals would maintain (post counters, tag
+statistics, related posts, search vectors) is filled in set-based afterwards.
+
+Shapes follow what a blog sees in practice: a few prolific authors and popular tags,
+power-law likes and comments per post, and comment threads that often continue the
+previous reply.
+"""
+import itertools
+import random
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils.text import slugify
+
+from apps.accounts.models import Profile
+from .cache import bump_content_generation, bump_engagement_generation
+from .models import Comment, Post, Tag, TagStat
+from .related import refresh_related_posts
+from .search import update_search_vectors
+
+WORDS = (
+    'api async backend benchmark branch build cache class cloud cluster code commit '
+    'compiler concurrency container data database debug deploy design docker edge '
+    'engine event feature framework function git graph http index interface kernel '
+    'latency library linux memory migration model module network node object pipeline '
+    'pointer process protocol python query queue react release request runtime rust '
+    'scale schema server service shard socket stack storage stream system test thread '
+    'token type update version worker'
+).split()
+
+TAG_NAMES = (
+    'Python', 'JavaScript', 'Django', 'React', 'DevOps', 'Docker', 'Kubernetes', 'AWS',
+    'Databases', 'PostgreSQL', 'Security', 'Machine Learning', 'AI', 'Rust', 'Go', 'Linux',
+    'Web Development', 'Career', 'Testing', 'Performance', 'Open Source', 'Cloud', 'APIs',
+    'TypeScript', 'Data Science', 'Networking', 'Mobile', 'Frontend', 'Backend', 'Tutorials',
+)
+
+
+@dataclass
+class SeedOptions:
+    users: int = 1000
+    posts: int = 5000
+    tags: int = 30
+    avg_likes: float = 8.0
+    avg_comments: float = 4.0
+    draft_ratio: float = 0.05
+    days: int = 3 * 365
+    until: datetime = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+    body_variants: int = 200
+    batch_size: int = 5000
+    seed: int = 42
+    prefix: str = 'seed'
+    password: str = 'seed-password'
+    derived: bool = True
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Let bulk_create store the generated created_at/updated_at values"""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def power_law(rng, mean, alpha=1.5):
+    """Pareto-distributed integer with roughly the given mean"""
+    if mean <= 0:
+        return 0
+    return int(mean * (alpha - 1) / alpha * rng.paretovariate(alpha))
+
+
+def zipf_cum_weights(count, exponent=1.1):
+    return list(itertools.accumulate(1 / (rank ** exponent) for rank in range(1, count + 1)))
+
+
+def next_pk(model):
+    return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+
+class CorpusGenerator:
+    """Generates and inserts one corpus; every random choice comes from one seeded RNG"""
+
+    def __init__(self, options, log=None):
+        self.options = options
+        self.rng = random.Random(options.seed)
+        self.log = log or (lambda message: None)
+        self.counts = {'users': 0, 'posts': 0, 'tags': 0, 'likes': 0, 'comments': 0}
+        self.comment_texts = []
+
+    def sentence(self, low=6, high=16):
+        words = self.rng.choices(WORDS, k=self.rng.randint(low, high))
+        return ' '.join(words).capitalize() + '.'
+
+    def paragraph(self):
+        return ' '.join(self.sentence() for _ in range(self.rng.randint(2, 6)))
+
+    def html_body(self, variant):
+        """A post body: paragraphs with headings, lists, code, tables and images mixed in"""
+        rng = self.rng
+        blocks = []
+        for section in range(rng.randint(2, 8)):
+            blocks.append(f'<h2>{self.sentence(2, 5)[:-1]}</h2>')
+            for _ in range(rng.randint(1, 5)):
+                blocks.append(f'<p>{self.paragraph()}</p>')
+            roll = rng.random()
+            if roll < 0.25:
+                items = ''.join(f'<li>{self.sentence(3, 8)}</li>' for _ in range(rng.randint(3, 7)))
+                blocks.append(f'<ul>{items}</ul>')
+            elif roll < 0.45:
+                lines = '\n'.join(f'{rng.choice(WORDS)} = {rng.choice(WORDS)}({rng.randint(0, 99)})'
+                                  for _ in range(rng.randint(3, 12)))
+                blocks.append(f'<pre><code>{lines}</code></pre>')
+            elif roll < 0.6:
+                columns = rng.randint(2, 5)
+                head = ''.join(f'<th>{rng.choice(WORDS).title()}</th>' for _ in range(columns))
+                rows = ''.join(
+                    '<tr>' + ''.join(f'<td>{rng.randint(1, 9999)}</td>' for _ in range(columns)) + '</tr>'
+                    for _ in range(rng.randint(2, 10))
+                )
+                blocks.append(f'<table border="1"><thead><tr>{head}</tr></thead><tbody>{rows}</tbody></table>')
+            elif roll < 0.8:
+                blocks.append(
+                    f'<p><img src="{settings.MEDIA_URL}post_images/content/seed-{variant}-{section}.jpg" '
+                    f'alt="{self.sentence(2, 4)[:-1]}" width="{rng.choice((640, 800, 1200))}" '
+                    f'height="{rng.choice((360, 450, 675))}"></p>'
+                )
+            elif roll < 0.9:
+                blocks.append(f'<blockquote>{self.sentence()}</blockquote>')
+        return '\n'.join(blocks)
+
+    def build_comment_texts(self, count=500):
+        return [self.paragraph()[:2000] for _ in range(count)]
+
+    def build_bodies(self):
+        """Render a pool of bodies once; posts reuse them instead of sanitizing each one"""
+        bodies = []
+        for variant in range(max(1, self.options.body_variants)):
+            post = Post(content=self.html_body(variant))
+            post.render_content()
+            bodies.append({
+                'content': post.content,
+                'rendered_content': post.rendered_content,
+                'sanitizer_version': post.sanitizer_version,
+                'excerpt': post.excerpt,
+                'word_count': post.word_count,
+            })
+        return bodies
+
+    def create_tags(self):
+        names = list(TAG_NAMES[:self.options.tags])
+        names += [f'Topic {index}' for index in range(len(names), self.options.tags)]
+        slugs = [slugify(name) for name in names]
+        existing = set(Tag.objects.filter(slug__in=slugs).values_list('slug', flat=True))
+        Tag.objects.bulk_create(
+            [Tag(name=name, slug=slug) for name, slug in zip(names, slugs) if slug not in existing]
+        )
+        tags = dict(Tag.objects.filter(slug__in=slugs).values_list('slug', 'pk'))
+        self.counts['tags'] = len(slugs)
+        # Popularity follows list order
+        return [tags[slug] for slug in slugs]
+
+    def create_users(self):
+        options = self.options
+        password = make_password(options.password)
+        first_pk = next_pk(User)
+        start = options.until - timedelta(days=options.days)
+        for offset in range(0, options.users, options.batch_size):
+            users, profiles = [], []
+            for index in range(offset, min(offset + options.batch_size, options.users)):
+                pk = first_pk + index
+                username = f'{options.prefix}_user_{pk}'
+                users.append(User(
+                    pk=pk,
+                    username=username,
+                    email=f'{username}@example.com',
+                    password=password,
+                    first_name=self.rng.choice(WORDS).title(),
+                    last_name=self.rng.choice(WORDS).title(),
+                    date_joined=start + timedelta(seconds=self.rng.randrange(options.days * 86400)),
+                ))
+                profiles.append(Profile(user_id=pk, bio=self.sentence() if self.rng.random() < 0.6 else ''))
+            with transaction.atomic():
+                User.objects.bulk_create(users)
+                Profile.objects.bulk_create(profiles)
+            self.counts['users'] += len(users)
+            self.log(f'{self.counts["users"]} users')
+        return list(range(first_pk, first_pk + options.users))
+
+    def create_posts(self, user_ids, tag_ids):
+        options = self.options
+        rng = self.rng
+        bodies = self.build_bodies()
+        self.comment_texts = self.build_comment_texts()
+        author_weights = zipf_cum_weights(len(user_ids), exponent=0.8)
+        tag_weights = zipf_cum_weights(len(tag_ids))
+        first_post_pk = next_pk(Post)
+        next_comment_pk = next_pk(Comment)
+        span = options.days * 86400
+
+        for offset in range(0, options.posts, options.batch_size):
+            posts, post_tags, likes, comments = [], [], [], []
+            for index in range(offset, min(offset + options.batch_size, options.posts)):
+                pk = first_post_pk + index
+                title = self.sentence(3, 9)[:-1]
+                created_at = options.until - timedelta(seconds=rng.randrange(span))
+                published = rng.random() >= options.draft_ratio
+                published_at = created_at + timedelta(minutes=rng.randint(5, 3 * 24 * 60)) if published else None
+                post = Post(
+                    pk=pk,
+                    title=title,
+                    slug=f'{slugify(title)[:40]}-{pk}',
+                    summary=self.sentence() if rng.random() < 0.3 else '',
+                    author_id=rng.choices(user_ids, cum_weights=author_weights)[0],
+                    status='published' if published else 'draft',
+                    created_at=created_at,
+                    updated_at=published_at or created_at,
+                    published_at=published_at,
+                    **rng.choice(bodies),
+                )
+                for tag_id in set(rng.choices(tag_ids, cum_weights=tag_weights, k=rng.randint(1, 3))):
+                    post_tags.append(Post.tags.through(post_id=pk, tag_id=tag_id))
+
+                if published:
+                    likers = rng.sample(user_ids, min(len(user_ids), power_law(rng, options.avg_likes)))
+                    likes += [Post.likes.through(post_id=pk, user_id=user_id) for user_id in likers]
+                    post.like_count = len(likers)
+                    thread = self.comment_thread(post, user_ids, next_comment_pk)
+                    next_comment_pk += len(thread)
+                    comments += thread
+                    post.comment_count = sum(1 for comment in thread if comment.parent_id is None)
+                posts.append(post)
+
+            with transaction.atomic():
+                Post.objects.bulk_create(posts)
+                Post.tags.through.objects.bulk_create(post_tags)
+                Post.likes.through.objects.bulk_create(likes, batch_size=options.batch_size)
+                Comment.objects.bulk_create(comments, batch_size=options.batch_size)
+            self.counts['posts'] += len(posts)
+            self.counts['likes'] += len(likes)
+            self.counts['comments'] += len(comments)
+            self.log(f'{self.counts["posts"]} posts')
+
+    def comment_thread(self, post, user_ids, first_pk):
+        """Comments on `post`; replies usually continue the previous comment, so threads get deep"""
+        rng = self.rng
+        thread = []
+        created_at = post.published_at
+        for index in range(power_law(rng, self.options.avg_comments)):
+            roll = rng.random()
+            if not thread or roll < 0.35:
+                parent_id = None
+            elif roll < 0.8:
+                parent_id = thread[-1].pk
+            else:
+                parent_id = rng.choice(thread).pk
+            created_at += timedelta(minutes=rng.randint(1, 24 * 60))
+            thread.append(Comment(
+                pk=first_pk + index,
+                post_id=post.pk,
+                author_id=rng.choice(user_ids),
+                parent_id=parent_id,
+                content=rng.choice(self.comment_texts),
+                created_at=created_at,
+            ))
+        return thread
+
+    def refresh_derived_data(self):
+        """What the per-row signals would have maintained, recomputed set-based"""
+        self.log('Refreshing tag statistics, related posts and search vectors')
+        TagStat.refresh()
+        refresh_related_posts()
+        update_search_vectors(Post.objects.all())
+        bump_content_generation()
+        bump_engagement_generation()
+
+    def reset_sequences(self):
+        # Explicit primary keys bypass PostgreSQL sequences
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [User, Post, Comment]):
+                cursor.execute(sql)
+
+    def run(self):
+        with explicit_timestamps(Post, Comment):
+            tag_ids = self.create_tags()
+            user_ids = self.create_users()
+            if user_ids:
+                self.create_posts(user_ids, tag_ids)
+        self.reset_sequences()
+        if self.options.derived:
+            self.refresh_derived_data()
+        return self.counts
+
+
+def seed_corpus(options=None, log=None):
+    """Generate a corpus described by `options` (a SeedOptions); returns row counts"""
+    return CorpusGenerator(options or SeedOptions(), log).run()
@@ -0,0 +1,6 @@
+from django.dispatch import Signal
+
+# Sent by apps.blog.likes.toggle_like after a like is added or removed.
+# toggle_like writes the likes table directly, so m2m_changed is not sent.
+# Arguments: post, user, liked
+like_toggled = Signal()
@@ -1,27 +1,81 @@
+import hashlib
+
+from django.conf import settings
 from django.contrib.sitemaps import Sitemap
+from django.contrib.sitemaps.views import sitemap
+from django.core.cache import cache
+from django.db.models import Count, Max, Min
 from django.urls import reverse
-from .models import Post
-from taggit.models import Tag
+from .cache import get_content_generation
+from .models import Post, Tag
+
+
+def get_sitemap_page_size():
+    return getattr(settings, 'SITEMAP_PAGE_SIZE', 10000)
+
 
 class PostSitemap(Sitemap):
+    """
+    Published posts as (pk, slug, updated_at) rows; post bodies are never loaded.
+    """
     changefreq = 'weekly'
     priority = 0.9
 
+    @property
+    def limit(self):
+        return get_sitemap_page_size()
+
+    def get_queryset(self):
+        return Post.objects.filter(status='published').order_by('pk')
+
     def items(self):
-        return Post.objects.filter(status='published')
+        return self.get_queryset().values_list('pk', 'slug', 'updated_at')
+
+    def location(self, item):
+        pk, slug, _ = item
+        return reverse('blog:post_detail', kwargs={'pk': pk, 'slug': slug})
+
+    def lastmod(self, item):
+        return item[2]
+
+    def get_latest_lastmod(self):
+        # One aggregate instead of evaluating lastmod() for every post
+        return self.get_queryset().aggregate(latest=Max('updated_at'))['latest']
+
+    def page_stamp(self, page):
+        """
+        Identify the contents of a page without rendering it: the newest
+        updated_at in the page plus its id range and size, which also change
+        when posts are published, unpublished or deleted.
+        """
+        start = (page - 1) * self.limit
+        stamp = self.get_queryset()[start:start + self.limit].aggregate(
+            newest=Max('updated_at'), first=Min('pk'), last=Max('pk'), size=Count('pk')
+        )
+        return f"{stamp['newest']}:{stamp['first']}:{stamp['last']}:{stamp['size']}"
 
-    def lastmod(self, obj):
-        return obj.updated_at
 
 class TagSitemap(Sitemap):
+    """
+    Tag listings, which are the post list filtered by ?category=<slug>.
+    """
     changefreq = 'weekly'
     priority = 0.6
 
+    @property
+    def limit(self):
+        return get_sitemap_page_size()
+
     def items(self):
-        return Tag.objects.all()
+        return Tag.objects.order_by('pk').values_list('slug', flat=True)
+
+    def location(self, slug):
+        return f"{reverse('blog:post_list')}?category={slug}"
+
+    def page_stamp(self, page):
+        # Tags have no timestamps; tag saves and deletes bump the content generation
+        return str(get_content_generation())
 
-    def location(self, obj):
-        return reverse('blog:tag_detail', args=[obj.slug])
 
 class StaticViewSitemap(Sitemap):
     changefreq = 'monthly'
@@ -32,3 +86,31 @@ class StaticViewSitemap(Sitemap):
 
     def location(self, item):
         return reverse(item)
+
+
+def cached_sitemap(request, sitemaps, section, **kwargs):
+    """
+    Child sitemap view that caches each rendered page.
+
+    The cache key includes the page's stamp (see PostSitemap.page_stamp), so a
+    page is only re-rendered after something on it changed.
+    """
+    site = sitemaps.get(section)
+    if isinstance(site, type):
+        site = site()
+    try:
+        page = int(request.GET.get('p', 1))
+    except ValueError:
+        page = None
+    if site is None or page is None or page < 1 or not hasattr(site, 'page_stamp'):
+        return sitemap(request, sitemaps, section=section, **kwargs)
+
+    stamp = f'{request.scheme}://{request.get_host()}:{site.page_stamp(page)}'
+    key = f'blog:sitemap:{section}:{page}:{hashlib.sha1(stamp.encode("utf-8")).hexdigest()}'
+    response = cache.get(key)
+    if response is None:
+        response = sitemap(request, sitemaps, section=section, **kwargs)
+        response.render()
+        if response.status_code == 200:
+            cache.set(key, response, getattr(settings, 'SITEMAP_CACHE_TIMEOUT', 86400))
+    return response
@@ -0,0 +1,51 @@
+"""
+Tag listings backed by the materialized TagStat rows.
+
+Counting posts per tag means aggregating the whole post/tag M2M; TagStat keeps
+published post counts and last-used dates current instead (see the receivers in
+models.py), so the filter dropdowns and popular tag lists are plain reads.
+
+The full tag list is reference data (apps.core.refdata): kept in each worker's
+memory and reloaded everywhere when TagStat.refresh() or a tag change invalidates it.
+"""
+from django.db.models import F
+
+from apps.core.refdata import reference_data
+from .models import TagStat
+
+TAG_LIST = 'blog.tags'
+
+TAG_FIELDS = {
+    'id': F('tag_id'),
+    'name': F('tag__name'),
+    'slug': F('tag__slug'),
+    'post_count': F('published_post_count'),
+}
+
+
+def load_tag_list():
+    return tuple(TagStat.objects.order_by('tag__name').values('last_used_at', **TAG_FIELDS))
+
+
+reference_data.register(TAG_LIST, load_tag_list)
+
+
+def get_tag_list():
+    """Every tag as {id, name, slug, post_count, last_used_at}, ordered by name"""
+    return reference_data.get(TAG_LIST)
+
+
+def find_tag(slug):
+    """Return the get_tag_list() entry for `slug`, or None"""
+    if not slug:
+        return None
+    return next((tag for tag in get_tag_list() if tag['slug'] == slug), None)
+
+
+def get_popular_tags(limit):
+    """The `limit` tags with the most published posts, most recently used first on ties"""
+    return list(
+        TagStat.objects.filter(published_post_count__gt=0).order_by(
+            '-published_post_count', '-last_used_at'
+        ).values('last_used_at', **TAG_FIELDS)[:limit]
+    )
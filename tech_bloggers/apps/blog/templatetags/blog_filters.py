@@ -3,9 +3,10 @@ from django.utils.html import strip_tags
 from django.utils.safestring import mark_safe
 from django.conf import settings
 import bleach
-import re
 import html
 
+from ..utils import sanitize_content
+
 register = template.Library()
 
 @register.filter
@@ -68,28 +69,9 @@ def striptags_unescape(value):
 def safe_content(value):
     """
     Safely render HTML content by sanitizing it with bleach.
+    Prefer Post.rendered_html, which serves the stored render without re-running bleach.
     """
     if not value:
         return ""
     
-    # Use normal sanitization (secure)
-    sanitized = bleach.clean(
-        value,
-        tags=settings.BLEACH_ALLOWED_TAGS,
-        attributes=settings.BLEACH_ALLOWED_ATTRIBUTES,
-        css_sanitizer=bleach.css_sanitizer.CSSSanitizer(allowed_css_properties=settings.BLEACH_ALLOWED_STYLES),
-        protocols=settings.BLEACH_ALLOWED_PROTOCOLS,
-        strip_comments=True
-    )
-    
-    # Remove empty font tags and other problematic tags
-    # Remove empty font tags
-    sanitized = re.sub(r'<font[^>]*>\s*</font>', '', sanitized)
-    # Remove font tags that only contain whitespace or other empty font tags
-    sanitized = re.sub(r'<font[^>]*>\s*(<font[^>]*>\s*</font>\s*)*</font>', '', sanitized)
-    # Clean up empty tags but preserve empty paragraphs (needed for table spacing)
-    # Remove empty spans, divs, strongs, ems, but keep empty <p> tags
-    sanitized = re.sub(r'<(span|div|strong|em|b|i|u)[^>]*>\s*</\1>', '', sanitized)
-    
-    return mark_safe(sanitized)
-
+    return mark_safe(sanitize_content(value))
@@ -0,0 +1,154 @@
+"""
+Responsive image markup from the variants built by apps.blog.variants.
+
+{% responsive_image post.image alt=post.title sizes="(max-width: 768px) 100vw, 33vw" class="..." %}
+renders a <picture> with a WebP <source> and an <img> with a JPEG srcset. The <img>
+also gets the original's width and height, so the browser reserves the space before
+the image loads, and fallback=url swaps in another image if it fails to load. {{ post.rendered_html|responsive_images }} does the same for the
+content images in a post body, and {% image_variant_url post.image 320 "webp" %}
+picks a single size, e.g. for a CSS background.
+"""
+import html
+import re
+from urllib.parse import unquote
+
+from django import template
+from django.utils.html import escape, escapejs
+from django.utils.safestring import SafeData, mark_safe
+
+from ..images import UPLOAD_DIRECTORY
+from ..variants import get_image_variants
+
+register = template.Library()
+
+IMG_TAG_RE = re.compile(r'<img\b[^>]*>', re.IGNORECASE)
+ATTRIBUTE_RE = re.compile(r'([\w-]+)="([^"]*)"')
+# The post body column is at most 800px wide
+CONTENT_SIZES = '(max-width: 800px) 100vw, 800px'
+# The srcset and <source> would win over the new src, so they are dropped first
+FALLBACK_ONERROR = (
+    "this.onerror=null;this.removeAttribute('srcset');"
+    "this.parentNode.querySelectorAll('source').forEach(function(s){{s.remove()}});"
+    "this.src='{}'"
+)
+
+
+def _srcset(variants):
+    return ', '.join(f'{variant.url} {variant.width}w' for variant in variants)
+
+
+def _attributes(attrs):
+    return ''.join(
+        f' {name}="{escape(value)}"' for name, value in attrs.items() if value is not None and value is not False
+    )
+
+
+def picture_html(src, source_name, variants, sizes, attrs):
+    """
+    Markup for the image stored as `source_name` and served from `src`. `variants`
+    come from get_image_variants(). `attrs` are extra <img> attributes, unescaped.
+    Without resized variants this is a plain <img>, with width and height when known.
+    """
+    original = next((variant for variant in variants if variant.name == source_name), None)
+    resized = [variant for variant in variants if variant.name != source_name]
+    attrs = dict(attrs)
+    if original and original.width and 'width' not in attrs and 'height' not in attrs:
+        attrs['width'], attrs['height'] = original.width, original.height
+    if not resized:
+        return mark_safe(f'<img src="{escape(src)}"{_attributes(attrs)}>')
+
+    # The original (when its size is known) covers screens wider than the largest variant
+    full_size = [original] if original and original.width else []
+    webp = [variant for variant in resized if variant.format == 'webp'] + full_size
+    jpeg = [variant for variant in resized if variant.format == 'jpeg'] + full_size
+    return mark_safe(
+        '<picture>'
+        f'<source type="image/webp" srcset="{escape(_srcset(webp))}" sizes="{escape(sizes)}">'
+        f'<img src="{escape(src)}" srcset="{escape(_srcset(jpeg))}" sizes="{escape(sizes)}"{_attributes(attrs)}>'
+        '</picture>'
+    )
+
+
+def _variants_of(image):
+    """
+    Variants of an ImageField value: those set on the model instance by
+    attach_image_variants() when a list view prefetched them, or looked up (from the
+    cache, or one query).
+    """
+    variants = getattr(image.instance, 'image_variants', None)
+    if variants is None:
+        variants = get_image_variants([image.name]).get(image.name, [])
+    return variants
+
+
+@register.simple_tag
+def responsive_image(image, alt='', sizes='100vw', loading='lazy', fallback=None, **attrs):
+    """
+    Responsive markup for an ImageField value; extra keyword arguments become <img>
+    attributes. `fallback` is the URL of an image shown if this one fails to load.
+    """
+    if not image:
+        return ''
+    variants = _variants_of(image)
+    attrs = {
+        'alt': alt,
+        'loading': loading,
+        'decoding': 'async',
+        'onerror': FALLBACK_ONERROR.format(escapejs(fallback)) if fallback else None,
+        **{name.replace('_', '-'): value for name, value in attrs.items()},
+    }
+    return picture_html(image.url, image.name, variants, sizes, attrs)
+
+
+@register.simple_tag
+def image_variant_url(image, width, image_format='jpeg'):
+    """
+    URL of the narrowest `image_format` variant at least `width` pixels wide, or of
+    the original when there is none, e.g. for CSS backgrounds
+    """
+    if not image:
+        return ''
+    candidates = [
+        variant for variant in _variants_of(image)
+        if variant.name != image.name and variant.format == image_format and variant.width >= int(width)
+    ]
+    if not candidates:
+        return image.url
+    return min(candidates, key=lambda variant: variant.width).url
+
+
+def content_image_name(src):
+    """Storage name of an editor upload from its URL, or None for other images"""
+    start = src.find(f'{UPLOAD_DIRECTORY}/')
+    if start == -1:
+        return None
+    return unquote(src[start:].split('?')[0].split('#')[0])
+
+
+@register.filter
+def responsive_images(value):
+    """Give the editor uploads in sanitized post HTML a srcset, with one variant lookup"""
+    if not value or not isinstance(value, SafeData) or UPLOAD_DIRECTORY not in value:
+        return value
+
+    tags = []
+    for match in IMG_TAG_RE.finditer(value):
+        attrs = {name.lower(): html.unescape(attr) for name, attr in ATTRIBUTE_RE.findall(match.group())}
+        name = content_image_name(attrs.get('src', ''))
+        if name and 'srcset' not in attrs:
+            tags.append((match, name, attrs))
+    if not tags:
+        return value
+
+    variants = get_image_variants(name for _match, name, _attrs in tags)
+    parts, position = [], 0
+    for match, name, attrs in tags:
+        src = attrs.pop('src')
+        width = attrs.get('width', '')
+        sizes = f'(max-width: {width}px) 100vw, {width}px' if width.isdigit() else CONTENT_SIZES
+        attrs.setdefault('loading', 'lazy')
+        attrs.setdefault('decoding', 'async')
+        parts += [value[position:match.start()], picture_html(src, name, variants.get(name, []), sizes, attrs)]
+        position = match.end()
+    parts.append(value[position:])
+    return mark_safe(''.join(parts))
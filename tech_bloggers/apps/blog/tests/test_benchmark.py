@@ -0,0 +1,166 @@
+"""
+Tests for the endpoint benchmark runner and the benchmark_endpoints command
+"""
+import copy
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ..benchmark import (
+    BENCHMARK_USERNAME, BenchmarkOptions, BenchmarkRunner, check_budgets, compare_to_baseline, percentile
+)
+from ..cache import get_content_generation
+from ..models import Comment, Post, PostImage, Tag
+
+
+def endpoint_result(p95=10.0, queries=5, peak=100.0):
+    return {
+        'latency_ms': {'p50': p95 / 2, 'p95': p95, 'p99': p95},
+        'queries': {'median': queries, 'max': queries},
+        'memory_kib': {'peak_p50': peak, 'peak_max': peak},
+    }
+
+
+class BenchmarkTestCase(TestCase):
+    """Test cases for running endpoint benchmarks and comparing against baselines"""
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        tag = Tag.objects.create(name='Python', slug='python')
+        self.quiet = Post.objects.create(
+            title='Quiet post', content='<p>Quiet</p>', author=self.author,
+            status='published', published_at=timezone.now(),
+        )
+        self.busy = Post.objects.create(
+            title='Busy python post', content='<p>Busy</p>', author=self.author,
+            status='published', published_at=timezone.now(),
+        )
+        self.busy.tags.add(tag)
+        for index in range(3):
+            Comment.objects.create(post=self.busy, author=self.author, content=f'Comment {index}')
+
+    def test_runs_every_endpoint(self):
+        options = BenchmarkOptions(iterations=3, warmup=1, memory_iterations=1)
+        report = BenchmarkRunner(options).run()
+
+        self.assertEqual(report['meta']['iterations'], 3)
+        self.assertEqual(set(report['endpoints']), {
+            'index', 'post_list', 'post_list_search', 'search_suggest', 'post_detail', 'post_like', 'image_upload',
+            'rss_feed', 'atom_feed', 'sitemap_index', 'sitemap_posts',
+        })
+        for result in report['endpoints'].values():
+            self.assertEqual(result['status'], 200)
+            latency = result['latency_ms']
+            self.assertLessEqual(latency['p50'], latency['p95'])
+            self.assertLessEqual(latency['p95'], latency['p99'])
+            self.assertGreater(result['memory_kib']['peak_p50'], 0)
+
+        self.assertEqual(report['endpoints']['search_suggest']['latency_ms']['p99_budget'], 50)
+        self.assertIsNone(report['endpoints']['index']['latency_ms']['p99_budget'])
+        # The detail page benchmarked is the post with the most comments
+        self.assertIn(f'/{self.busy.pk}-', report['endpoints']['post_detail']['path'])
+        # Writes hit the database, and uploaded images are cleaned up
+        self.assertGreater(report['endpoints']['post_like']['queries']['max'], 0)
+        self.assertFalse(PostImage.objects.exists())
+        # The benchmark user created for the run is removed with its likes
+        self.assertFalse(User.objects.filter(username=BENCHMARK_USERNAME).exists())
+        self.assertEqual(Post.objects.get(pk=self.busy.pk).like_count, 0)
+
+    def test_only_and_unknown_endpoints(self):
+        report = BenchmarkRunner(BenchmarkOptions(iterations=1, warmup=0, memory_iterations=0, only=['rss_feed'])).run()
+        self.assertEqual(list(report['endpoints']), ['rss_feed'])
+        self.assertIsNone(report['endpoints']['rss_feed']['memory_kib']['peak_p50'])
+
+        with self.assertRaises(ValueError):
+            BenchmarkRunner(BenchmarkOptions(only=['missing']))
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile([7], 99), 7)
+
+    def test_compare_to_baseline(self):
+        baseline = {'endpoints': {'index': endpoint_result(), 'gone': endpoint_result()}}
+        report = {'endpoints': {'index': endpoint_result(p95=12.0, queries=5, peak=140.0), 'new': endpoint_result()}}
+        self.assertEqual(compare_to_baseline(report, baseline), [])
+
+        report = {'endpoints': {'index': endpoint_result(p95=20.0, queries=6, peak=200.0)}}
+        regressions = compare_to_baseline(report, baseline)
+        self.assertEqual(len(regressions), 3)
+        self.assertTrue(all(regression.startswith('index: ') for regression in regressions))
+
+        # Tolerances are configurable; tiny latencies get an absolute floor
+        self.assertEqual(compare_to_baseline(report, baseline, {'latency': 1.5, 'queries': 1, 'memory': 1.0}), [])
+        baseline = {'endpoints': {'index': endpoint_result(p95=0.5)}}
+        self.assertEqual(compare_to_baseline({'endpoints': {'index': endpoint_result(p95=1.5)}}, baseline), [])
+
+    def test_check_budgets(self):
+        within = endpoint_result(p95=40.0)
+        within['latency_ms']['p99_budget'] = 50
+        over = endpoint_result(p95=60.0)
+        over['latency_ms']['p99_budget'] = 50
+        report = {'endpoints': {'index': endpoint_result(p95=500.0), 'search_suggest': within}}
+        self.assertEqual(check_budgets(report), [])
+        report['endpoints']['search_suggest'] = over
+        self.assertEqual(check_budgets(report), ['search_suggest: p99 latency 60.0ms > 50ms budget'])
+
+    @override_settings(SEARCH_SUGGEST_P99_MS=-1)
+    def test_command_fails_over_budget_without_baseline(self):
+        with self.assertRaisesMessage(CommandError, 'search_suggest: p99 latency'):
+            call_command(
+                'benchmark_endpoints', iterations=1, warmup=0, memory_iterations=0, only=['search_suggest'],
+                allow_writes=True, stdout=StringIO(),
+            )
+
+    def test_command_saves_and_gates_on_baseline(self):
+        with tempfile.TemporaryDirectory() as directory:
+            baseline_path = os.path.join(directory, 'baseline.json')
+            call_command(
+                'benchmark_endpoints', iterations=2, warmup=0, memory_iterations=1, only=['rss_feed', 'post_list'],
+                save_baseline=baseline_path, allow_writes=True, stdout=StringIO(),
+            )
+            with open(baseline_path) as baseline_file:
+                baseline = json.load(baseline_file)
+            self.assertEqual(set(baseline['endpoints']), {'rss_feed', 'post_list'})
+
+            # A baseline with fewer queries than the current run is a regression
+            strict = copy.deepcopy(baseline)
+            strict['endpoints']['post_list']['queries']['max'] = -1
+            with open(baseline_path, 'w') as baseline_file:
+                json.dump(strict, baseline_file)
+            with self.assertRaisesMessage(CommandError, 'post_list:'):
+                call_command(
+                    'benchmark_endpoints', iterations=2, warmup=0, memory_iterations=0, only=['post_list'],
+                    baseline=baseline_path, latency_tolerance=100, allow_writes=True, stdout=StringIO(),
+                )
+
+    def test_command_requires_published_posts(self):
+        Post.objects.all().delete()
+        with self.assertRaisesMessage(CommandError, 'No published posts'):
+            call_command('benchmark_endpoints', iterations=1, allow_writes=True, stdout=StringIO())
+
+    def test_command_refuses_to_write_without_debug(self):
+        with self.assertRaisesMessage(CommandError, '--allow-writes'):
+            call_command('benchmark_endpoints', iterations=1, stdout=StringIO())
+        with self.settings(DEBUG=True):
+            call_command(
+                'benchmark_endpoints', iterations=1, warmup=0, memory_iterations=0, only=['rss_feed'],
+                stdout=StringIO(),
+            )
+
+    def test_cold_runs_leave_other_cache_entries_alone(self):
+        cache.set('unrelated', 'kept')
+        generation = get_content_generation()
+        BenchmarkRunner(BenchmarkOptions(iterations=2, warmup=0, memory_iterations=0, cold=True, only=['rss_feed'])).run()
+        self.assertEqual(cache.get('unrelated'), 'kept')
+        self.assertGreater(get_content_generation(), generation)
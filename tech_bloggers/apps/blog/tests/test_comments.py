@@ -0,0 +1,69 @@
+"""
+Tests for comment tree loading on the post detail page
+"""
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..comments import load_comment_tree
+from ..models import Comment, Post
+
+
+class CommentTreeTestCase(TestCase):
+    """Test cases for load_comment_tree and its use in PostDetailView"""
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.reader = User.objects.create_user(
+            username='reader', password='testpass123', first_name='Ada', last_name='Reader'
+        )
+        self.post = Post.objects.create(
+            title='Discussed Post',
+            content='<p>Discuss</p>',
+            author=self.author,
+            status='published'
+        )
+        self.first = Comment.objects.create(post=self.post, author=self.reader, content='First')
+        self.second = Comment.objects.create(post=self.post, author=self.author, content='Second')
+        self.reply = Comment.objects.create(
+            post=self.post, author=self.author, content='Reply', parent=self.first
+        )
+        self.hidden = Comment.objects.create(
+            post=self.post, author=self.reader, content='Hidden', active=False
+        )
+        Comment.objects.create(post=self.post, author=self.reader, content='Orphan', parent=self.hidden)
+
+    def test_tree_structure(self):
+        """Top-level comments are ordered and carry their replies"""
+        tree = load_comment_tree(self.post)
+        self.assertEqual(tree, [self.first, self.second])
+        self.assertEqual(tree[0].children, [self.reply])
+        self.assertEqual(tree[1].children, [])
+
+    def test_single_query_with_authors(self):
+        """The whole tree, authors included, costs one query"""
+        with CaptureQueriesContext(connection) as queries:
+            tree = load_comment_tree(self.post)
+            names = [comment.author.get_full_name() for comment in tree + tree[0].children]
+        self.assertEqual(len(queries.captured_queries), 1)
+        self.assertEqual(names, ['Ada Reader', '', ''])
+
+    def test_detail_page_renders_tree(self):
+        """The detail page shows active comments and replies only"""
+        many = [
+            Comment(post=self.post, author=self.reader, content=f'Bulk {index}')
+            for index in range(30)
+        ]
+        Comment.objects.bulk_create(many)
+        url = reverse('blog:post_detail', kwargs={'pk': self.post.pk, 'slug': self.post.slug})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertContains(response, 'Ada Reader')
+        self.assertContains(response, 'Reply')
+        self.assertContains(response, 'Bulk 29')
+        self.assertNotContains(response, 'Hidden')
+        self.assertNotContains(response, 'Orphan')
+        comment_queries = [q for q in queries.captured_queries if 'FROM "blog_comment"' in q['sql']]
+        self.assertEqual(len(comment_queries), 1)
@@ -0,0 +1,109 @@
+"""
+Tests for conditional GET (ETag / Last-Modified) on posts, feeds and the sitemap
+"""
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+
+from ..cache import CONTENT_CHANGED_AT_KEY
+from ..models import Comment, Post
+
+
+class ConditionalGetTestCase(TestCase):
+    """Test cases for ETag and Last-Modified validators"""
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.reader = User.objects.create_user(username='reader', password='testpass123')
+        self.post = Post.objects.create(
+            title='Validated Post',
+            content='<p>Body</p>',
+            author=self.author,
+            status='published'
+        )
+        self.detail_url = reverse('blog:post_detail', kwargs={'pk': self.post.pk, 'slug': self.post.slug})
+
+    def test_detail_not_modified(self):
+        response = self.client.get(self.detail_url)
+        etag = response['ETag']
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_detail_etag_changes_with_comments_and_users(self):
+        etag = self.client.get(self.detail_url)['ETag']
+
+        Comment.objects.create(post=self.post, author=self.reader, content='New comment')
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        self.client.force_login(self.reader)
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(LIKE_WRITE_BEHIND=True, RATELIMIT_ENABLE=False)
+    def test_detail_etag_changes_when_user_likes_with_write_behind(self):
+        """A buffered like leaves like_count alone, but the page shows the new like state"""
+        self.client.force_login(self.reader)
+        etag = self.client.get(self.detail_url)['ETag']
+
+        like_url = reverse('blog:post_like', kwargs={'pk': self.post.pk, 'slug': self.post.slug})
+        with mock.patch('apps.blog.likes.ATOMIC_INCR_BACKENDS', (LocMemCache,)):
+            self.assertEqual(self.client.post(like_url).json()['liked'], True)
+        self.assertEqual(Post.objects.get(pk=self.post.pk).like_count, 0)
+
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'data-liked="true"')
+
+    def test_feed_not_modified_without_rendering(self):
+        url = reverse('blog:post_feed')
+        response = self.client.get(url)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries.captured_queries), 0)
+
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_feed_changes_after_post_update(self):
+        url = reverse('blog:post_atom_feed')
+        etag = self.client.get(url)['ETag']
+        self.post.title = 'Updated Title'
+        self.post.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Updated Title')
+
+    def test_sitemap_last_modified(self):
+        url = reverse('django.contrib.sitemaps.views.index')
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=http_date(self.post.updated_at.timestamp()))
+        self.assertEqual(response.status_code, 304)
+
+    def test_feed_modified_after_post_deleted(self):
+        """Deleting a post leaves MAX(updated_at) alone but still moves Last-Modified forward"""
+        other = Post.objects.create(title='Older Post', content='<p>Body</p>', author=self.author, status='published')
+        an_hour_ago = timezone.now() - timezone.timedelta(hours=1)
+        Post.objects.update(updated_at=an_hour_ago)
+        cache.set(CONTENT_CHANGED_AT_KEY, an_hour_ago)
+
+        url = reverse('blog:post_feed')
+        last_modified = self.client.get(url)['Last-Modified']
+        self.assertEqual(last_modified, http_date(an_hour_ago.timestamp()))
+
+        other.delete()
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'Older Post')
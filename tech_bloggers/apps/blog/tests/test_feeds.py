@@ -0,0 +1,95 @@
+"""
+Tests for the RSS/Atom feeds
+"""
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Post, Tag
+
+
+class FeedTestCase(TestCase):
+    """Test cases for the latest, per-tag and per-author feeds"""
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(
+            username='author', password='testpass123', first_name='Grace', last_name='Hopper'
+        )
+        self.other = User.objects.create_user(username='other', password='testpass123')
+        self.python = Tag.objects.create(name='Python', slug='python')
+        self.rust = Tag.objects.create(name='Rust', slug='rust')
+        now = timezone.now()
+        for index in range(6):
+            post = Post.objects.create(
+                title=f'Python post {index}',
+                content=f'<p>Python body {index}</p>',
+                author=self.author,
+                status='published',
+                published_at=now - timedelta(days=7 - index)
+            )
+            post.tags.add(self.python)
+        post = Post.objects.create(
+            title='Rust post',
+            content='<p>Rust body</p>',
+            author=self.other,
+            status='published',
+            published_at=now
+        )
+        post.tags.add(self.rust, self.python)
+
+    def test_latest_feed_uses_excerpts(self):
+        response = self.client.get(reverse('blog:post_feed'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Python body 5')
+        self.assertNotContains(response, '&lt;p&gt;')
+        self.assertContains(response, '<category>Python</category>', count=5)
+
+    @override_settings(FEED_ITEM_COUNT=3)
+    def test_item_count_is_configurable(self):
+        response = self.client.get(reverse('blog:post_atom_feed'))
+        self.assertContains(response, '<entry>', count=3)
+
+    def test_feed_queries_do_not_grow_with_items(self):
+        """Tags are prefetched rather than loaded per item"""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('blog:post_feed'))
+        tag_queries = [q for q in queries.captured_queries if 'FROM "blog_tag"' in q['sql']]
+        self.assertEqual(len(tag_queries), 1)
+
+    def test_tag_feed(self):
+        response = self.client.get(reverse('blog:tag_feed', kwargs={'slug': 'rust'}))
+        self.assertContains(response, 'Tech-In-Bytes - Rust')
+        self.assertContains(response, '<item>', count=1)
+        self.assertContains(response, 'Rust post')
+
+        response = self.client.get(reverse('blog:tag_atom_feed', kwargs={'slug': 'missing'}))
+        self.assertEqual(response.status_code, 404)
+
+    def test_author_feed(self):
+        response = self.client.get(reverse('blog:author_feed', kwargs={'username': 'author'}))
+        self.assertContains(response, 'Posts by Grace Hopper')
+        self.assertNotContains(response, 'Rust post')
+
+    def test_serialized_feed_is_cached_until_publish(self):
+        url = reverse('blog:tag_feed', kwargs={'slug': 'python'})
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        self.assertEqual(len(queries.captured_queries), 0)
+
+        post = Post.objects.create(
+            title='Fresh Python post',
+            content='<p>Fresh</p>',
+            author=self.author,
+            status='published',
+            published_at=timezone.now()
+        )
+        post.tags.add(self.python)
+        self.assertContains(self.client.get(url), 'Fresh Python post')
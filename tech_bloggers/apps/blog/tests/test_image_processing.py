@@ -0,0 +1,219 @@
+"""
+Tests for background processing of editor image uploads
+"""
+import shutil
+import tempfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from ..forms import PostForm
+from ..images import ImageLimits, reencode_image
+from ..models import ImageUsage, Post, PostImage
+
+
+def jpeg_with_exif(size=(300, 200)):
+    exif = Image.Exif()
+    exif[0x010F] = 'Camera Maker'  # Make
+    buffer = BytesIO()
+    Image.new('RGB', size, (10, 90, 160)).save(buffer, format='JPEG', quality=100, exif=exif.tobytes())
+    return buffer.getvalue()
+
+
+@override_settings(IMAGE_PROCESSING_MODE='background', RATELIMIT_ENABLE=False)
+class BackgroundImageProcessingTestCase(TestCase):
+    """Test cases for background-mode uploads, process_images and the URL swap"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.user = User.objects.create_user(username='writer', password='testpass123')
+        self.client.force_login(self.user)
+
+    def upload(self, data=None, name='photo.jpg'):
+        uploaded = SimpleUploadedFile(name, data or jpeg_with_exif(), content_type='image/jpeg')
+        response = self.client.post(reverse('blog:image_upload'), {'file': uploaded})
+        self.assertEqual(response.status_code, 200)
+        return response.json()['location']
+
+    def process(self):
+        out = StringIO()
+        call_command('process_images', once=True, workers=1, stdout=out)
+        return out.getvalue()
+
+    def save_post(self, content, instance=None, status='published', title='Photos'):
+        form = PostForm(
+            data={'title': title, 'content': content, 'summary': 'Summary', 'tags_input': ''},
+            instance=instance,
+        )
+        form.user = self.user
+        self.assertTrue(form.is_valid(), form.errors)
+        form.instance.author = self.user
+        form.instance.status = status
+        return form.save()
+
+    def test_upload_stores_original_and_returns_url(self):
+        data = jpeg_with_exif()
+        location = self.upload(data)
+
+        image = PostImage.objects.get()
+        self.assertEqual(image.processing_status, PostImage.PROCESSING_PENDING)
+        self.assertTrue(location.endswith(image.image.name))
+        with default_storage.open(image.image.name) as stored:
+            self.assertEqual(stored.read(), data)
+        self.assertEqual((image.width, image.height, image.file_size), (300, 200, len(data)))
+
+    def test_unsupported_format_is_processed_in_request(self):
+        buffer = BytesIO()
+        Image.new('P', (40, 40)).save(buffer, format='GIF')
+        self.upload(buffer.getvalue(), name='anim.gif')
+
+        image = PostImage.objects.get()
+        self.assertEqual(image.processing_status, PostImage.PROCESSING_READY)
+        self.assertTrue(image.image.name.endswith('.png'))
+
+    @override_settings(IMAGE_PROCESSING_MODE='sync')
+    def test_sync_mode_reencodes_in_request(self):
+        self.upload()
+        image = PostImage.objects.get()
+        self.assertEqual(image.processing_status, PostImage.PROCESSING_READY)
+        with Image.open(default_storage.open(image.image.name)) as img:
+            self.assertNotIn('exif', img.info)
+
+    def test_process_images_reencodes_and_strips_metadata(self):
+        self.upload()
+        original = PostImage.objects.get().image.name
+
+        self.assertIn('Successfully processed 1 images (0 failed)', self.process())
+        image = PostImage.objects.get()
+        self.assertEqual(image.processing_status, PostImage.PROCESSING_READY)
+        self.assertNotEqual(image.image.name, original)
+        self.assertEqual((image.source_name, image.source_stored), (original, True))
+        with Image.open(default_storage.open(image.image.name)) as img:
+            self.assertNotIn('exif', img.info)
+        self.assertEqual(image.file_size, default_storage.size(image.image.name))
+        self.assertEqual(ImageUsage.objects.get(user=self.user).total_bytes, image.file_size)
+
+    def test_saving_post_swaps_to_processed_image(self):
+        location = self.upload()
+        self.process()
+        image = PostImage.objects.get()
+
+        post = self.save_post(f'<p>Look</p><img src="{location}" alt="photo">')
+        self.assertIn(image.image.name, post.content)
+        self.assertNotIn(image.source_name, post.content)
+        self.assertIn(image.image.name, Post.objects.get(pk=post.pk).rendered_content)
+
+        image.refresh_from_db()
+        self.assertEqual(image.post, post)
+        self.assertFalse(image.source_stored)
+        self.assertFalse(default_storage.exists(image.source_name))
+
+        # A stale editor still pointing at the original keeps the image
+        post = self.save_post(f'<img src="{location}" alt="photo">', instance=Post.objects.get(pk=post.pk))
+        self.assertIn(image.image.name, post.content)
+        self.assertTrue(PostImage.objects.filter(pk=image.pk).exists())
+
+    def test_processing_swaps_attached_post(self):
+        location = self.upload()
+        post = self.save_post(f'<img src="{location}" alt="photo">', status='draft')
+        image = PostImage.objects.get()
+        self.assertEqual(image.post, post)
+        self.assertIn(image.image.name, post.content)  # Still the original
+
+        self.process()
+        image.refresh_from_db()
+        post.refresh_from_db()
+        self.assertIn(image.image.name, post.content)
+        self.assertNotIn(image.source_name, post.content)
+        self.assertFalse(default_storage.exists(image.source_name))
+
+    def test_claim_skips_running_and_reclaims_stale(self):
+        self.upload()
+        self.upload()
+        claimed = PostImage.claim_pending(limit=1)
+        self.assertEqual(len(claimed), 1)
+        self.assertEqual(len(PostImage.claim_pending(limit=5)), 1)
+        self.assertEqual(PostImage.claim_pending(limit=5), [])
+
+        PostImage.objects.filter(pk=claimed[0].pk).update(processing_started_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual([image.pk for image in PostImage.claim_pending(limit=5, stale_after=60)], [claimed[0].pk])
+
+    def test_publishing_processes_pending_images(self):
+        location = self.upload()
+        with mock.patch('apps.blog.images.reencode_image', wraps=reencode_image) as reencode:
+            post = self.save_post(f'<img src="{location}" alt="photo">')
+        self.assertEqual(reencode.call_args.kwargs, {'fast': True})
+        image = PostImage.objects.get()
+        self.assertEqual(image.processing_status, PostImage.PROCESSING_READY)
+        self.assertIn(image.image.name, post.content)
+        self.assertFalse(default_storage.exists(image.source_name))
+        with Image.open(default_storage.open(image.image.name)) as img:
+            self.assertNotIn('exif', img.info)
+        self.assertIn('Successfully processed 0 images', self.process())
+
+        # Publishing a draft from the manage page does the same
+        location = self.upload()
+        draft = self.save_post(f'<img src="{location}" alt="photo">', status='draft', title='Draft photos')
+        self.client.post(reverse('blog:post_publish', kwargs={'pk': draft.pk, 'slug': draft.slug}))
+        image = PostImage.objects.get(post=draft)
+        self.assertEqual(image.processing_status, PostImage.PROCESSING_READY)
+        self.assertIn(image.image.name, Post.objects.get(pk=draft.pk).content)
+
+    def test_unreadable_image_is_deleted_and_reported(self):
+        location = self.upload()
+        image = PostImage.objects.get()
+        default_storage.delete(image.image.name)
+        default_storage.save(image.image.name, ContentFile(b'not an image'))
+
+        self.assertIn('(1 failed)', self.process())
+        image.refresh_from_db()
+        self.assertEqual(image.processing_status, PostImage.PROCESSING_FAILED)
+        # The original is never served as it was uploaded
+        self.assertFalse(default_storage.exists(image.image.name))
+        self.assertEqual(image.file_size, 0)
+        self.assertEqual(ImageUsage.objects.get(user=self.user).total_bytes, 0)
+
+        form = PostForm(data={'title': 'Photos', 'content': f'<img src="{location}" alt="photo">', 'tags_input': ''})
+        form.user = self.user
+        self.assertFalse(form.is_valid())
+        self.assertIn('could not be processed and were removed: photo.jpg.', str(form.non_field_errors()))
+
+    def test_deleting_image_removes_both_files(self):
+        self.upload()
+        self.process()
+        image = PostImage.objects.get()
+        names = (image.image.name, image.source_name)
+        image.delete()
+        self.assertFalse(any(default_storage.exists(name) for name in names))
+
+    def test_reencode_limits_size(self):
+        data, image_format, width, height = reencode_image(
+            jpeg_with_exif((400, 100)), ImageLimits(max_width=200, max_height=200, max_pixels=10 ** 6)
+        )
+        self.assertEqual((image_format, width, height), ('JPEG', 200, 50))
+
+    def test_fast_reencode_strips_metadata(self):
+        limits = ImageLimits(max_width=200, max_height=200, max_pixels=10 ** 6)
+        for image_format in ('JPEG', 'PNG', 'WEBP'):
+            buffer = BytesIO()
+            exif = Image.Exif()
+            exif[0x010F] = 'Camera Maker'
+            Image.new('RGB', (400, 100), (10, 90, 160)).save(buffer, format=image_format, exif=exif.tobytes())
+            data, reencoded_format, width, height = reencode_image(buffer.getvalue(), limits, fast=True)
+            self.assertEqual((reencoded_format, width, height), (image_format, 200, 50))
+            with Image.open(BytesIO(data)) as img:
+                self.assertNotIn('exif', img.info)
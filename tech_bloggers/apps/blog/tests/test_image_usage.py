@@ -0,0 +1,128 @@
+"""
+Tests for stored image metadata and the per-user image usage ledger
+"""
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from ..models import ImageUsage, PostImage
+
+
+def png_file(size=(120, 80), name='photo.png'):
+    buffer = BytesIO()
+    Image.new('RGB', size, (200, 30, 30)).save(buffer, format='PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+class ImageUsageTestCase(TestCase):
+    """Test cases for upload metadata, the usage ledger and backfill_image_metadata"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        media = override_settings(MEDIA_ROOT=self.media_root, RATELIMIT_ENABLE=False)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.user = User.objects.create_user(username='writer', password='testpass123')
+        self.client.force_login(self.user)
+
+    def upload(self, **kwargs):
+        return self.client.post(reverse('blog:image_upload'), {'file': png_file(**kwargs)})
+
+    def store_legacy_image(self, name, content=b'x' * 2048):
+        """A PostImage from before metadata was stored: no size, no ledger entry"""
+        path = default_storage.save(f'post_images/content/{name}', ContentFile(content))
+        image = PostImage.objects.create(image=path, uploaded_by=self.user)
+        PostImage.objects.filter(pk=image.pk).update(file_size=None)
+        ImageUsage.objects.filter(user=self.user).delete()
+        return path
+
+    def test_upload_stores_metadata_and_usage(self):
+        response = self.upload(size=(120, 80))
+        self.assertEqual(response.status_code, 200)
+
+        image = PostImage.objects.get()
+        self.assertEqual((image.width, image.height, image.content_type), (120, 80, 'image/png'))
+        self.assertEqual(image.file_size, default_storage.size(image.image.name))
+
+        usage = ImageUsage.objects.get(user=self.user)
+        self.assertEqual((usage.image_count, usage.total_bytes), (1, image.file_size))
+
+        self.upload()
+        usage.refresh_from_db()
+        self.assertEqual(usage.image_count, 2)
+        self.assertEqual(usage.total_bytes, sum(PostImage.objects.values_list('file_size', flat=True)))
+
+    def test_delete_releases_usage(self):
+        self.upload()
+        self.upload()
+        first, second = PostImage.objects.order_by('pk')
+        first.delete()
+        usage = ImageUsage.objects.get(user=self.user)
+        self.assertEqual((usage.image_count, usage.total_bytes), (1, second.file_size))
+
+        # Queryset deletes (e.g. the orphan cleanup) go through the receivers too
+        PostImage.objects.all().delete()
+        usage.refresh_from_db()
+        self.assertEqual((usage.image_count, usage.total_bytes), (0, 0))
+
+    def test_quota_check_is_one_read(self):
+        self.upload()
+        with self.assertNumQueries(1):
+            self.assertEqual(PostImage.get_user_image_count(self.user), 1)
+        newcomer = User.objects.create_user(username='newcomer')
+        with self.assertNumQueries(1):
+            self.assertEqual(PostImage.get_user_storage_mb(newcomer), 0)
+
+    @override_settings(MAX_IMAGES_PER_USER=1)
+    def test_upload_rejected_at_limit(self):
+        self.assertEqual(self.upload().status_code, 200)
+        response = self.upload()
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Image limit reached', response.json()['error'])
+        self.assertEqual(PostImage.objects.count(), 1)
+
+    def test_deleting_user_removes_ledger(self):
+        self.upload()
+        self.user.delete()
+        self.assertFalse(ImageUsage.objects.exists())
+        self.assertFalse(PostImage.objects.exists())
+
+    def test_backfill_command(self):
+        self.upload()
+        legacy_path = self.store_legacy_image('legacy.jpg')
+        missing_path = self.store_legacy_image('missing.png')
+        default_storage.delete(missing_path)
+
+        out = StringIO()
+        call_command('backfill_image_metadata', workers=2, batch_size=1, stdout=out)
+        self.assertIn('Successfully backfilled 1 images (1 files missing)', out.getvalue())
+
+        legacy = PostImage.objects.get(image=legacy_path)
+        self.assertEqual((legacy.file_size, legacy.content_type), (2048, 'image/jpeg'))
+        self.assertIsNone(PostImage.objects.get(image=missing_path).file_size)
+
+        # The ledger is recomputed from the stored sizes
+        usage = ImageUsage.objects.get(user=self.user)
+        self.assertEqual(usage.image_count, 3)
+        self.assertEqual(usage.total_bytes, sum(
+            size or 0 for size in PostImage.objects.values_list('file_size', flat=True)
+        ))
+
+    def test_backfill_dimensions(self):
+        self.upload(size=(64, 48))
+        image = PostImage.objects.get()
+        PostImage.objects.filter(pk=image.pk).update(width=None, height=None)
+
+        call_command('backfill_image_metadata', '--all', '--dimensions', stdout=StringIO())
+        image.refresh_from_db()
+        self.assertEqual((image.width, image.height), (64, 48))
@@ -0,0 +1,243 @@
+"""
+Tests for responsive image variants and their template tags
+"""
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+from PIL import Image
+
+from ..models import ImageVariant, Post, PostImage
+from ..variants import attach_image_variants, build_variants, get_image_variants, pending_variant_sources
+
+
+def image_bytes(size=(1000, 500), image_format='JPEG', mode='RGB'):
+    buffer = BytesIO()
+    Image.new(mode, size, (20, 120, 200, 128) if mode == 'RGBA' else (20, 120, 200)).save(buffer, format=image_format)
+    return buffer.getvalue()
+
+
+@override_settings(
+    IMAGE_VARIANT_WIDTHS=[320, 640, 1280], IMAGE_PROCESSING_MODE='sync', IMAGE_VARIANTS_IN_REQUEST=True,
+    RATELIMIT_ENABLE=False,
+)
+class ImageVariantTestCase(TestCase):
+    """Test cases for variant generation, cleanup and the responsive image tags"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        cache.clear()
+        self.user = User.objects.create_user(username='writer', password='testpass123')
+
+    def create_post(self, size=(1000, 500), title='Pictures'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Post.objects.create(
+                title=title, content='<p>Pictures</p>', author=self.user, status='published',
+                published_at=timezone.now(),
+                image=SimpleUploadedFile('cover.jpg', image_bytes(size), content_type='image/jpeg'),
+            )
+
+    def render(self, source, **context):
+        return Template('{% load image_tags %}' + source).render(Context(context))
+
+    def test_build_variants_sizes_and_formats(self):
+        built = build_variants(image_bytes((1000, 500)), [320, 640, 1280], 10 ** 7)
+        self.assertEqual((built.format, built.width, built.height), ('JPEG', 1000, 500))
+        self.assertEqual(
+            [(fmt, width, height) for fmt, width, height, _data in built.variants],
+            [('WEBP', 320, 160), ('JPEG', 320, 160), ('WEBP', 640, 320), ('JPEG', 640, 320)],
+        )
+
+        # Transparent images keep alpha in WebP and are flattened for JPEG
+        built = build_variants(image_bytes((800, 400), 'PNG', 'RGBA'), [320], 10 ** 7)
+        modes = {fmt: Image.open(BytesIO(data)).mode for fmt, _w, _h, data in built.variants}
+        self.assertEqual(modes, {'WEBP': 'RGBA', 'JPEG': 'RGB'})
+
+        # Images narrower than every width get none
+        self.assertEqual(build_variants(image_bytes((200, 100)), [320], 10 ** 7).variants, [])
+
+    def test_featured_image_variants_are_generated_and_cleaned_up(self):
+        post = self.create_post()
+        source = post.image.name
+        variants = ImageVariant.objects.filter(source_name=source)
+        self.assertEqual(
+            sorted(variants.values_list('format', 'width')),
+            [('jpeg', 320), ('jpeg', 640), ('jpeg', 1000), ('webp', 320), ('webp', 640)],
+        )
+        names = [variant.name for variant in variants if not variant.is_original]
+        self.assertTrue(all(default_storage.exists(name) for name in names))
+        self.assertTrue(all('/variants/' in name for name in names))
+
+        # Replacing the image replaces its variants
+        with self.captureOnCommitCallbacks(execute=True):
+            post.image = SimpleUploadedFile('other.jpg', image_bytes((700, 350)), content_type='image/jpeg')
+            post.save()
+        self.assertFalse(ImageVariant.objects.filter(source_name=source).exists())
+        self.assertFalse(any(default_storage.exists(name) for name in names))
+        self.assertEqual(ImageVariant.objects.filter(source_name=post.image.name).count(), 5)
+
+        # Saving other fields leaves them alone
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            post.title = 'Renamed'
+            post.save()
+        self.assertEqual(callbacks, [])
+
+        post.delete()
+        self.assertFalse(ImageVariant.objects.exists())
+
+    @override_settings(IMAGE_VARIANTS_IN_REQUEST=False)
+    def test_variants_are_queued_for_process_images(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            post = Post.objects.create(
+                title='Queued', content='<p>Queued</p>', author=self.user, status='published',
+                image=SimpleUploadedFile('cover.jpg', image_bytes(), content_type='image/jpeg'),
+            )
+        self.assertEqual(callbacks, [])
+        self.assertFalse(ImageVariant.objects.exists())
+        self.assertTrue(Post.objects.get(pk=post.pk).variants_pending)
+
+        # process_images reads the flag instead of looking for images without variants
+        out = StringIO()
+        with self.assertNumQueries(2):
+            self.assertEqual(pending_variant_sources(10), [post.image.name])
+        call_command('process_images', once=True, workers=1, stdout=out)
+        self.assertIn('built variants of 1 images', out.getvalue())
+        self.assertEqual(ImageVariant.objects.filter(source_name=post.image.name).count(), 5)
+        self.assertFalse(Post.objects.get(pk=post.pk).variants_pending)
+        self.assertEqual(pending_variant_sources(10), [])
+
+    def test_content_image_upload_generates_variants(self):
+        self.client.force_login(self.user)
+        uploaded = SimpleUploadedFile('photo.jpg', image_bytes((900, 600)), content_type='image/jpeg')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('blog:image_upload'), {'file': uploaded})
+        self.assertEqual(response.status_code, 200)
+
+        image = PostImage.objects.get()
+        self.assertEqual(ImageVariant.objects.filter(source_name=image.image.name).count(), 5)
+        names = list(ImageVariant.objects.exclude(name=image.image.name).values_list('name', flat=True))
+        image.delete()
+        self.assertFalse(ImageVariant.objects.exists())
+        self.assertFalse(any(default_storage.exists(name) for name in names))
+
+    @override_settings(IMAGE_PROCESSING_MODE='background')
+    def test_process_images_builds_variants_after_reencoding(self):
+        self.client.force_login(self.user)
+        uploaded = SimpleUploadedFile('photo.jpg', image_bytes((900, 600)), content_type='image/jpeg')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('blog:image_upload'), {'file': uploaded})
+        self.assertFalse(ImageVariant.objects.exists())
+        self.assertEqual(ImageVariant.sources_without_variants(), [])  # Pending
+
+        out = StringIO()
+        call_command('process_images', once=True, workers=1, stdout=out)
+        self.assertIn('built variants of 1 images', out.getvalue())
+        image = PostImage.objects.get()
+        self.assertFalse(image.variants_pending)
+        self.assertEqual(ImageVariant.objects.filter(source_name=image.image.name).count(), 5)
+        self.assertFalse(ImageVariant.objects.filter(source_name=image.source_name).exists())
+
+    def test_generate_image_variants_command(self):
+        post = Post.objects.create(
+            title='Legacy', content='<p>Legacy</p>', author=self.user, status='published',
+            image=default_storage.save('post_images/legacy.png', ContentFile(image_bytes((800, 400), 'PNG'))),
+        )
+        missing = Post.objects.create(
+            title='Missing', content='<p>Missing</p>', author=self.user, status='published',
+            image='post_images/missing.png',
+        )
+        self.assertEqual(
+            sorted(ImageVariant.sources_without_variants()), sorted([post.image.name, missing.image.name])
+        )
+
+        out = StringIO()
+        call_command('generate_image_variants', workers=1, batch_size=1, stdout=out)
+        self.assertIn('Successfully built variants of 1 images (1 failed)', out.getvalue())
+        self.assertEqual(ImageVariant.objects.filter(source_name=post.image.name).count(), 5)
+        # The missing file is recorded without a size so it is not retried
+        self.assertEqual(ImageVariant.objects.get(source_name=missing.image.name).width, 0)
+        self.assertEqual(ImageVariant.sources_without_variants(), [])
+
+        out = StringIO()
+        call_command('generate_image_variants', stdout=out)
+        self.assertIn('nothing to generate', out.getvalue())
+
+    def test_responsive_image_tag(self):
+        post = self.create_post()
+        html = self.render('{% responsive_image post.image alt=post.title sizes="50vw" class="cover" %}', post=post)
+        self.assertIn('<picture><source type="image/webp"', html)
+        self.assertRegex(html, r'srcset="[^"]+-320w\.webp 320w, [^"]+-640w\.webp 640w, [^"]+cover[^"]*\.jpg 1000w"')
+        self.assertRegex(html, r'<img src="[^"]+cover[^"]*\.jpg" srcset="[^"]+-320w\.jpg 320w')
+        for attribute in ('sizes="50vw"', 'width="1000"', 'height="500"', 'alt="Pictures"',
+                          'loading="lazy"', 'class="cover"'):
+            self.assertIn(attribute, html)
+        self.assertNotIn('onerror', html)
+
+        # A fallback replaces the whole <picture> when the image fails to load
+        html = self.render('{% responsive_image post.image fallback="/static/default.jpg" %}', post=post)
+        self.assertIn("this.removeAttribute(&#x27;srcset&#x27;)", html)
+        self.assertIn("this.src=&#x27;/static/default.jpg&#x27;", html)
+
+        # Variants attached by a list view are used without a lookup
+        post = Post.objects.get(pk=post.pk)
+        attach_image_variants([post])
+        with self.assertNumQueries(0):
+            self.render('{% responsive_image post.image %}', post=post)
+
+        # Images too small for any variant (or not processed yet) get a plain <img>
+        small = self.create_post(size=(200, 100), title='Small')
+        html = self.render('{% responsive_image post.image alt="Small" %}', post=small)
+        self.assertNotIn('<picture>', html)
+        self.assertIn('width="200" height="100"', html)
+        self.assertEqual(self.render('{% responsive_image post.image %}', post=Post(title='None')), '')
+
+    def test_image_variant_url_tag(self):
+        post = self.create_post()
+        self.assertRegex(self.render('{% image_variant_url post.image 300 "webp" %}', post=post), r'-320w\.webp$')
+        self.assertRegex(self.render('{% image_variant_url post.image 500 %}', post=post), r'-640w\.jpg$')
+        self.assertEqual(self.render('{% image_variant_url post.image 2000 %}', post=post), post.image.url)
+
+    def test_responsive_images_filter(self):
+        self.client.force_login(self.user)
+        uploaded = SimpleUploadedFile('photo.jpg', image_bytes((900, 600)), content_type='image/jpeg')
+        with self.captureOnCommitCallbacks(execute=True):
+            location = self.client.post(reverse('blog:image_upload'), {'file': uploaded}).json()['location']
+
+        content = f'<p><img src="{location}" alt="A &amp; B" width="450"></p><img src="https://example.com/x.png" alt="">'
+        with self.assertNumQueries(1):
+            html = self.render('{{ content|responsive_images }}', content=mark_safe(content))
+        self.assertIn('<picture><source type="image/webp"', html)
+        self.assertIn('sizes="(max-width: 450px) 100vw, 450px"', html)
+        self.assertIn('alt="A &amp; B"', html)
+        self.assertNotIn('height=', html)  # The editor's size is kept
+        self.assertIn('<img src="https://example.com/x.png" alt="">', html)
+
+        # Unsafe strings are left for autoescaping
+        self.assertNotIn('<picture>', self.render('{{ content|responsive_images }}', content=content))
+
+    def test_post_pages_render_variants(self):
+        post = self.create_post()
+        get_image_variants([post.image.name])  # Warm the cache as a list page would
+
+        response = self.client.get(reverse('blog:post_list'))
+        self.assertContains(response, '-320w.webp 320w')
+        response = self.client.get(reverse('pages:index'))
+        self.assertContains(response, '-320w.webp 320w')
+        response = self.client.get(reverse('blog:post_detail', kwargs={'pk': post.pk, 'slug': post.slug}))
+        self.assertContains(response, 'fetchpriority="high"')
+        self.assertContains(response, '-640w.jpg 640w')
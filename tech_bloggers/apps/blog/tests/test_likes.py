@@ -0,0 +1,222 @@
+"""
+Tests for per-user like state lookups
+"""
+import threading
+import time
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..likes import (
+    LIKE_DELTA_KEY, get_pending_like_delta, has_liked, liked_post_ids, take_dirty_post_ids, toggle_like,
+    write_behind_enabled,
+)
+from ..models import Post
+
+
+def shared_cache():
+    """Let LocMem stand in for Redis: in tests, the flush runs in the same process"""
+    return mock.patch('apps.blog.likes.ATOMIC_INCR_BACKENDS', (LocMemCache,))
+
+
+class LikeStateTestCase(TestCase):
+    """Test cases for has_liked, liked_post_ids and their use in views"""
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.reader = User.objects.create_user(username='reader', password='testpass123')
+        self.posts = [
+            Post.objects.create(
+                title=f'Liked Post {index}',
+                content='<p>Body</p>',
+                author=self.author,
+                status='published'
+            )
+            for index in range(4)
+        ]
+        likers = User.objects.bulk_create([User(username=f'fan{index}') for index in range(20)])
+        self.posts[0].likes.add(self.reader, *likers)
+        self.posts[2].likes.add(self.reader)
+
+    def test_has_liked(self):
+        self.assertTrue(has_liked(self.posts[0], self.reader))
+        self.assertFalse(has_liked(self.posts[1], self.reader))
+        self.assertFalse(has_liked(self.posts[0], AnonymousUser()))
+
+    def test_liked_post_ids_is_one_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            liked = liked_post_ids(self.posts, self.reader)
+        self.assertEqual(liked, {self.posts[0].pk, self.posts[2].pk})
+        self.assertEqual(len(queries.captured_queries), 1)
+
+    def test_detail_page_does_not_load_likers(self):
+        """The detail page checks the like state without loading the likers"""
+        self.client.force_login(self.reader)
+        post = self.posts[0]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('blog:post_detail', kwargs={'pk': post.pk, 'slug': post.slug})
+            )
+        self.assertTrue(response.context['user_has_liked'])
+        self.assertContains(response, 'data-liked="true"')
+        self.assertFalse(any(
+            'INNER JOIN "blog_post_likes"' in query['sql'] and '"auth_user"."password"' in query['sql']
+            for query in queries.captured_queries
+        ))
+
+    def test_list_page_marks_liked_cards(self):
+        self.client.force_login(self.reader)
+        response = self.client.get(reverse('blog:post_list'))
+        liked = {post.pk for post in response.context['posts'] if post.user_has_liked}
+        self.assertEqual(liked, {self.posts[0].pk, self.posts[2].pk})
+
+
+class LikeToggleTestCase(TestCase):
+    """Test cases for toggle_like and the write-behind counter mode"""
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.reader = User.objects.create_user(username='reader', password='testpass123')
+        self.post = Post.objects.create(
+            title='Toggled Post',
+            content='<p>Body</p>',
+            author=self.author,
+            status='published'
+        )
+
+    def test_toggle(self):
+        self.assertEqual(toggle_like(self.post, self.reader), (True, 1))
+        self.assertTrue(has_liked(self.post, self.reader))
+        self.assertEqual(toggle_like(self.post, self.reader), (False, 0))
+        self.assertFalse(has_liked(self.post, self.reader))
+
+    def test_write_behind_buffers_counter_changes(self):
+        """Deltas are buffered in the cache until flush_like_counts applies them"""
+        other = User.objects.create_user(username='other', password='testpass123')
+        with override_settings(LIKE_WRITE_BEHIND=True), shared_cache():
+            self.assertEqual(toggle_like(self.post, self.reader), (True, 1))
+            self.assertEqual(toggle_like(self.post, other), (True, 2))
+            self.assertEqual(toggle_like(self.post, self.reader), (False, 1))
+
+            self.post.refresh_from_db()
+            self.assertEqual(self.post.like_count, 0)
+            self.assertEqual(get_pending_like_delta(self.post.pk), 1)
+
+            out = StringIO()
+            call_command('flush_like_counts', stdout=out)
+            self.assertIn('flushed like counts for 1 posts', out.getvalue())
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+        self.assertEqual(get_pending_like_delta(self.post.pk), 0)
+
+    def test_flush_only_checks_posts_with_buffered_likes(self):
+        """The flush reads the dirty set instead of every post; --all still scans them all"""
+        quiet = Post.objects.create(title='Quiet Post', content='<p>Body</p>', author=self.author)
+        cache.set(LIKE_DELTA_KEY.format(quiet.pk), 3)  # e.g. buffered before the dirty set existed
+        with override_settings(LIKE_WRITE_BEHIND=True), shared_cache():
+            toggle_like(self.post, self.reader)
+            self.assertEqual(take_dirty_post_ids(), [self.post.pk])
+            toggle_like(self.post, self.reader)
+            toggle_like(self.post, self.reader)
+
+            out = StringIO()
+            call_command('flush_like_counts', stdout=out)
+            self.assertIn('flushed like counts for 1 posts', out.getvalue())
+            self.assertEqual(take_dirty_post_ids(), [])
+
+            out = StringIO()
+            call_command('flush_like_counts', stdout=out)
+            self.assertIn('flushed like counts for 0 posts', out.getvalue())
+
+            out = StringIO()
+            call_command('flush_like_counts', all=True, stdout=out)
+            self.assertIn('flushed like counts for 1 posts', out.getvalue())
+
+        self.post.refresh_from_db()
+        quiet.refresh_from_db()
+        self.assertEqual((self.post.like_count, quiet.like_count), (1, 3))
+
+    @override_settings(
+        LIKE_WRITE_BEHIND=True,
+        CACHES={'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'likes_cache'}},
+    )
+    def test_write_behind_needs_atomic_cache_increments(self):
+        """The database cache's incr() is a get and a set, so counters are written directly"""
+        call_command('createcachetable', 'likes_cache')
+        with self.assertLogs('apps.blog.likes', 'WARNING'):
+            self.assertFalse(write_behind_enabled())
+        self.assertEqual(toggle_like(self.post, self.reader), (True, 1))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+
+    @override_settings(LIKE_WRITE_BEHIND=True)
+    def test_write_behind_needs_a_shared_cache(self):
+        """LocMem is per worker, so flush_like_counts would never see the deltas"""
+        self.assertFalse(write_behind_enabled())
+        self.assertEqual(toggle_like(self.post, self.reader), (True, 1))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+        self.assertEqual(get_pending_like_delta(self.post.pk), 0)
+
+
+class LikeToggleConcurrencyTestCase(TransactionTestCase):
+    """Parallel toggles keep Post.like_count equal to the number of likes"""
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.users = User.objects.bulk_create([User(username=f'clicker{index}') for index in range(8)])
+        self.post = Post.objects.create(
+            title='Contended Post',
+            content='<p>Body</p>',
+            author=self.author,
+            status='published'
+        )
+
+    def run_in_parallel(self, calls):
+        barrier = threading.Barrier(len(calls))
+        errors = []
+
+        def worker(user):
+            try:
+                barrier.wait()
+                for attempt in range(50):
+                    try:
+                        toggle_like(Post.objects.get(pk=self.post.pk), user)
+                        break
+                    except OperationalError:
+                        # SQLite's shared in-memory test database reports lock contention
+                        # instead of waiting; the failed toggle was rolled back, so retry
+                        time.sleep(0.01)
+                else:
+                    errors.append(f'{user.username} could not toggle')
+            except Exception as exc:  # pragma: no cover - reported below
+                errors.append(exc)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker, args=(user,)) for user in calls]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def test_parallel_toggles_keep_exact_counts(self):
+        # Every user clicks once, and half of them double-click
+        self.run_in_parallel(self.users + self.users[:4])
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, self.post.likes.count())
+
+        self.run_in_parallel(self.users)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, self.post.likes.count())
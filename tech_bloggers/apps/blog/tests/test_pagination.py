@@ -0,0 +1,120 @@
+"""
+Tests for keyset (cursor) pagination of post listings
+"""
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Post
+from ..pagination import CursorPaginator
+
+
+class CursorPaginationTestCase(TestCase):
+    """Test cases for CursorPaginator and the cursor mode of the list views"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='pager', password='testpass123')
+        now = timezone.now()
+        self.posts = []
+        for index in range(25):
+            post = Post.objects.create(
+                title=f'Paged post {index}',
+                content='<p>Body</p>',
+                author=self.user,
+                status='published'
+            )
+            self.posts.append(post)
+        # Give pairs of posts identical timestamps so the id tie-breaker matters
+        for index, post in enumerate(self.posts):
+            Post.objects.filter(pk=post.pk).update(published_at=now - timedelta(hours=index // 2))
+        self.expected = list(Post.objects.order_by('-published_at', '-pk').values_list('pk', flat=True))
+        self.url = reverse('blog:post_list')
+
+    def walk(self, paginator):
+        seen = []
+        page = paginator.page()
+        pages = [page]
+        seen.extend(post.pk for post in page)
+        while page.has_next:
+            page = paginator.page(page.next_cursor)
+            pages.append(page)
+            seen.extend(post.pk for post in page)
+        return seen, pages
+
+    def test_forward_walk_matches_offset_order(self):
+        """Walking next cursors visits every post exactly once, in order"""
+        seen, pages = self.walk(CursorPaginator(Post.objects.all(), 9))
+        self.assertEqual(seen, self.expected)
+        self.assertEqual([len(page) for page in pages], [9, 9, 7])
+        self.assertFalse(pages[0].has_previous)
+
+    def test_previous_cursor_returns_previous_page(self):
+        """Going back from a page returns the page before it"""
+        paginator = CursorPaginator(Post.objects.all(), 9)
+        _, pages = self.walk(paginator)
+        previous = paginator.page(pages[2].previous_cursor)
+        self.assertEqual([post.pk for post in previous], [post.pk for post in pages[1]])
+        self.assertTrue(previous.has_next)
+        first = paginator.page(previous.previous_cursor)
+        self.assertEqual([post.pk for post in first], self.expected[:9])
+        self.assertFalse(first.has_previous)
+
+    def test_deep_pages_do_not_count_or_offset(self):
+        """A cursor page is a single seek query without COUNT(*) or OFFSET"""
+        paginator = CursorPaginator(Post.objects.all(), 9)
+        _, pages = self.walk(paginator)
+        with CaptureQueriesContext(connection) as queries:
+            list(paginator.page(pages[1].next_cursor))
+        self.assertEqual(len(queries.captured_queries), 1)
+        sql = queries.captured_queries[0]['sql'].upper()
+        self.assertNotIn('COUNT(', sql)
+        self.assertNotIn('OFFSET', sql)
+
+    def test_list_view_cursor_mode(self):
+        """?cursor= switches the list view to cursor links"""
+        response = self.client.get(self.url, {'cursor': ''})
+        self.assertTrue(response.context['cursor_pagination'])
+        self.assertEqual([post.pk for post in response.context['posts']], self.expected[:9])
+        self.assertContains(response, 'rel="next"')
+        self.assertNotContains(response, 'rel="prev"')
+
+        response = self.client.get(self.url + response.context['next_page_url'])
+        self.assertEqual([post.pk for post in response.context['posts']], self.expected[9:18])
+
+    def test_json_variant(self):
+        """format=json returns posts and cursors for infinite scroll"""
+        data = self.client.get(self.url, {'cursor': '', 'format': 'json'}).json()
+        self.assertEqual([post['id'] for post in data['posts']], self.expected[:9])
+        self.assertIsNone(data['previous_cursor'])
+
+        data = self.client.get(self.url, {'cursor': data['next_cursor'], 'format': 'json'}).json()
+        self.assertEqual([post['id'] for post in data['posts']], self.expected[9:18])
+        self.assertIsNotNone(data['previous_cursor'])
+
+    def test_tampered_cursor_is_404(self):
+        """Cursors are signed"""
+        response = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_manage_view_cursor_mode(self):
+        """The manage view pages on created_at"""
+        self.client.force_login(self.user)
+        url = reverse('blog:post_manage')
+        expected = list(
+            Post.objects.filter(author=self.user).order_by('-created_at', '-pk').values_list('pk', flat=True)
+        )
+        data = self.client.get(url, {'cursor': '', 'format': 'json'}).json()
+        self.assertEqual([post['id'] for post in data['posts']], expected[:10])
+        data = self.client.get(url, {'cursor': data['next_cursor'], 'format': 'json'}).json()
+        self.assertEqual([post['id'] for post in data['posts']], expected[10:20])
+
+    def test_search_keeps_page_numbers(self):
+        """Ranked search results ignore the cursor parameter"""
+        response = self.client.get(self.url, {'q': 'paged', 'cursor': ''})
+        self.assertFalse(response.context['cursor_pagination'])
+        self.assertEqual(response.context['paginator'].count, 25)
@@ -0,0 +1,119 @@
+"""
+Tests for the denormalized like and comment counters on Post
+"""
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Comment, Post
+
+
+class PostCounterTestCase(TestCase):
+    """Test cases for Post.like_count and Post.comment_count"""
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.reader = User.objects.create_user(username='reader', password='testpass123')
+        self.other = User.objects.create_user(username='other', password='testpass123')
+        self.post = Post.objects.create(
+            title='Counter Post',
+            content='<p>Counting things</p>',
+            author=self.author,
+            status='published'
+        )
+
+    def refresh(self):
+        self.post.refresh_from_db()
+        return self.post
+
+    def test_like_count_follows_m2m_changes(self):
+        """Adding, removing and clearing likes updates the counter"""
+        self.post.likes.add(self.reader, self.other)
+        self.assertEqual(self.refresh().like_count, 2)
+
+        # Re-adding an existing like and removing a missing one are no-ops
+        self.post.likes.add(self.reader)
+        self.post.likes.remove(self.author)
+        self.assertEqual(self.refresh().like_count, 2)
+
+        self.post.likes.remove(self.reader)
+        self.assertEqual(self.refresh().like_count, 1)
+
+        self.post.likes.clear()
+        self.assertEqual(self.refresh().like_count, 0)
+
+    def test_like_count_follows_reverse_m2m_changes(self):
+        """Likes added from the user side are counted too"""
+        self.reader.liked_posts.add(self.post)
+        self.assertEqual(self.refresh().like_count, 1)
+        self.reader.liked_posts.clear()
+        self.assertEqual(self.refresh().like_count, 0)
+        # The removals recorded for the receivers are not left on the user
+        self.assertFalse(hasattr(self.reader, '_removed_like_post_ids'))
+
+    def test_deleting_user_uncounts_their_likes(self):
+        """Cascade-deleted likes are uncounted"""
+        self.post.likes.add(self.reader, self.other)
+        self.other.delete()
+        self.assertEqual(self.refresh().like_count, 1)
+
+    def test_comment_count_only_counts_top_level_comments(self):
+        """Replies do not change the top-level comment counter"""
+        comment = Comment.objects.create(post=self.post, author=self.reader, content='First')
+        Comment.objects.create(post=self.post, author=self.other, content='Reply', parent=comment)
+        self.assertEqual(self.refresh().comment_count, 1)
+        self.assertEqual(self.post.top_level_comment_count, 1)
+
+        comment.delete()
+        self.assertEqual(self.refresh().comment_count, 0)
+
+    def test_comment_count_only_counts_active_comments(self):
+        """Hidden comments are not listed, so they are not counted either"""
+        comment = Comment.objects.create(post=self.post, author=self.reader, content='First')
+        hidden = Comment.objects.create(post=self.post, author=self.other, content='Spam', active=False)
+        self.assertEqual(self.refresh().comment_count, 1)
+
+        comment.active = False
+        comment.save()
+        self.assertEqual(self.refresh().comment_count, 0)
+        comment.content = 'Edited while hidden'
+        comment.save()
+        self.assertEqual(self.refresh().comment_count, 0)
+
+        hidden.active = True
+        hidden.save(update_fields=['active'])
+        self.assertEqual(self.refresh().comment_count, 1)
+        comment.delete()
+        self.assertEqual(self.refresh().comment_count, 1)
+
+        Post.objects.filter(pk=self.post.pk).update(comment_count=5)
+        Post.recount_counters()
+        self.assertEqual(self.refresh().comment_count, 1)
+
+    def test_like_view_returns_counter_value(self):
+        """The like endpoint toggles and reports the stored count"""
+        self.client.force_login(self.reader)
+        url = reverse('blog:post_like', kwargs={'pk': self.post.pk, 'slug': self.post.slug})
+
+        response = self.client.post(url)
+        self.assertEqual(response.json(), {'liked': True, 'count': 1, 'status': 'success'})
+
+        response = self.client.post(url)
+        self.assertEqual(response.json(), {'liked': False, 'count': 0, 'status': 'success'})
+
+    def test_recount_command_repairs_drift(self):
+        """recount_post_counters recomputes counters from source rows"""
+        self.post.likes.add(self.reader)
+        Comment.objects.create(post=self.post, author=self.reader, content='First')
+        Post.objects.filter(pk=self.post.pk).update(like_count=42, comment_count=7)
+
+        out = StringIO()
+        call_command('recount_post_counters', stdout=out)
+        self.assertIn('Successfully recounted', out.getvalue())
+
+        post = self.refresh()
+        self.assertEqual(post.like_count, 1)
+        self.assertEqual(post.comment_count, 1)
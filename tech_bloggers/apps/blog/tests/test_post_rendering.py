@@ -0,0 +1,125 @@
+"""
+Tests for stored post renders (sanitized HTML computed at save time)
+"""
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Post
+from ..utils import get_sanitizer_version
+
+
+class PostRenderedContentTestCase(TestCase):
+    """Test cases for Post.rendered_content and the render_posts command"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='renderuser',
+            email='render@example.com',
+            password='testpass123'
+        )
+        self.post = Post.objects.create(
+            title='Rendered Post',
+            content='<p>Hello <strong>world</strong></p><script>alert(1)</script><span></span>',
+            author=self.user,
+            status='published'
+        )
+
+    def test_content_is_rendered_on_save(self):
+        """Saving a post stores sanitized HTML and the sanitizer version"""
+        self.assertIn('<strong>world</strong>', self.post.rendered_content)
+        self.assertNotIn('<script>', self.post.rendered_content)
+        self.assertNotIn('<span></span>', self.post.rendered_content)
+        self.assertEqual(self.post.sanitizer_version, get_sanitizer_version())
+
+    def test_update_fields_without_content_skips_render(self):
+        """Partial saves that do not touch content keep the stored render"""
+        Post.objects.filter(pk=self.post.pk).update(rendered_content='<p>cached</p>')
+        post = Post.objects.get(pk=self.post.pk)
+        post.title = 'New Title'
+        post.save(update_fields=['title'])
+        post.refresh_from_db()
+        self.assertEqual(post.rendered_content, '<p>cached</p>')
+
+    def test_rendered_html_uses_stored_render(self):
+        """rendered_html serves the stored string when the version matches"""
+        Post.objects.filter(pk=self.post.pk).update(rendered_content='<p>cached</p>')
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual(post.rendered_html, '<p>cached</p>')
+
+    def test_rendered_html_falls_back_when_stale(self):
+        """A stale sanitizer version is re-sanitized on the fly"""
+        Post.objects.filter(pk=self.post.pk).update(rendered_content='<p>cached</p>', sanitizer_version='old')
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertIn('<strong>world</strong>', post.rendered_html)
+
+    def test_detail_page_renders_stored_content(self):
+        """The detail page shows the stored render"""
+        Post.objects.filter(pk=self.post.pk).update(rendered_content='<p>stored render</p>')
+        response = self.client.get(
+            reverse('blog:post_detail', kwargs={'pk': self.post.pk, 'slug': self.post.slug})
+        )
+        self.assertContains(response, '<p>stored render</p>')
+
+    def test_render_posts_command_rerenders_stale_posts(self):
+        """render_posts re-renders posts after the bleach settings change"""
+        with override_settings(BLEACH_ALLOWED_TAGS=['p']):
+            out = StringIO()
+            call_command('render_posts', stdout=out)
+            self.assertIn('Successfully rendered 1 posts', out.getvalue())
+            self.post.refresh_from_db()
+            self.assertNotIn('<strong>', self.post.rendered_content)
+            self.assertEqual(self.post.sanitizer_version, get_sanitizer_version())
+
+        out = StringIO()
+        call_command('render_posts', '--dry-run', stdout=out)
+        self.assertIn('Would render 1 posts', out.getvalue())
+
+
+class PostExcerptTestCase(TestCase):
+    """Test cases for the stored plain-text excerpt and word count"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='excerptuser',
+            email='excerpt@example.com',
+            password='testpass123'
+        )
+
+    def test_excerpt_and_word_count_are_stored(self):
+        """Excerpts are plain text with entities decoded"""
+        post = Post.objects.create(
+            title='Excerpt Post',
+            content='<h1>Title</h1><p>It&rsquo;s <strong>bold</strong> &amp; plain</p>',
+            author=self.user,
+            status='published'
+        )
+        self.assertEqual(post.excerpt, 'Title It’s bold & plain')
+        self.assertEqual(post.word_count, 5)
+
+    def test_excerpt_is_capped(self):
+        """Long bodies are cut to the excerpt column length"""
+        post = Post.objects.create(
+            title='Long Post',
+            content='<p>' + 'word ' * 500 + '</p>',
+            author=self.user,
+            status='published'
+        )
+        self.assertEqual(len(post.excerpt), Post._meta.get_field('excerpt').max_length)
+        self.assertEqual(post.word_count, 500)
+
+    def test_post_list_defers_content(self):
+        """List pages render excerpts without loading post bodies"""
+        Post.objects.create(
+            title='Listed Post',
+            content='<p>Listed body text</p>',
+            author=self.user,
+            status='published'
+        )
+        response = self.client.get(reverse('blog:post_list'))
+        self.assertContains(response, 'Listed body text')
+        post = response.context['posts'][0]
+        self.assertEqual(post.get_deferred_fields(), set(Post.LIST_DEFERRED_FIELDS))
@@ -0,0 +1,138 @@
+"""
+Tests for the precomputed related posts
+"""
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Post, RelatedPost, Tag
+from ..related import get_related_posts, refresh_related_posts
+
+
+def related_titles(post):
+    return list(
+        RelatedPost.objects.filter(post=post).order_by('-score', '-related__published_at')
+        .values_list('related__title', flat=True)
+    )
+
+
+@override_settings(RELATED_POSTS_COUNT=2)
+class RelatedPostsTestCase(TestCase):
+    """Test cases for storing, maintaining and reading related posts"""
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.python, self.django, self.web, self.rust = [
+            Tag.objects.create(name=name, slug=name.lower())
+            for name in ('Python', 'Django', 'Web', 'Rust')
+        ]
+        now = timezone.now()
+        self.posts = {}
+        for index, (title, tags) in enumerate([
+            ('Main', [self.python, self.django, self.web]),
+            ('Two shared', [self.python, self.django]),
+            ('One shared', [self.web]),
+            ('Three shared', [self.python, self.django, self.web]),
+            ('Unrelated', [self.rust]),
+        ]):
+            post = Post.objects.create(
+                title=title,
+                content=f'<p>{title}</p>',
+                author=self.author,
+                status='published',
+                published_at=now - timedelta(days=10 - index)
+            )
+            post.tags.add(*tags)
+            self.posts[title] = post
+        self.main = self.posts['Main']
+
+    def test_tag_changes_maintain_top_matches(self):
+        self.assertEqual(related_titles(self.main), ['Three shared', 'Two shared'])
+        self.assertEqual(
+            list(RelatedPost.objects.filter(post=self.main).values_list('score', flat=True)),
+            [3, 2]
+        )
+        self.assertEqual(related_titles(self.posts['Unrelated']), [])
+
+        self.posts['Three shared'].tags.clear()
+        self.assertEqual(related_titles(self.main), ['Two shared', 'One shared'])
+
+        # Adding posts from the tag side is picked up as well
+        self.rust.post_set.add(self.main, self.posts['One shared'])
+        self.assertEqual(related_titles(self.posts['Unrelated']), ['One shared', 'Main'])
+
+    def test_unpublished_and_deleted_posts_are_dropped(self):
+        three = self.posts['Three shared']
+        three.status = 'draft'
+        three.save()
+        self.assertEqual(related_titles(self.main), ['Two shared', 'One shared'])
+        # Drafts keep their own list so it is ready when they are published
+        self.assertEqual(related_titles(three), ['Main', 'Two shared'])
+
+        three.status = 'published'
+        three.save(update_fields=['status'])
+        self.assertEqual(related_titles(self.main), ['Three shared', 'Two shared'])
+
+        three.delete()
+        self.assertEqual(related_titles(self.main), ['Two shared', 'One shared'])
+
+        self.django.delete()
+        self.python.delete()
+        self.assertEqual(related_titles(self.main), ['One shared'])
+
+    def test_rebuild_matches_incremental_maintenance(self):
+        expected = set(RelatedPost.objects.values_list('post_id', 'related_id', 'score'))
+        RelatedPost.objects.all().delete()
+
+        for batch_size in ('0', '2'):
+            out = StringIO()
+            call_command('rebuild_related_posts', '--batch-size', batch_size, stdout=out)
+            self.assertIn(f'{len(expected)} related post entries', out.getvalue())
+            self.assertEqual(
+                set(RelatedPost.objects.values_list('post_id', 'related_id', 'score')), expected
+            )
+
+    def test_candidates_are_the_newest_posts_per_tag(self):
+        with self.settings(RELATED_POSTS_CANDIDATES=1):
+            refresh_related_posts()
+        # "Three shared" is the newest post of Python, Django and Web
+        self.assertEqual(related_titles(self.main), ['Three shared'])
+        self.assertEqual(related_titles(self.posts['Three shared']), [])
+
+    def test_overlaps_are_computed_in_one_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            refresh_related_posts()
+        selects = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('SELECT')]
+        self.assertEqual(len(selects), 1)
+
+    def test_lookup_is_one_query_and_cached(self):
+        with self.assertNumQueries(1):
+            related = get_related_posts(self.main)
+            self.assertEqual([post.author.username for post in related], ['author', 'author'])
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                [post.title for post in get_related_posts(self.main)],
+                ['Three shared', 'Two shared']
+            )
+
+    def test_detail_page_lists_related_posts(self):
+        response = self.client.get(
+            reverse('blog:post_detail', kwargs={'pk': self.main.pk, 'slug': self.main.slug})
+        )
+        self.assertContains(response, 'Related Posts')
+        self.assertContains(
+            response,
+            reverse('blog:post_detail', kwargs={
+                'pk': self.posts['Three shared'].pk, 'slug': self.posts['Three shared'].slug
+            })
+        )
+        self.assertNotContains(response, 'Unrelated')
@@ -0,0 +1,233 @@
+"""
+Tests for post search
+"""
+import unittest
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Post, Tag
+from ..cache import bump_content_generation
+from ..search import (
+    full_text_search_supported, get_popular_queries, get_search_result_ids,
+    normalize_query, search_posts
+)
+
+
+class PostSearchTestCase(TestCase):
+    """Test cases for apps.blog.search"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='searcher', password='testpass123')
+        self.python_tag = Tag.objects.create(name='Python', slug='python')
+        self.title_match = Post.objects.create(
+            title='Kubernetes in practice',
+            content='<p>Deploying containers.</p>',
+            author=self.user,
+            status='published'
+        )
+        self.content_match = Post.objects.create(
+            title='Weekly notes',
+            content='<p>Some thoughts about kubernetes operators.</p>',
+            author=self.user,
+            status='published'
+        )
+        self.tag_match = Post.objects.create(
+            title='Typing tips',
+            content='<p>Annotations everywhere.</p>',
+            author=self.user,
+            status='published'
+        )
+        self.tag_match.tags.add(self.python_tag)
+
+    def test_search_matches_title_content_and_tags(self):
+        """Search finds posts by title, body and tag name"""
+        results = search_posts(Post.objects.filter(status='published'), 'kubernetes')
+        self.assertEqual(
+            {post.pk for post in results},
+            {self.title_match.pk, self.content_match.pk}
+        )
+        results = search_posts(Post.objects.filter(status='published'), 'python')
+        self.assertEqual([post.pk for post in results], [self.tag_match.pk])
+
+    def test_search_view_uses_search_backend(self):
+        """PostListView returns matching posts for ?q="""
+        response = self.client.get(reverse('blog:post_list'), {'q': 'kubernetes'})
+        self.assertContains(response, self.title_match.title)
+        self.assertContains(response, self.content_match.title)
+        self.assertNotContains(response, self.tag_match.title)
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'Full-text search requires PostgreSQL')
+    def test_title_matches_rank_above_content_matches(self):
+        """Weighted vectors rank title hits above body hits"""
+        self.assertTrue(full_text_search_supported())
+        results = list(search_posts(Post.objects.filter(status='published'), 'kubernetes'))
+        self.assertEqual(results[0].pk, self.title_match.pk)
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'Full-text search requires PostgreSQL')
+    def test_tag_changes_refresh_search_vector(self):
+        """Adding and renaming tags re-indexes the tagged posts"""
+        self.python_tag.name = 'Snakes'
+        self.python_tag.save()
+        results = search_posts(Post.objects.all(), 'snakes')
+        self.assertEqual([post.pk for post in results], [self.tag_match.pk])
+
+
+class SearchSuggestTestCase(TestCase):
+    """Test cases for the search-as-you-type suggestions endpoint"""
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username='suggester', password='testpass123')
+        Tag.objects.create(name='Web Development', slug='web-development')
+        Tag.objects.create(name='DevOps', slug='devops')
+        Tag.objects.bulk_create([
+            Tag(name=f'Topic {index}', slug=f'topic-{index}') for index in range(50)
+        ])
+        for index in range(200):
+            Post.objects.create(
+                title=f'Deploying service {index}',
+                content='<p>' + 'body text ' * 200 + '</p>',
+                author=user,
+                status='published'
+            )
+        Post.objects.create(title='Deploying drafts', content='<p>Draft</p>', author=user, status='draft')
+
+    def setUp(self):
+        from ..search import tag_prefix_index
+        tag_prefix_index.invalidate()
+        self.url = reverse('blog:search_suggest')
+
+    def test_suggestions_return_titles_and_tags(self):
+        """Titles and tag-name word prefixes are suggested"""
+        response = self.client.get(self.url, {'q': 'dev'})
+        data = response.json()
+        self.assertEqual(
+            {tag['name'] for tag in data['tags']},
+            {'Web Development', 'DevOps'}
+        )
+        response = self.client.get(self.url, {'q': 'deploying'})
+        data = response.json()
+        self.assertEqual(len(data['posts']), settings.SEARCH_SUGGEST_LIMIT)
+        self.assertNotIn('Deploying drafts', [post['title'] for post in data['posts']])
+
+    def test_short_queries_return_nothing(self):
+        """Queries under the minimum length skip the database"""
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, {'q': 'd'})
+        self.assertEqual(response.json()['posts'], [])
+
+    def test_suggestions_never_read_post_bodies(self):
+        """The suggestion queries do not select the content column"""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url, {'q': 'deploy'})
+        self.assertTrue(queries.captured_queries)
+        for query in queries.captured_queries:
+            self.assertNotIn('"content"', query['sql'])
+            self.assertNotIn('"rendered_content"', query['sql'])
+
+    def test_suggestions_query_count(self):
+        """Once the tag index is loaded, a suggestion is a single title query"""
+        self.client.get(self.url, {'q': 'warm'})
+        for index in range(3):
+            with self.assertNumQueries(1):
+                self.client.get(self.url, {'q': f'deploying service {index}'})
+
+
+class SearchResultCacheTestCase(TestCase):
+    """Test cases for the search result ID cache"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='cacher', password='testpass123')
+        self.posts = [
+            Post.objects.create(
+                title=f'Caching layer {index}',
+                content='<p>Cache all the things.</p>',
+                author=self.user,
+                status='published'
+            )
+            for index in range(12)
+        ]
+        self.url = reverse('blog:post_list')
+
+    def test_normalize_query(self):
+        self.assertEqual(normalize_query('  Caching   LAYER '), 'caching layer')
+        self.assertEqual(normalize_query(None), '')
+
+    def test_repeated_search_is_served_from_cache(self):
+        """A repeated search only hydrates the page by primary key"""
+        first = self.client.get(self.url, {'q': 'Caching'})
+        self.assertEqual(len(first.context['posts']), 9)
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(self.url, {'q': '  caching '})
+        self.assertEqual(
+            [post.pk for post in second.context['posts']],
+            [post.pk for post in first.context['posts']]
+        )
+        self.assertFalse(any('LIKE' in query['sql'] for query in queries.captured_queries))
+
+    def test_pages_share_one_cache_entry(self):
+        """Later pages come from the same cached ID list"""
+        self.client.get(self.url, {'q': 'caching'})
+        response = self.client.get(self.url, {'q': 'caching', 'page': 2})
+        self.assertEqual(len(response.context['posts']), 3)
+        self.assertEqual(response.context['paginator'].count, 12)
+
+    @override_settings(SEARCH_CACHE_MAX_RESULTS=5)
+    def test_searches_over_the_cap_keep_every_result(self):
+        """More matches than are cached as IDs are paginated over the search itself"""
+        self.assertIsNone(get_search_result_ids('caching', ''))
+        response = self.client.get(self.url, {'q': 'caching', 'page': 2})
+        self.assertEqual(response.context['paginator'].count, 12)
+        self.assertEqual(len(response.context['posts']), 3)
+        self.assertEqual(get_popular_queries(5), [])  # Only first pages are counted
+
+        # The oversized search is remembered, not re-run for its IDs
+        with CaptureQueriesContext(connection) as queries:
+            self.assertIsNone(get_search_result_ids('caching', ''))
+        self.assertEqual(len(queries.captured_queries), 0)
+
+    @override_settings(SEARCH_CACHE_MAX_RESULTS=5)
+    def test_category_listings_are_not_capped(self):
+        """Browsing a tag paginates the queryset, not a cached ID list"""
+        tag = Tag.objects.create(name='Caching', slug='caching')
+        for post in self.posts:
+            post.tags.add(tag)
+        response = self.client.get(self.url, {'category': 'caching', 'page': 2})
+        self.assertEqual(response.context['paginator'].count, 12)
+        self.assertEqual(len(response.context['posts']), 3)
+
+    def test_publishing_invalidates_cached_results(self):
+        """Saving a post bumps the content generation"""
+        self.client.get(self.url, {'q': 'caching'})
+        Post.objects.create(
+            title='Caching layer new',
+            content='<p>Fresh</p>',
+            author=self.user,
+            status='published'
+        )
+        response = self.client.get(self.url, {'q': 'caching'})
+        self.assertEqual(response.context['paginator'].count, 13)
+
+    def test_queries_are_recorded_and_prewarmed(self):
+        """Searches are counted and the prewarm command fills the cache"""
+        self.client.get(self.url, {'q': 'Caching'})
+        self.client.get(self.url, {'q': 'caching'})
+        self.client.get(self.url, {'q': 'caching', 'page': 2})
+        self.assertEqual(get_popular_queries(5), [('caching', 2)])
+
+        bump_content_generation()
+        out = StringIO()
+        call_command('prewarm_search_cache', '--top', '5', stdout=out)
+        self.assertIn('"caching": 12 results', out.getvalue())
+        with CaptureQueriesContext(connection) as queries:
+            get_search_result_ids('caching', '')
+        self.assertEqual(len(queries.captured_queries), 0)
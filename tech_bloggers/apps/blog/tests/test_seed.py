@@ -0,0 +1,72 @@
+"""
+Tests for the synthetic performance dataset generator
+"""
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db.models import Count
+from django.test import TestCase
+
+from ..models import Comment, Post, RelatedPost, TagStat
+from ..seed import SeedOptions, seed_corpus
+
+
+def corpus_shape(prefix):
+    """Everything about a seeded corpus that does not depend on primary keys"""
+    posts = Post.objects.filter(author__username__startswith=f'{prefix}_').order_by('pk')
+    return list(posts.annotate(tag_count=Count('tags')).values_list(
+        'title', 'status', 'published_at', 'like_count', 'comment_count', 'word_count', 'tag_count'
+    ))
+
+
+class SeedCorpusTestCase(TestCase):
+    """Test cases for seed_corpus and the seed_performance_data command"""
+
+    def setUp(self):
+        self.options = SeedOptions(users=30, posts=60, tags=8, body_variants=5, batch_size=25)
+
+    def test_seeds_consistent_corpus(self):
+        counts = seed_corpus(self.options)
+        self.assertEqual(counts['users'], 30)
+        self.assertEqual(counts['posts'], 60)
+        self.assertEqual(User.objects.filter(username__startswith='seed_', profile__isnull=False).count(), 30)
+        self.assertEqual(Post.likes.through.objects.count(), counts['likes'])
+        self.assertEqual(Comment.objects.count(), counts['comments'])
+
+        # Denormalized counters match the generated rows
+        before = list(Post.objects.order_by('pk').values_list('like_count', 'comment_count'))
+        Post.recount_counters()
+        self.assertEqual(list(Post.objects.order_by('pk').values_list('like_count', 'comment_count')), before)
+
+        # Historical timestamps are kept and bodies carry real HTML
+        self.assertFalse(Post.objects.filter(created_at__gt=self.options.until).exists())
+        self.assertTrue(Post.objects.filter(content__contains='<table').exists() or
+                        Post.objects.filter(content__contains='<img').exists())
+        self.assertTrue(Comment.objects.filter(parent__parent__isnull=False).exists())
+
+        # Derived data is filled in
+        self.assertEqual(
+            sum(TagStat.objects.values_list('published_post_count', flat=True)),
+            Post.tags.through.objects.filter(post__status='published').count()
+        )
+        self.assertTrue(RelatedPost.objects.exists())
+
+    def test_same_seed_same_corpus(self):
+        seed_corpus(self.options)
+        self.options.prefix = 'again'
+        seed_corpus(self.options)
+        self.assertEqual(corpus_shape('seed'), corpus_shape('again'))
+
+        self.options.prefix, self.options.seed = 'other', 7
+        seed_corpus(self.options)
+        self.assertNotEqual(corpus_shape('seed'), corpus_shape('other'))
+
+    def test_command(self):
+        out = StringIO()
+        call_command(
+            'seed_performance_data', '--users', '5', '--posts', '10', '--body-variants', '2',
+            '--skip-derived', stdout=out
+        )
+        self.assertIn('Successfully seeded 5 users, 10 posts', out.getvalue())
+        self.assertFalse(RelatedPost.objects.exists())
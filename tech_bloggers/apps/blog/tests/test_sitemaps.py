@@ -0,0 +1,76 @@
+"""
+Tests for the sitemap index and paginated, cached child sitemaps
+"""
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Post, Tag
+
+
+@override_settings(SITEMAP_PAGE_SIZE=3)
+class SitemapTestCase(TestCase):
+    """Test cases for the sitemap index and the post and tag sitemaps"""
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.posts = [
+            Post.objects.create(
+                title=f'Mapped post {index}',
+                content='<p>Body</p>',
+                author=self.author,
+                status='published'
+            )
+            for index in range(5)
+        ]
+        Post.objects.create(title='Draft', content='<p>Draft</p>', author=self.author, status='draft')
+        Tag.objects.create(name='Python', slug='python')
+        self.posts_url = reverse('django.contrib.sitemaps.views.sitemap', kwargs={'section': 'posts'})
+
+    def test_index_lists_paginated_sections(self):
+        response = self.client.get(reverse('django.contrib.sitemaps.views.index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '/sitemap-posts.xml</loc>')
+        self.assertContains(response, '/sitemap-posts.xml?p=2</loc>')
+        self.assertContains(response, '/sitemap-tags.xml</loc>')
+        self.assertContains(response, '/sitemap-static.xml</loc>')
+
+    def test_post_pages_only_list_published_posts(self):
+        first = self.client.get(self.posts_url)
+        second = self.client.get(self.posts_url, {'p': 2})
+        self.assertContains(first, '<url>', count=3)
+        self.assertContains(second, '<url>', count=2)
+        self.assertContains(first, f'/blog/{self.posts[0].pk}-{self.posts[0].slug}/</loc>')
+        self.assertNotContains(second, 'draft')
+        self.assertEqual(self.client.get(self.posts_url, {'p': 3}).status_code, 404)
+
+    def test_post_sitemap_never_loads_post_bodies(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.posts_url)
+        self.assertFalse(any('"content"' in query['sql'] for query in queries.captured_queries))
+
+    def test_tag_sitemap_links_to_tag_listings(self):
+        response = self.client.get(reverse('django.contrib.sitemaps.views.sitemap', kwargs={'section': 'tags'}))
+        self.assertContains(response, '/blog/?category=python</loc>')
+
+    def test_pages_are_cached_until_a_post_on_them_changes(self):
+        self.client.get(self.posts_url)
+        self.client.get(self.posts_url, {'p': 2})
+
+        post = self.posts[4]
+        post.title = 'Renamed'
+        post.slug = 'renamed'
+        post.save()
+
+        with CaptureQueriesContext(connection) as queries:
+            first = self.client.get(self.posts_url)
+        self.assertEqual(first.status_code, 200)
+        # Only the page stamp is computed; the rendered page comes from cache
+        self.assertFalse(any('"slug"' in query['sql'] for query in queries.captured_queries))
+
+        second = self.client.get(self.posts_url, {'p': 2})
+        self.assertContains(second, f'/blog/{post.pk}-renamed/</loc>')
@@ -0,0 +1,98 @@
+"""
+Tests for the materialized tag statistics
+"""
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Post, Tag, TagStat
+from ..tagstats import get_popular_tags, get_tag_list
+
+
+class TagStatTestCase(TestCase):
+    """Test cases for keeping tag statistics current and reading them"""
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.python = Tag.objects.create(name='Python', slug='python')
+        self.rust = Tag.objects.create(name='Rust', slug='rust')
+        self.now = timezone.now()
+        self.posts = []
+        for index in range(3):
+            post = Post.objects.create(
+                title=f'Python post {index}',
+                content='<p>Body</p>',
+                author=self.author,
+                status='published',
+                published_at=self.now - timedelta(days=index)
+            )
+            post.tags.add(self.python)
+            self.posts.append(post)
+        self.draft = Post.objects.create(
+            title='Draft', content='<p>Body</p>', author=self.author, status='draft'
+        )
+        self.draft.tags.add(self.python, self.rust)
+
+    def stat(self, tag):
+        return TagStat.objects.get(tag=tag)
+
+    def test_counts_only_published_posts(self):
+        self.assertEqual(self.stat(self.python).published_post_count, 3)
+        self.assertEqual(self.stat(self.python).last_used_at, self.posts[0].published_at)
+        self.assertEqual(self.stat(self.rust).published_post_count, 0)
+        self.assertIsNone(self.stat(self.rust).last_used_at)
+
+    def test_publish_state_and_tag_changes(self):
+        self.draft.status = 'published'
+        self.draft.published_at = self.now + timedelta(hours=1)
+        self.draft.save()
+        self.assertEqual(self.stat(self.rust).published_post_count, 1)
+        self.assertEqual(self.stat(self.python).published_post_count, 4)
+        self.assertEqual(self.stat(self.python).last_used_at, self.draft.published_at)
+
+        self.posts[0].tags.remove(self.python)
+        self.posts[1].tags.clear()
+        self.assertEqual(self.stat(self.python).published_post_count, 2)
+
+        self.rust.post_set.add(self.posts[2])
+        self.assertEqual(self.stat(self.rust).published_post_count, 2)
+
+        self.posts[2].delete()
+        self.assertEqual(self.stat(self.rust).published_post_count, 1)
+        self.assertEqual(self.stat(self.python).published_post_count, 1)
+
+        self.draft.status = 'draft'
+        self.draft.save(update_fields=['status'])
+        self.assertEqual(self.stat(self.rust).published_post_count, 0)
+
+    def test_refresh_recomputes_from_source_rows(self):
+        TagStat.objects.update(published_post_count=99, last_used_at=None)
+        self.assertEqual(TagStat.refresh(), 2)
+        self.assertEqual(self.stat(self.python).published_post_count, 3)
+
+    def test_popular_tags_and_tag_list(self):
+        self.assertEqual(
+            [tag['slug'] for tag in get_popular_tags(10)], ['python']
+        )
+        with self.assertNumQueries(1):
+            self.assertEqual([tag['name'] for tag in get_tag_list()], ['Python', 'Rust'])
+        with self.assertNumQueries(0):
+            get_tag_list()
+
+    def test_post_list_reads_tag_list(self):
+        url = reverse('blog:post_list')
+        self.client.get(url, {'category': 'python'})
+        response = self.client.get(url, {'category': 'python'})
+        self.assertEqual(response.context['current_tag']['name'], 'Python')
+        self.assertContains(response, 'Python Posts')
+        self.assertEqual(
+            [tag['slug'] for tag in response.context['available_tags']], ['python', 'rust']
+        )
+
+        response = self.client.get(url, {'category': 'missing'})
+        self.assertIsNone(response.context['current_tag'])
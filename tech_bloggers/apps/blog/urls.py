@@ -1,13 +1,20 @@
 from django.urls import path
 from . import views
-from .feeds import LatestPostsFeed, LatestPostsAtomFeed
+from .conditional import published_content_condition
+from .feeds import (
+    AuthorPostsAtomFeed, AuthorPostsFeed, LatestPostsAtomFeed, LatestPostsFeed,
+    TagPostsAtomFeed, TagPostsFeed
+)
 
 app_name = 'blog'
 
+feed_condition = published_content_condition
+
 urlpatterns = [
     # Post listing and detail views
     path('', views.PostListView.as_view(), name='post_list'),
     path('liked/', views.LikedPostsView.as_view(), name='liked_posts'),
+    path('search/suggest/', views.SearchSuggestView.as_view(), name='search_suggest'),
     path('<int:pk>-<slug:slug>/', views.PostDetailView.as_view(), name='post_detail'),
     path('<int:pk>-<slug:slug>/share/', views.PostShareView.as_view(), name='post_share'),
     
@@ -28,7 +35,11 @@ urlpatterns = [
     path('upload-image/', views.ImageUploadView.as_view(), name='image_upload'),
     path('delete-image/', views.ImageDeleteView.as_view(), name='image_delete'),
     
-    # RSS and Atom feeds
-    path('rss/', LatestPostsFeed(), name='post_feed'),
-    path('atom/', LatestPostsAtomFeed(), name='post_atom_feed'),
+    # RSS and Atom feeds (304 Not Modified until published content changes)
+    path('rss/', feed_condition(LatestPostsFeed()), name='post_feed'),
+    path('atom/', feed_condition(LatestPostsAtomFeed()), name='post_atom_feed'),
+    path('tag/<slug:slug>/rss/', feed_condition(TagPostsFeed()), name='tag_feed'),
+    path('tag/<slug:slug>/atom/', feed_condition(TagPostsAtomFeed()), name='tag_atom_feed'),
+    path('author/<str:username>/rss/', feed_condition(AuthorPostsFeed()), name='author_feed'),
+    path('author/<str:username>/atom/', feed_condition(AuthorPostsAtomFeed()), name='author_atom_feed'),
 ]
@@ -0,0 +1,56 @@
+import hashlib
+import json
+import re
+
+import bleach
+from bleach.css_sanitizer import CSSSanitizer
+from django.conf import settings
+
+
+def get_sanitizer_version():
+    """
+    Return a short fingerprint of the bleach configuration.
+
+    Stored alongside pre-rendered post HTML so that stale renders can be
+    detected (and re-rendered) whenever any BLEACH_ALLOWED_* setting changes.
+    """
+    config = {
+        'tags': sorted(settings.BLEACH_ALLOWED_TAGS),
+        'attributes': {
+            tag: sorted(attrs) for tag, attrs in settings.BLEACH_ALLOWED_ATTRIBUTES.items()
+        },
+        'styles': sorted(settings.BLEACH_ALLOWED_STYLES),
+        'protocols': sorted(settings.BLEACH_ALLOWED_PROTOCOLS),
+    }
+    payload = json.dumps(config, sort_keys=True).encode('utf-8')
+    return hashlib.sha1(payload).hexdigest()[:12]
+
+
+def sanitize_content(value):
+    """
+    Sanitize post HTML with bleach and remove empty formatting tags.
+
+    This is the single sanitization pipeline shared by PostForm (on write),
+    Post.render_content (stored render) and the safe_content template filter.
+    """
+    if not value:
+        return ""
+
+    sanitized = bleach.clean(
+        value,
+        tags=settings.BLEACH_ALLOWED_TAGS,
+        attributes=settings.BLEACH_ALLOWED_ATTRIBUTES,
+        css_sanitizer=CSSSanitizer(allowed_css_properties=settings.BLEACH_ALLOWED_STYLES),
+        protocols=settings.BLEACH_ALLOWED_PROTOCOLS,
+        strip_comments=True
+    )
+
+    # Remove empty font tags
+    sanitized = re.sub(r'<font[^>]*>\s*</font>', '', sanitized)
+    # Remove font tags that only contain whitespace or other empty font tags
+    sanitized = re.sub(r'<font[^>]*>\s*(<font[^>]*>\s*</font>\s*)*</font>', '', sanitized)
+    # Clean up empty tags but preserve empty paragraphs (needed for table spacing)
+    # Remove empty spans, divs, strongs, ems, but keep empty <p> tags
+    sanitized = re.sub(r'<(span|div|strong|em|b|i|u)[^>]*>\s*</\1>', '', sanitized)
+
+    return sanitized
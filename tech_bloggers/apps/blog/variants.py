@@ -0,0 +1,305 @@
+"""
+Responsive variants of featured and content images.
+
+build_variants() resizes an image to each width in IMAGE_VARIANT_WIDTHS that is
+narrower than the original. It encodes every size as WebP with a JPEG fallback.
+Like reencode_image(), it is CPU work on bytes only, so it can run in another
+process. store_variants() saves the files in a variants/ directory next to the
+original. It records them as ImageVariant rows, plus one row for the original, so
+templates know every width and height without touching storage.
+templatetags/image_tags.py turns those rows into srcset, sizes, width and height.
+
+A new or replaced image is flagged with variants_pending (on Post and PostImage),
+and the process_images command builds the variants of flagged images, off the
+request. With IMAGE_VARIANTS_IN_REQUEST they are built once the saving transaction
+commits instead, for sites that do not run process_images. The
+generate_image_variants command backfills images that have none.
+"""
+import hashlib
+import logging
+from collections import namedtuple
+from dataclasses import dataclass, field
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Q
+from PIL import Image, ImageOps
+
+from .cache import bump_content_generation, purge_post_pages
+from .images import CONTENT_TYPES, EXTENSIONS, ImageLimits
+
+logger = logging.getLogger(__name__)
+
+VARIANT_FORMATS = ("WEBP", "JPEG")
+SAVE_OPTIONS = {
+    "WEBP": {"quality": 80, "method": 4},
+    "JPEG": {"quality": 82, "optimize": True, "progressive": True},
+}
+CACHE_KEY = 'blog:image_variants:{}'
+CACHE_TIMEOUT = 60 * 60 * 24
+# Short, so an image cached before its variants exist picks them up soon
+EMPTY_CACHE_TIMEOUT = 60
+
+
+class Variant(namedtuple('Variant', ['name', 'format', 'width', 'height'])):
+    """One stored size of an image, as cached for templates"""
+    __slots__ = ()
+
+    @property
+    def url(self):
+        return default_storage.url(self.name)
+
+    @property
+    def content_type(self):
+        return CONTENT_TYPES.get(self.format.upper(), '')
+
+
+@dataclass
+class BuiltImage:
+    """Result of build_variants(): the original's format and size, and the encoded variants"""
+    format: str
+    width: int
+    height: int
+    size: int
+    variants: list = field(default_factory=list)  # (format, width, height, data)
+
+
+def get_variant_widths():
+    return sorted(set(getattr(settings, 'IMAGE_VARIANT_WIDTHS', (320, 640, 960, 1280))))
+
+
+def variant_path(source_name, width, image_format):
+    """Storage name of the `width` pixel `image_format` variant of `source_name`"""
+    directory, _, filename = source_name.rpartition('/')
+    stem = filename.rsplit('.', 1)[0]
+    name = f"variants/{stem}-{width}w.{EXTENSIONS[image_format]}"
+    return f"{directory}/{name}" if directory else name
+
+
+def build_variants(data, widths, max_pixels):
+    """
+    Decode `data` and encode it at each of `widths` narrower than the image, in
+    every VARIANT_FORMATS format. EXIF orientation is applied, so the sizes match
+    what browsers display. Animated images get no variants because they would lose
+    their animation.
+    """
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    with Image.open(BytesIO(data)) as img:
+        image_format = (img.format or '').upper()
+        if getattr(img, 'is_animated', False):
+            return BuiltImage(image_format, *img.size, len(data))
+
+        img = ImageOps.exif_transpose(img)
+        width, height = img.size
+        built = BuiltImage(image_format, width, height, len(data))
+        has_alpha = img.mode in ('RGBA', 'LA', 'PA') or 'transparency' in img.info
+        img = img.convert('RGBA' if has_alpha else 'RGB')
+
+        for target_width in widths:
+            if target_width >= width:
+                break
+            target_height = max(1, round(height * target_width / width))
+            resized = img.resize((target_width, target_height), Image.LANCZOS, reducing_gap=3.0)
+            for variant_format in VARIANT_FORMATS:
+                frame = resized
+                if variant_format == "JPEG" and has_alpha:
+                    # JPEG has no alpha: flatten onto white rather than the hidden colors
+                    background = Image.new('RGBA', resized.size, (255, 255, 255, 255))
+                    frame = Image.alpha_composite(background, resized).convert('RGB')
+                buffer = BytesIO()
+                frame.save(buffer, format=variant_format, **SAVE_OPTIONS[variant_format])
+                built.variants.append((variant_format, target_width, target_height, buffer.getvalue()))
+    return built
+
+
+def _cache_key(source_name):
+    return CACHE_KEY.format(hashlib.md5(source_name.encode('utf-8')).hexdigest())
+
+
+def store_variants(source_name, built, storage=default_storage, refresh_pages=True):
+    """
+    Replace the variants of `source_name` with `built` (a BuiltImage, or None when
+    the image could not be read). A failed image still gets a row for the original,
+    with no size, so that it is not picked up again. Unless `refresh_pages` is off,
+    the pages of posts showing the image are purged afterwards.
+    """
+    from .models import ImageVariant
+
+    delete_variants([source_name], storage)
+    rows = [ImageVariant(
+        source_name=source_name,
+        name=source_name,
+        format=(built.format if built else '').lower(),
+        width=built.width if built else 0,
+        height=built.height if built else 0,
+        file_size=built.size if built else None,
+    )]
+    for image_format, width, height, data in (built.variants if built else ()):
+        name = storage.save(variant_path(source_name, width, image_format), ContentFile(data))
+        rows.append(ImageVariant(
+            source_name=source_name,
+            name=name,
+            format=image_format.lower(),
+            width=width,
+            height=height,
+            file_size=len(data),
+        ))
+    ImageVariant.objects.bulk_create(rows, ignore_conflicts=True)
+    set_variants_pending([source_name], False)
+
+    if not ImageVariant.source_in_use(source_name):
+        # The image was replaced or deleted while its variants were being built
+        delete_variants([source_name], storage)
+        return []
+    cache.delete(_cache_key(source_name))
+    if refresh_pages:
+        refresh_pages_showing([source_name])
+    return rows
+
+
+def generate_variants(source_name, storage=default_storage):
+    """Build and store the variants of `source_name` in this process"""
+    try:
+        with storage.open(source_name, 'rb') as source:
+            data = source.read()
+        built = build_variants(data, get_variant_widths(), ImageLimits.from_settings().max_pixels)
+    except Exception:
+        logger.exception('Building variants of image %s failed', source_name)
+        built = None
+    return store_variants(source_name, built, storage)
+
+
+def generate_variants_in_pool(pool, names, storage=default_storage):
+    """
+    Build the variants of `names` in `pool` (an executor) and store them, purging
+    the affected pages once for the whole batch. Returns (generated, failed).
+    """
+    widths = get_variant_widths()
+    max_pixels = ImageLimits.from_settings().max_pixels
+    futures = []
+    failed = 0
+    for name in names:
+        try:
+            with storage.open(name, 'rb') as source:
+                data = source.read()
+        except OSError:
+            logger.warning('Image %s is missing from storage', name)
+            store_variants(name, None, storage, refresh_pages=False)
+            failed += 1
+            continue
+        futures.append((name, pool.submit(build_variants, data, widths, max_pixels)))
+
+    for name, future in futures:
+        try:
+            built = future.result()
+        except Exception:
+            logger.exception('Building variants of image %s failed', name)
+            built = None
+            failed += 1
+        store_variants(name, built, storage, refresh_pages=False)
+    refresh_pages_showing(names)
+    return len(names) - failed, failed
+
+
+def delete_variants(source_names, storage=default_storage):
+    """Delete the stored variants of `source_names` (the originals are left alone)"""
+    from .models import ImageVariant
+
+    source_names = [name for name in source_names if name]
+    if not source_names:
+        return 0
+    variants = ImageVariant.objects.filter(source_name__in=source_names)
+    for name in variants.exclude(name__in=source_names).values_list('name', flat=True):
+        storage.delete(name)
+    deleted, _ = variants.delete()
+    cache.delete_many([_cache_key(name) for name in source_names])
+    return deleted
+
+
+def set_variants_pending(source_names, pending=True):
+    """Flag (or unflag) the posts and content images stored as `source_names`"""
+    from .models import Post, PostImage
+
+    Post.objects.filter(image__in=source_names).update(variants_pending=pending)
+    PostImage.objects.filter(image__in=source_names).update(variants_pending=pending)
+
+
+def schedule_variants(source_name):
+    """
+    Queue the variants of `source_name` for process_images, or build them once the
+    current transaction commits with IMAGE_VARIANTS_IN_REQUEST
+    """
+    if not source_name:
+        return
+    set_variants_pending([source_name])
+    if getattr(settings, 'IMAGE_VARIANTS_IN_REQUEST', False):
+        transaction.on_commit(lambda: generate_variants(source_name))
+
+
+def pending_variant_sources(limit):
+    """Storage names of up to `limit` images flagged by schedule_variants(), newest first"""
+    from .models import Post, PostImage
+
+    featured = Post.objects.filter(variants_pending=True).order_by('-pk').values_list('image', flat=True)
+    content = PostImage.objects.filter(
+        variants_pending=True, processing_status=PostImage.PROCESSING_READY
+    ).order_by('-pk').values_list('image', flat=True)
+    return list(dict.fromkeys([*featured[:limit], *content[:limit]]))[:limit]
+
+
+def get_image_variants(source_names):
+    """
+    {source name: [Variant]} for `source_names`, ordered by width, with one cache
+    read and at most one query. An image without variants maps to an empty list.
+    """
+    from .models import ImageVariant
+
+    source_names = {name for name in source_names if name}
+    if not source_names:
+        return {}
+    keys = {_cache_key(name): name for name in source_names}
+    cached = cache.get_many(keys)
+    found = {keys[key]: [Variant(*row) for row in rows] for key, rows in cached.items()}
+
+    missing = source_names - set(found)
+    if missing:
+        loaded = {name: [] for name in missing}
+        for row in ImageVariant.objects.filter(source_name__in=missing).order_by('width', 'format').values_list(
+            'source_name', 'name', 'format', 'width', 'height'
+        ):
+            loaded[row[0]].append(Variant(*row[1:]))
+        for generated in (True, False):
+            entries = {
+                _cache_key(name): [tuple(variant) for variant in variants]
+                for name, variants in loaded.items() if bool(variants) == generated
+            }
+            if entries:
+                cache.set_many(entries, CACHE_TIMEOUT if generated else EMPTY_CACHE_TIMEOUT)
+        found.update(loaded)
+    return found
+
+
+def attach_image_variants(posts):
+    """Set `image_variants` on each of `posts` (e.g. a page of list cards) with one lookup"""
+    variants = get_image_variants(post.image.name for post in posts if post.image)
+    for post in posts:
+        post.image_variants = variants.get(post.image.name, []) if post.image else []
+    return posts
+
+
+def refresh_pages_showing(source_names):
+    """Purge cached pages of posts that show `source_names`, so they pick up the variants"""
+    from .models import Post
+
+    posts = list(
+        Post.objects.filter(Q(image__in=source_names) | Q(content_images__image__in=source_names))
+        .distinct().only('pk', 'slug')
+    )
+    if posts:
+        purge_post_pages(posts)
+        # Post page ETags include the content generation
+        bump_content_generation()
@@ -5,23 +5,38 @@ from django.views.generic import (
 )
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.urls import reverse_lazy, reverse
+from django.db import transaction
 from django.db.models import Q
 from django.http import JsonResponse
 from django.contrib import messages
 from django.views.decorators.csrf import csrf_exempt, csrf_protect
 from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from django_ratelimit.decorators import ratelimit
 from django.conf import settings
-from io import BytesIO
-from PIL import Image, UnidentifiedImageError
+from PIL import UnidentifiedImageError
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
 from django.core.mail import EmailMessage
 from django.template.loader import render_to_string
 import json
-import uuid
-from .models import Post, Comment, Tag, PostImage
+from .models import Post, Comment, ImageUsage, PostImage
 from .forms import PostForm, EmailPostForm
+from .comments import load_comment_tree
+from .conditional import post_detail_etag
+from .images import (
+    ALLOWED_FORMATS, CONTENT_TYPES, ImageLimits, content_image_path, inspect_upload,
+    reencode_image, use_background_processing
+)
+from .likes import has_liked, mark_liked_posts, toggle_like
+from .pagination import CursorPaginationMixin
+from .related import get_related_posts
+from .tagstats import find_tag, get_tag_list
+from .variants import attach_image_variants
+from .search import (
+    get_search_result_ids, normalize_query, published_search_queryset,
+    record_search_query, suggest_posts, tag_prefix_index
+)
 
 class SlugRedirectMixin:
     """Mixin to handle slug redirects when slug in URL doesn't match current slug."""
@@ -37,55 +52,98 @@ class SlugRedirectMixin:
         """Get the correct URL for the post. Override in child classes."""
         raise NotImplementedError
 
-class PostListView(ListView):
+class PostListView(CursorPaginationMixin, ListView):
     model = Post
     template_name = 'blog/all_posts.html'
     context_object_name = 'posts'
     paginate_by = 9
 
+    def get_search_params(self):
+        """Return the normalized search query and category filter"""
+        return normalize_query(self.request.GET.get('q')), self.request.GET.get('category', '')
+
     def get_queryset(self):
-        queryset = Post.objects.filter(status='published').select_related('author')
-        
-        # Handle search query
-        search_query = self.request.GET.get('q')
-        if search_query:
-            queryset = queryset.filter(
-                Q(title__icontains=search_query) |
-                Q(content__icontains=search_query) |
-                Q(summary__icontains=search_query) |
-                Q(tags__name__icontains=search_query)
-            ).distinct()
-        
-        # Handle category filter
-        category = self.request.GET.get('category')
-        if category:
-            queryset = queryset.filter(tags__slug=category)
-        
-        return queryset
+        # Handle search query and category filter
+        search_query, category = self.get_search_params()
+        return published_search_queryset(search_query, category).select_related('author').prefetch_related(
+            'tags'
+        ).defer(*Post.LIST_DEFERRED_FIELDS)
+
+    def use_cursor_pagination(self):
+        # Ranked search results have no stable keyset, so searches keep page numbers
+        search_query, _ = self.get_search_params()
+        return super().use_cursor_pagination() and not search_query
+
+    def paginate_queryset(self, queryset, page_size):
+        """
+        Paginate searches over cached, ordered post IDs, then load only the current
+        page's posts. Plain listings, category browsing and searches with too many
+        matches to cache are paginated over the queryset.
+        """
+        search_query, category = self.get_search_params()
+        if self.use_cursor_pagination() or not search_query:
+            return super().paginate_queryset(queryset, page_size)
+
+        post_ids = get_search_result_ids(search_query, category, queryset)
+        if post_ids is None:
+            paginator, page, object_list, is_paginated = super().paginate_queryset(queryset, page_size)
+        else:
+            paginator, page, page_ids, is_paginated = super().paginate_queryset(post_ids, page_size)
+            posts = Post.objects.select_related('author').prefetch_related('tags').defer(
+                *Post.LIST_DEFERRED_FIELDS
+            ).in_bulk(page_ids)
+            page.object_list = object_list = [posts[pk] for pk in page_ids if pk in posts]
+        if page.number == 1:
+            record_search_query(search_query)
+        return paginator, page, object_list, is_paginated
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        # Get available tags for the filter dropdown
-        context['available_tags'] = Tag.objects.all().order_by('name')
+        # Like state for every card on the page in one query
+        mark_liked_posts(context['posts'], self.request.user)
+        attach_image_variants(context['posts'])
+        
+        # Get available tags for the filter dropdown (cached, from the tag statistics)
+        context['available_tags'] = get_tag_list()
         
         # Get current search query and category for template
         context['current_search'] = self.request.GET.get('q', '')
         context['current_category'] = self.request.GET.get('category', '')
         
         # Get current tag if filtering by category
-        if context['current_category']:
-            try:
-                context['current_tag'] = Tag.objects.get(slug=context['current_category'])
-            except Tag.DoesNotExist:
-                context['current_tag'] = None
-        else:
-            context['current_tag'] = None
+        context['current_tag'] = find_tag(context['current_category'])
             
         return context
 
 
-class LikedPostsView(LoginRequiredMixin, ListView):
+class SearchSuggestView(View):
+    """
+    Lightweight JSON search-as-you-type suggestions (post titles and tags).
+    Never touches post bodies, so it is cheap enough to call per keystroke.
+    """
+    def get(self, request):
+        query = request.GET.get('q', '').strip()[:100]
+        if len(query) < getattr(settings, 'SEARCH_SUGGEST_MIN_LENGTH', 2):
+            return JsonResponse({'query': query, 'posts': [], 'tags': []})
+
+        limit = getattr(settings, 'SEARCH_SUGGEST_LIMIT', 5)
+        posts = [
+            {
+                'title': post['title'],
+                'url': reverse('blog:post_detail', kwargs={'pk': post['pk'], 'slug': post['slug']}),
+            }
+            for post in suggest_posts(query, limit)
+        ]
+        list_url = reverse('blog:post_list')
+        tags = [
+            {'name': tag['name'], 'url': f"{list_url}?category={tag['slug']}"}
+            for tag in tag_prefix_index.match(query, limit)
+        ]
+        return JsonResponse({'query': query, 'posts': posts, 'tags': tags})
+
+
+class LikedPostsView(LoginRequiredMixin, CursorPaginationMixin, ListView):
     model = Post
     template_name = 'blog/liked_posts.html'
     context_object_name = 'posts'
@@ -95,7 +153,7 @@ class LikedPostsView(LoginRequiredMixin, ListView):
         queryset = Post.objects.filter(
             likes=self.request.user,
             status='published'
-        ).select_related('author').prefetch_related('tags')
+        ).select_related('author').prefetch_related('tags').defer(*Post.LIST_DEFERRED_FIELDS)
         
         # Handle category filter
         category = self.request.GET.get('category')
@@ -106,25 +164,21 @@ class LikedPostsView(LoginRequiredMixin, ListView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        attach_image_variants(context['posts'])
         
-        # Get available tags for the filter dropdown
-        context['available_tags'] = Tag.objects.all().order_by('name')
+        # Get available tags for the filter dropdown (cached, from the tag statistics)
+        context['available_tags'] = get_tag_list()
         
         # Get current category for template
         context['current_category'] = self.request.GET.get('category', '')
         
         # Get current tag if filtering by category
-        if context['current_category']:
-            try:
-                context['current_tag'] = Tag.objects.get(slug=context['current_category'])
-            except Tag.DoesNotExist:
-                context['current_tag'] = None
-        else:
-            context['current_tag'] = None
+        context['current_tag'] = find_tag(context['current_category'])
             
         return context
 
 
+@method_decorator(condition(etag_func=post_detail_etag), name='get')
 class PostDetailView(SlugRedirectMixin, DetailView):
     model = Post
     template_name = 'blog/single_post.html'
@@ -134,17 +188,15 @@ class PostDetailView(SlugRedirectMixin, DetailView):
         return reverse('blog:post_detail', kwargs={'pk': post.pk, 'slug': post.slug})
 
     def get_queryset(self):
-        return super().get_queryset().select_related('author').prefetch_related(
-            'tags',
-            'comments__author',
-            'comments__replies__author'
-        )
+        return super().get_queryset().select_related('author').prefetch_related('tags')
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         post = context['post']
-        # Add top-level comments to context
-        context['top_level_comments'] = post.comments.filter(parent__isnull=True)
+        # Add top-level comments (with their replies attached) to context
+        context['top_level_comments'] = load_comment_tree(post)
+        context['user_has_liked'] = has_liked(post, self.request.user)
+        context['related_posts'] = get_related_posts(post)
         return context
 
 @method_decorator(ratelimit(key='user', rate='2/m', method='POST', block=True), name='dispatch')
@@ -184,14 +236,17 @@ class PostCreateView(LoginRequiredMixin, CreateView):
     def get_success_url(self):
         return reverse('blog:post_manage')
 
-class PostManageView(LoginRequiredMixin, ListView):
+class PostManageView(LoginRequiredMixin, CursorPaginationMixin, ListView):
     model = Post
     template_name = 'blog/manage_posts.html'
     context_object_name = 'posts'
     paginate_by = 10
+    cursor_ordering_field = 'created_at'
 
     def get_queryset(self):
-        queryset = Post.objects.filter(author=self.request.user).select_related('author')
+        queryset = Post.objects.filter(author=self.request.user).select_related('author').defer(
+            *Post.LIST_DEFERRED_FIELDS
+        )
         
         # Handle search query
         search_query = self.request.GET.get('q')
@@ -210,6 +265,7 @@ class PostManageView(LoginRequiredMixin, ListView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        attach_image_variants(context['posts'])
         
         # Get current search query and status for template
         context['current_search'] = self.request.GET.get('q', '')
@@ -282,6 +338,9 @@ class PostPublishView(LoginRequiredMixin, UserPassesTestMixin, SlugRedirectMixin
             success_message = 'Your post has been unpublished'
         
         post.save()
+        if post.status == 'published':
+            # Published posts must not show originals that still carry their metadata
+            PostImage.process_pending_images(post)
         messages.success(request, success_message)
         
         return redirect(self.get_success_url())
@@ -310,17 +369,12 @@ class PostDeleteView(LoginRequiredMixin, UserPassesTestMixin, SlugRedirectMixin,
 class PostLikeView(LoginRequiredMixin, View):
     def post(self, request, pk, slug):
         post = get_object_or_404(Post, pk=pk)
-        if request.user in post.likes.all():
-            post.likes.remove(request.user)
-            liked = False
-        else:
-            post.likes.add(request.user)
-            liked = True
+        liked, like_count = toggle_like(post, request.user)
         
         # Return JSON response for AJAX requests
         return JsonResponse({
             'liked': liked, 
-            'count': post.likes.count(),
+            'count': like_count,
             'status': 'success'
         })
 
@@ -337,6 +391,7 @@ class PostRecommendView(LoginRequiredMixin, View):
 class CommentCreateView(LoginRequiredMixin, CreateView):
     model = Comment
     fields = ['content']
+    http_method_names = ['post']  # Submitted from the post page; there is no standalone form
 
     def form_valid(self, form):
         form.instance.author = self.request.user
@@ -353,6 +408,7 @@ class CommentCreateView(LoginRequiredMixin, CreateView):
 class CommentReplyView(LoginRequiredMixin, CreateView):
     model = Comment
     fields = ['content']
+    http_method_names = ['post']  # Submitted from the post page; there is no standalone form
 
     def form_valid(self, form):
         parent_comment = get_object_or_404(Comment, pk=self.kwargs.get('pk'))
@@ -382,8 +438,9 @@ class ImageUploadView(LoginRequiredMixin, View):
             
             uploaded_file = request.FILES['file']
 
-            # Check user's image quota limits
-            user_image_count = PostImage.get_user_image_count(request.user)
+            # Check user's image quota limits (one read of the usage ledger)
+            usage = ImageUsage.for_user(request.user)
+            user_image_count = usage.image_count
             max_images_per_user = getattr(settings, 'MAX_IMAGES_PER_USER', 200)
             if user_image_count >= max_images_per_user:
                 return JsonResponse({
@@ -391,7 +448,7 @@ class ImageUploadView(LoginRequiredMixin, View):
                 }, status=400)
 
             # Check user's storage quota
-            user_storage_mb = PostImage.get_user_storage_mb(request.user)
+            user_storage_mb = usage.storage_mb
             max_storage_mb = getattr(settings, 'MAX_STORAGE_PER_USER_MB', 400)
             if user_storage_mb >= max_storage_mb:
                 return JsonResponse({
@@ -410,52 +467,26 @@ class ImageUploadView(LoginRequiredMixin, View):
                     'error': f'Upload would exceed storage limit. You have {max_storage_mb - user_storage_mb:.1f}MB remaining.'
                 }, status=400)
 
-            # Process and sanitize image: validate, resize, strip EXIF, re-encode
+            # Validate the upload, then either store it for the process_images workers
+            # (background mode) or resize, strip EXIF and re-encode it here
+            limits = ImageLimits.from_settings()
             try:
-                Image.MAX_IMAGE_PIXELS = getattr(settings, 'IMAGE_MAX_PIXELS', 12000000)
-                with Image.open(uploaded_file) as img:
-                    original_format = (img.format or '').upper()
-                    allowed_formats = {"JPEG", "JPG", "PNG", "WEBP"}
-                    target_format = original_format if original_format in allowed_formats else "PNG"
-
-                    # Convert mode for JPEG (no alpha)
-                    if target_format in {"JPEG", "JPG"} and img.mode in ("RGBA", "P"):
-                        img = img.convert("RGB")
-
-                    # Enforce dimension limits by downscaling if necessary
-                    max_w = getattr(settings, 'IMAGE_MAX_WIDTH', 2048)
-                    max_h = getattr(settings, 'IMAGE_MAX_HEIGHT', 2048)
-                    width, height = img.size
-                    if width > max_w or height > max_h:
-                        img.thumbnail((max_w, max_h))
-
-                    # Re-encode without EXIF/metadata
-                    buffer = BytesIO()
-                    save_kwargs = {}
-                    if target_format in {"JPEG", "JPG"}:
-                        target_format = "JPEG"
-                        save_kwargs.update({"quality": 85, "optimize": True})
-                    elif target_format == "PNG":
-                        save_kwargs.update({"optimize": True})
-                    elif target_format == "WEBP":
-                        save_kwargs.update({"quality": 85, "method": 6})
-
-                    img.save(buffer, format=target_format, **save_kwargs)
-                    buffer.seek(0)
+                original_format, width, height = inspect_upload(uploaded_file, limits)
+                if use_background_processing() and original_format in ALLOWED_FORMATS:
+                    data = uploaded_file.read()
+                    target_format = original_format
+                    processing_status = PostImage.PROCESSING_PENDING
+                else:
+                    data, target_format, width, height = reencode_image(uploaded_file, limits)
+                    processing_status = PostImage.PROCESSING_READY
 
             except UnidentifiedImageError:
                 return JsonResponse({'error': 'Invalid image file.'}, status=400)
             except Exception as e:
                 return JsonResponse({'error': f'Image processing failed: {str(e)}'}, status=400)
 
-            # Choose extension based on target format
-            ext_map = {"JPEG": "jpg", "JPG": "jpg", "PNG": "png", "WEBP": "webp"}
-            extension = ext_map.get(target_format, 'png')
-            unique_filename = f"{uuid.uuid4().hex}.{extension}"
-
             # Save file to media/post_images/content/
-            file_path = f"post_images/content/{unique_filename}"
-            saved_path = default_storage.save(file_path, ContentFile(buffer.getvalue()))
+            saved_path = default_storage.save(content_image_path(target_format), ContentFile(data))
 
             # Get the full URL for the saved file
             file_url = request.build_absolute_uri(default_storage.url(saved_path))
@@ -464,12 +495,19 @@ class ImageUploadView(LoginRequiredMixin, View):
             # We'll associate it with a temporary post or handle it in the workflow
             # For now, we'll create it without a post association (post can be None)
             # Per-post image limit will be enforced in the form validation
-            post_image = PostImage.objects.create(
-                post=None,  # Will be associated when the post is saved
-                image=saved_path,
-                uploaded_by=request.user,
-                original_filename=uploaded_file.name
-            )
+            # The usage ledger is updated by a receiver, in the same transaction
+            with transaction.atomic():
+                post_image = PostImage.objects.create(
+                    post=None,  # Will be associated when the post is saved
+                    image=saved_path,
+                    uploaded_by=request.user,
+                    original_filename=uploaded_file.name,
+                    file_size=len(data),
+                    width=width,
+                    height=height,
+                    content_type=CONTENT_TYPES.get(target_format, 'image/png'),
+                    processing_status=processing_status,
+                )
             
             # Return the URL in TinyMCE expected format
             return JsonResponse({
@@ -500,7 +538,7 @@ class ImageDeleteView(LoginRequiredMixin, View):
             
             # Delete PostImage records referencing this file (which will also delete the underlying file)
             deleted = False
-            post_images = PostImage.objects.filter(image__endswith=filename)
+            post_images = PostImage.objects.filter(Q(image__endswith=filename) | Q(source_name__endswith=filename))
             if post_images.exists():
                 post_images.delete()
                 deleted = True
@@ -0,0 +1,217 @@
+"""
+Per-request performance metrics.
+
+RequestMetricsMiddleware (apps.core.middleware) creates a RequestMetrics for every
+request and makes it current for the duration of the request. The hooks below add to
+the current one:
+
+* SQL queries, through connection.execute_wrapper() installed by the middleware;
+* cache gets, hits and misses, by wrapping get()/get_many() of the configured cache
+  backend classes;
+* template rendering, by wrapping the Django template backend's Template.render();
+* storage calls (S3 in production), by wrapping the configured storage classes.
+
+The wrappers are installed once per process by install_instrumentation() and only
+read a context variable when no request is being measured, so they are cheap enough
+to leave on in production.
+"""
+import contextvars
+import functools
+import json
+import logging
+import re
+import time
+import uuid
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+REQUEST_ID_RE = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+STORAGE_METHODS = ('_open', '_save', 'delete', 'exists', 'size', 'listdir', 'get_modified_time')
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+_MISSING = object()
+
+
+class RequestMetrics:
+    """Counters and timings (in seconds) for one request"""
+
+    def __init__(self, request_id):
+        self.request_id = request_id
+        self.started = time.perf_counter()
+        self.total_time = None
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.cache_gets = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_time = 0.0
+        self.template_time = 0.0
+        self.storage_count = 0
+        self.storage_time = 0.0
+        # Nesting depth of instrumented calls, so inner calls are not counted twice
+        self._depth = {'cache': 0, 'template': 0, 'storage': 0}
+
+    def sql_wrapper(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_count += 1
+            self.sql_time += time.perf_counter() - start
+
+    def finish(self):
+        self.total_time = time.perf_counter() - self.started
+
+    def server_timing(self):
+        """Server-Timing header value (durations in milliseconds)"""
+        return ', '.join([
+            f'db;dur={self.sql_time * 1000:.1f};desc="{self.sql_count} queries"',
+            f'cache;dur={self.cache_time * 1000:.1f};desc="{self.cache_hits}/{self.cache_gets} hits"',
+            f'tpl;dur={self.template_time * 1000:.1f};desc="templates"',
+            f'storage;dur={self.storage_time * 1000:.1f};desc="{self.storage_count} calls"',
+            f'total;dur={self.total_time * 1000:.1f}',
+        ])
+
+    def as_dict(self):
+        return {
+            'request_id': self.request_id,
+            'total_ms': round(self.total_time * 1000, 2),
+            'sql_count': self.sql_count,
+            'sql_ms': round(self.sql_time * 1000, 2),
+            'cache_gets': self.cache_gets,
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'cache_ms': round(self.cache_time * 1000, 2),
+            'template_ms': round(self.template_time * 1000, 2),
+            'storage_count': self.storage_count,
+            'storage_ms': round(self.storage_time * 1000, 2),
+        }
+
+
+def get_current_metrics():
+    """The RequestMetrics of the request being handled, or None"""
+    return _current.get()
+
+
+def start_request_metrics(request_id):
+    metrics = RequestMetrics(request_id)
+    return metrics, _current.set(metrics)
+
+
+def stop_request_metrics(metrics, token):
+    _current.reset(token)
+    metrics.finish()
+
+
+def get_request_id(request):
+    """Reuse a well-formed incoming X-Request-ID (e.g. set by Nginx), otherwise make one"""
+    request_id = request.headers.get(REQUEST_ID_HEADER, '')
+    return request_id if REQUEST_ID_RE.match(request_id) else uuid.uuid4().hex
+
+
+def log_request_metrics(request, response, metrics):
+    """Write one JSON line with the request's metrics to the apps.core.metrics logger"""
+    record = {
+        'method': request.method,
+        'path': request.path,
+        'status': response.status_code,
+        'view': getattr(getattr(request, 'resolver_match', None), 'view_name', None),
+        **metrics.as_dict(),
+    }
+    logger.info(json.dumps(record, separators=(',', ':')))
+
+
+def _measure(kind, counter=None):
+    """Decorator timing the outermost call of `kind` into the current metrics"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            metrics = _current.get()
+            if metrics is None or metrics._depth[kind]:
+                return func(*args, **kwargs)
+            metrics._depth[kind] += 1
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                metrics._depth[kind] -= 1
+                setattr(metrics, f'{kind}_time', getattr(metrics, f'{kind}_time') + time.perf_counter() - start)
+                if counter:
+                    setattr(metrics, counter, getattr(metrics, counter) + 1)
+        wrapper._request_metrics = True
+        return wrapper
+    return decorator
+
+
+def _wrap_cache_get(get):
+    @functools.wraps(get)
+    def wrapper(self, key, default=None, version=None):
+        metrics = _current.get()
+        if metrics is None or metrics._depth['cache']:
+            return get(self, key, default, version)
+        metrics._depth['cache'] += 1
+        start = time.perf_counter()
+        try:
+            value = get(self, key, _MISSING, version)
+        finally:
+            metrics._depth['cache'] -= 1
+            metrics.cache_time += time.perf_counter() - start
+        metrics.cache_gets += 1
+        if value is _MISSING:
+            metrics.cache_misses += 1
+            return default
+        metrics.cache_hits += 1
+        return value
+    wrapper._request_metrics = True
+    return wrapper
+
+
+def _wrap_cache_get_many(get_many):
+    @functools.wraps(get_many)
+    def wrapper(self, keys, version=None):
+        metrics = _current.get()
+        if metrics is None or metrics._depth['cache']:
+            return get_many(self, keys, version)
+        keys = list(keys)
+        metrics._depth['cache'] += 1
+        start = time.perf_counter()
+        try:
+            values = get_many(self, keys, version)
+        finally:
+            metrics._depth['cache'] -= 1
+            metrics.cache_time += time.perf_counter() - start
+        metrics.cache_gets += len(keys)
+        metrics.cache_hits += len(values)
+        metrics.cache_misses += len(keys) - len(values)
+        return values
+    wrapper._request_metrics = True
+    return wrapper
+
+
+def _wrap_method(cls, name, wrap):
+    method = cls.__dict__.get(name) or getattr(cls, name, None)
+    if method is None or getattr(method, '_request_metrics', False):
+        return
+    setattr(cls, name, wrap(method))
+
+
+def install_instrumentation():
+    """Wrap the configured cache, template and storage classes (idempotent)"""
+    from django.core.cache import caches
+    from django.core.files.storage import storages
+    from django.template.backends.django import Template
+
+    for alias in settings.CACHES:
+        cache_class = type(caches[alias])
+        _wrap_method(cache_class, 'get', _wrap_cache_get)
+        _wrap_method(cache_class, 'get_many', _wrap_cache_get_many)
+
+    _wrap_method(Template, 'render', _measure('template'))
+
+    for alias in storages.backends:
+        storage_class = type(storages[alias])
+        for name in STORAGE_METHODS:
+            _wrap_method(storage_class, name, _measure('storage', counter='storage_count'))
@@ -0,0 +1,82 @@
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.utils.deprecation import MiddlewareMixin
+
+from .metrics import (
+    REQUEST_ID_HEADER, get_request_id, install_instrumentation,
+    log_request_metrics, start_request_metrics, stop_request_metrics
+)
+from .pagecache import (
+    PAGE_CACHE_HEADER, get_cached_page, is_cacheable_request,
+    is_cacheable_response, store_page
+)
+
+
+class RequestMetricsMiddleware:
+    """
+    Measure SQL, cache, template and storage work per request (see apps.core.metrics).
+
+    Every response gets an X-Request-ID header and one JSON log line on the
+    apps.core.metrics logger; staff users also get a Server-Timing header, which
+    browser dev tools show in the network timing panel. Keep this middleware
+    first so the total covers every other middleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'REQUEST_METRICS_ENABLED', True)
+        if self.enabled:
+            install_instrumentation()
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        metrics, token = start_request_metrics(get_request_id(request))
+        request.request_id = metrics.request_id
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics.sql_wrapper))
+                response = self.get_response(request)
+        finally:
+            stop_request_metrics(metrics, token)
+
+        response[REQUEST_ID_HEADER] = metrics.request_id
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_staff:
+            response['Server-Timing'] = metrics.server_timing()
+        log_request_metrics(request, response, metrics)
+        return response
+
+
+class AnonymousPageCacheMiddleware(MiddlewareMixin):
+    """
+    Serve whole pages from cache to anonymous visitors.
+
+    Only requests without a session cookie are considered, and only responses
+    from settings.PAGE_CACHE_VIEWS that set no cookies are stored. Responses
+    carry an X-Page-Cache: HIT/MISS header.
+    """
+
+    def process_request(self, request):
+        if not is_cacheable_request(request):
+            return None
+
+        response = get_cached_page(request)
+        if response is None:
+            return None
+        request._page_cache_hit = True
+        response[PAGE_CACHE_HEADER] = 'HIT'
+        return response
+
+    def process_response(self, request, response):
+        if getattr(request, '_page_cache_hit', False) or not is_cacheable_request(request):
+            return response
+
+        if is_cacheable_response(request, response):
+            store_page(request, response)
+            response[PAGE_CACHE_HEADER] = 'MISS'
+        return response
@@ -0,0 +1,78 @@
+"""
+Full-page cache for anonymous visitors.
+
+Responses are stored in the default cache per URL (host, path and query string).
+Every path has a version number that is part of the key, so purging a path
+invalidates all of its query-string variants (e.g. every page and tag filter of
+the post list) with a single cache write.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+PAGE_CACHE_HEADER = 'X-Page-Cache'
+BYPASS_COOKIES = ('messages',)
+
+
+def _version_key(path):
+    return f'pagecache:version:{path}'
+
+
+def _get_path_version(path):
+    key = _version_key(path)
+    version = cache.get(key)
+    if version is None:
+        # Seed from the clock so an evicted version never revives older entries
+        cache.add(key, int(time.time()), timeout=None)
+        version = cache.get(key, 0)
+    return version
+
+
+def get_page_cache_key(request):
+    url = f'{request.get_host()}{request.get_full_path()}'
+    digest = hashlib.sha1(url.encode('utf-8')).hexdigest()
+    return f'pagecache:{_get_path_version(request.path)}:{digest}'
+
+
+def page_cache_enabled():
+    return getattr(settings, 'PAGE_CACHE_ENABLED', False)
+
+
+def is_cacheable_request(request):
+    """Anonymous GET/HEAD requests without a session (or flash message) cookie"""
+    if not page_cache_enabled() or request.method not in ('GET', 'HEAD'):
+        return False
+    cookies = (settings.SESSION_COOKIE_NAME, *BYPASS_COOKIES)
+    return not any(name in request.COOKIES for name in cookies)
+
+
+def is_cacheable_response(request, response):
+    resolver_match = getattr(request, 'resolver_match', None)
+    if resolver_match is None or resolver_match.view_name not in settings.PAGE_CACHE_VIEWS:
+        return False
+    if response.status_code != 200 or response.streaming or response.cookies:
+        return False
+    cache_control = response.get('Cache-Control', '')
+    return 'private' not in cache_control and 'no-store' not in cache_control
+
+
+def get_cached_page(request):
+    return cache.get(get_page_cache_key(request))
+
+
+def store_page(request, response):
+    cache.set(get_page_cache_key(request), response, getattr(settings, 'PAGE_CACHE_TIMEOUT', 600))
+
+
+def purge_pages(paths):
+    """Invalidate every cached variant of each path"""
+    if not page_cache_enabled():
+        return
+    for path in set(paths):
+        try:
+            cache.incr(_version_key(path))
+        except ValueError:
+            # No version yet, so nothing is cached under this path
+            pass
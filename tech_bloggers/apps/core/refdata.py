@@ -0,0 +1,123 @@
+"""
+Process-local cache for small, read-mostly reference data such as the tag list.
+
+Datasets are registered by name with a loader and kept in process memory, so a read
+costs a single version check against the cache backend instead of a database query.
+With gunicorn's ``preload_app`` the master loads every dataset before forking (see
+``when_ready`` in gunicorn_config.py), so workers start with it already in memory.
+
+Each dataset's version is a token stored in the shared cache. ``invalidate()`` replaces
+the token, and every worker reloads the dataset on its next read, so a refresh
+triggered in one worker reaches all of them. A lost token (eviction, cache flush)
+only causes a reload.
+
+Memory is bounded: at most ``max_entries`` datasets stay loaded (least recently used
+first out), and datasets with more than ``max_items`` items are returned but not kept.
+"""
+import logging
+import threading
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+class ReferenceDataCache:
+    """Named, versioned datasets kept in process memory with hit/miss counters"""
+
+    def __init__(self, max_entries=32, max_items=5000):
+        self.max_entries = max_entries
+        self.max_items = max_items
+        self._loaders = {}
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def register(self, name, loader):
+        """Register `loader`, a callable returning a sized collection, under `name`"""
+        self._loaders[name] = loader
+
+    def _version_key(self, name):
+        return f'refdata:version:{name}'
+
+    def get_version(self, name):
+        key = self._version_key(name)
+        version = cache.get(key)
+        if version is None:
+            cache.add(key, uuid.uuid4().hex, timeout=None)
+            version = cache.get(key)
+        return version
+
+    def invalidate(self, name):
+        """Make every process reload `name` on its next read"""
+        cache.set(self._version_key(name), uuid.uuid4().hex, timeout=None)
+
+    def get(self, name):
+        """
+        Return the dataset `name`, loading it when it is missing or outdated.
+        The returned collection is shared; callers must not mutate it.
+        """
+        loader = self._loaders[name]
+        version = self.get_version(name)
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(name)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        data = loader()
+        with self._lock:
+            self._entries.pop(name, None)
+            if len(data) <= self.max_items:
+                self._entries[name] = (version, data)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return data
+
+    def preload(self):
+        """Load every registered dataset (called in the gunicorn master before forking)"""
+        for name in list(self._loaders):
+            self.get(name)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'loaded': list(self._entries),
+            }
+
+    def clear(self):
+        """Drop every loaded dataset and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+
+reference_data = ReferenceDataCache(
+    max_entries=getattr(settings, 'REFERENCE_DATA_MAX_ENTRIES', 32),
+    max_items=getattr(settings, 'REFERENCE_DATA_MAX_ITEMS', 5000),
+)
+
+
+def preload_reference_data():
+    """
+    Warm process-level caches before workers fork: the registered reference data
+    and Django's current Site cache.
+    """
+    from django.apps import apps
+
+    if apps.is_installed('django.contrib.sites'):
+        from django.contrib.sites.models import Site
+        Site.objects.get_current()
+    reference_data.preload()
+    logger.info('Preloaded reference data: %s', ', '.join(reference_data.stats()['loaded']) or 'none')
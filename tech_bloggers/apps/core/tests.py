@@ -1,3 +1,292 @@
-from django.test import TestCase
+import json
+import re
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.template import Context, Origin, Template
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from apps.blog.models import Comment, Post, Tag
+from apps.blog.seed import SeedOptions, seed_corpus
+from apps.blog.tagstats import get_tag_list
+
+from .metrics import start_request_metrics, stop_request_metrics
+from .refdata import ReferenceDataCache, reference_data
+from .testing import QUERY_BUDGETS, QueryBudget, QueryRecorder, RouteFixture, budget_report, iter_app_routes
+
+
+@override_settings(PAGE_CACHE_ENABLED=True)
+class AnonymousPageCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.reader = User.objects.create_user(username='reader', password='testpass123')
+        self.post = Post.objects.create(
+            title='Cached Post',
+            content='<p>Cached body</p>',
+            author=self.author,
+            status='published'
+        )
+        self.other_post = Post.objects.create(
+            title='Other Post',
+            content='<p>Other body</p>',
+            author=self.author,
+            status='published'
+        )
+        self.detail_url = reverse('blog:post_detail', kwargs={'pk': self.post.pk, 'slug': self.post.slug})
+        self.other_detail_url = reverse(
+            'blog:post_detail', kwargs={'pk': self.other_post.pk, 'slug': self.other_post.slug}
+        )
+
+    def assertCacheStatus(self, url, status, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get('X-Page-Cache'), status)
+        return response
+
+    def test_anonymous_pages_are_cached(self):
+        for url in (reverse('pages:index'), reverse('blog:post_list'), self.detail_url,
+                    reverse('blog:post_feed'), reverse('blog:post_atom_feed')):
+            with self.subTest(url=url):
+                self.assertCacheStatus(url, 'MISS')
+                response = self.assertCacheStatus(url, 'HIT')
+                self.assertFalse(response.cookies)
+
+    def test_query_strings_are_cached_separately(self):
+        self.assertCacheStatus(reverse('blog:post_list'), 'MISS')
+        self.assertCacheStatus(reverse('blog:post_list'), 'MISS', category='python')
+        self.assertCacheStatus(reverse('blog:post_list'), 'HIT', category='python')
+
+    def test_session_cookie_bypasses_cache(self):
+        self.assertCacheStatus(self.detail_url, 'MISS')
+        self.client.force_login(self.reader)
+        response = self.client.get(self.detail_url)
+        self.assertIsNone(response.get('X-Page-Cache'))
+
+    def test_uncached_views_are_not_stored(self):
+        response = self.client.get(reverse('pages:about'))
+        self.assertIsNone(response.get('X-Page-Cache'))
+
+    def test_post_edit_purges_post_pages(self):
+        """Editing a post purges its page, listings and feeds but not other posts"""
+        urls = [self.detail_url, self.other_detail_url, reverse('blog:post_list'), reverse('blog:post_feed')]
+        for url in urls:
+            self.assertCacheStatus(url, 'MISS')
+        self.assertCacheStatus(reverse('blog:post_list'), 'MISS', category='python')
+
+        self.post.title = 'Edited Title'
+        self.post.save()
+
+        response = self.assertCacheStatus(self.detail_url, 'MISS')
+        self.assertContains(response, 'Edited Title')
+        self.assertCacheStatus(reverse('blog:post_list'), 'MISS')
+        self.assertCacheStatus(reverse('blog:post_list'), 'MISS', category='python')
+        self.assertCacheStatus(reverse('blog:post_feed'), 'MISS')
+        self.assertCacheStatus(self.other_detail_url, 'HIT')
+
+    def test_comments_and_likes_purge_post_pages(self):
+        self.assertCacheStatus(self.detail_url, 'MISS')
+        Comment.objects.create(post=self.post, author=self.reader, content='Nice post')
+        self.assertCacheStatus(self.detail_url, 'MISS')
+
+        self.assertCacheStatus(reverse('blog:post_feed'), 'MISS')
+        self.reader.liked_posts.add(self.post)
+        self.assertCacheStatus(self.detail_url, 'MISS')
+        # Engagement does not change feeds
+        self.assertCacheStatus(reverse('blog:post_feed'), 'HIT')
+
+        self.reader.liked_posts.clear()
+        self.assertCacheStatus(self.detail_url, 'MISS')
+
+    def test_tag_changes_purge_post_pages(self):
+        tag = Tag.objects.create(name='Python', slug='python')
+        self.assertCacheStatus(self.detail_url, 'MISS')
+        self.post.tags.add(tag)
+        self.assertCacheStatus(self.detail_url, 'MISS')
+        tag.name = 'Python 3'
+        tag.save()
+        self.assertCacheStatus(self.detail_url, 'MISS')
+        self.assertCacheStatus(self.other_detail_url, 'MISS')
+        self.assertCacheStatus(self.other_detail_url, 'HIT')
+
+
+class ReferenceDataCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.loads = []
+        self.refdata = ReferenceDataCache(max_entries=2, max_items=3)
+        for name in ('a', 'b', 'c'):
+            self.refdata.register(name, self.loader(name))
+
+    def loader(self, name):
+        def load():
+            self.loads.append(name)
+            return (name,) * (4 if name == 'big' else 1)
+        return load
+
+    def test_hits_misses_and_invalidation(self):
+        self.assertEqual(self.refdata.get('a'), ('a',))
+        self.assertEqual(self.refdata.get('a'), ('a',))
+        self.assertEqual(self.loads, ['a'])
+
+        # Another process invalidating the dataset makes this one reload it
+        ReferenceDataCache().invalidate('a')
+        self.refdata.get('a')
+        self.assertEqual(self.loads, ['a', 'a'])
+        self.assertEqual(self.refdata.stats()['hits'], 1)
+        self.assertEqual(self.refdata.stats()['misses'], 2)
+
+    def test_memory_is_bounded(self):
+        self.refdata.register('big', self.loader('big'))
+        self.refdata.preload()
+        stats = self.refdata.stats()
+        self.assertEqual(stats['loaded'], ['b', 'c'])
+        self.assertEqual(stats['evictions'], 1)
+
+        # Oversized datasets are served but never kept
+        self.refdata.get('big')
+        self.refdata.get('big')
+        self.assertEqual(self.loads.count('big'), 3)
+        self.assertEqual(self.refdata.stats()['loaded'], ['b', 'c'])
+
+    def test_tag_list_is_shared_reference_data(self):
+        reference_data.clear()
+        Tag.objects.create(name='Python', slug='python')
+        with self.assertNumQueries(1):
+            get_tag_list()
+        with self.assertNumQueries(0):
+            self.assertEqual([tag['name'] for tag in get_tag_list()], ['Python'])
+
+        Tag.objects.create(name='Go', slug='go')
+        self.assertEqual([tag['name'] for tag in get_tag_list()], ['Go', 'Python'])
+        self.assertEqual(reference_data.stats()['misses'], 2)
+
+
+class RequestMetricsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.post = Post.objects.create(
+            title='Measured Post', content='<p>Body</p>', author=self.author, status='published'
+        )
+        self.detail_url = reverse('blog:post_detail', kwargs={'pk': self.post.pk, 'slug': self.post.slug})
+
+    def get_with_metrics(self, url, **extra):
+        with self.assertLogs('apps.core.metrics', 'INFO') as logs:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, **extra)
+        self.assertEqual(len(logs.records), 1)
+        return response, json.loads(logs.records[0].getMessage()), queries
+
+    def test_logs_one_line_per_request(self):
+        response, record, queries = self.get_with_metrics(self.detail_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(record['request_id'], response['X-Request-ID'])
+        self.assertEqual(record['view'], 'blog:post_detail')
+        self.assertEqual(record['status'], 200)
+        self.assertEqual(record['sql_count'], len(queries))
+        self.assertGreater(record['template_ms'], 0)
+        self.assertGreater(record['cache_gets'], 0)
+        self.assertEqual(record['cache_gets'], record['cache_hits'] + record['cache_misses'])
+        # Anonymous visitors never see the timings
+        self.assertNotIn('Server-Timing', response)
+
+    def test_request_id_is_propagated(self):
+        response, record, _ = self.get_with_metrics(self.detail_url, HTTP_X_REQUEST_ID='edge-1234')
+        self.assertEqual(response['X-Request-ID'], 'edge-1234')
+        response, record, _ = self.get_with_metrics(self.detail_url, HTTP_X_REQUEST_ID='bad id\n')
+        self.assertNotEqual(response['X-Request-ID'], 'bad id\n')
+
+    def test_server_timing_for_staff(self):
+        staff = User.objects.create_user(username='staff', password='testpass123', is_staff=True)
+        self.client.force_login(staff)
+        response, record, _ = self.get_with_metrics(self.detail_url)
+        timing = response['Server-Timing']
+        db_timing = re.search(r'db;dur=([\d.]+);desc="(\d+) queries"', timing)
+        self.assertEqual(int(db_timing.group(2)), record['sql_count'])
+        # The header and the log record round the same duration separately
+        self.assertAlmostEqual(float(db_timing.group(1)), record['sql_ms'], delta=0.1)
+        self.assertIn('tpl;dur=', timing)
+        self.assertIn('total;dur=', timing)
+
+    def test_counts_cache_and_storage_calls(self):
+        # The middleware installed the wrappers when the test client was first used
+        self.client.get(self.detail_url)
+        metrics, token = start_request_metrics('test')
+        try:
+            cache.set('metrics:key', 1)
+            cache.get('metrics:key')
+            cache.get('metrics:missing')
+            cache.get_many(['metrics:key', 'metrics:missing'])
+            default_storage.exists('metrics/missing.txt')
+        finally:
+            stop_request_metrics(metrics, token)
+        self.assertEqual((metrics.cache_gets, metrics.cache_hits, metrics.cache_misses), (4, 2, 2))
+        self.assertEqual(metrics.storage_count, 1)
+
+
+class QueryBudgetTest(TestCase):
+    """Every route of apps/*/urls.py stays within its query budget (see apps.core.testing)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_corpus(SeedOptions(
+            users=12, posts=60, tags=10, avg_likes=6, avg_comments=6, body_variants=3, batch_size=500
+        ))
+        post = Post.objects.filter(status='published').order_by('-comment_count', 'pk').first()
+        cls.fixture = RouteFixture(post.author)
+
+    def request(self, client, url, authenticated):
+        cache.clear()
+        if authenticated:
+            client.force_login(self.fixture.user)
+        with QueryRecorder() as recorder:
+            response = client.get(url)
+        return response, recorder
+
+    def test_every_route_has_a_budget(self):
+        missing = [name for name, params in iter_app_routes() if name not in QUERY_BUDGETS]
+        self.assertEqual(missing, [], 'Routes without an entry in apps.core.testing.QUERY_BUDGETS')
+
+    def test_routes_within_budget(self):
+        self.assertGreater(self.fixture.post.comment_count, 1)
+        failures = []
+        for name, params in iter_app_routes():
+            url = self.fixture.url(name, params)
+            budget = QUERY_BUDGETS.get(name)
+            for authenticated in (False, True):
+                response, recorder = self.request(Client(), url, authenticated)
+                self.assertLess(response.status_code, 500, f'{url} failed')
+                if budget is None:
+                    continue
+                label = f"{name} ({'logged in' if authenticated else 'anonymous'}) {url}"
+                report = budget_report(label, recorder, budget)
+                if report:
+                    failures.append(report)
+        self.assertFalse(failures, '\n\n'.join(failures))
+
+    def test_routes_come_from_apps_only(self):
+        names = dict(iter_app_routes())
+        self.assertEqual(names['blog:post_detail'], ['pk', 'slug'])
+        self.assertIn('pages:index', names)
+        self.assertFalse([name for name in names if name.startswith('admin:') or 'sitemap' in name])
+
+    def test_report_shows_repeated_sql_and_template(self):
+        template = Template(
+            '{% for post in posts %}{{ post.author.username }}{% endfor %}',
+            origin=Origin('cards.html', template_name='cards.html'),
+        )
+        posts = list(Post.objects.filter(status='published')[:5])
+        with QueryRecorder() as recorder:
+            template.render(Context({'posts': posts}))
+
+        self.assertEqual(recorder.duplicate_count(), len(posts) - 1)
+        self.assertIsNone(budget_report('cards', recorder, QueryBudget(len(posts), duplicates=len(posts))))
+        report = budget_report('cards', recorder, QueryBudget(len(posts)))
+        self.assertIn(f'{len(posts) - 1} repeated (budget 0)', report)
+        self.assertIn('FROM "auth_user"', report)
+        self.assertIn('rendering cards.html:1', report)
@@ -0,0 +1,73 @@
+"""
+Homepage section assembly.
+
+The homepage sections are computed as lists of post IDs with a handful of small,
+index-backed queries and cached under a key built from the blog content and
+engagement generations (see apps.blog.cache), so publishing, tag changes, likes
+and comments invalidate them immediately; HOMEPAGE_CACHE_TIMEOUT bounds their age
+otherwise. The cards for every section are then loaded with a single in_bulk(),
+and their responsive image variants with one more lookup.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from apps.blog.cache import get_content_generation, get_engagement_generation
+from apps.blog.models import Post
+from apps.blog.tagstats import get_popular_tags
+from apps.blog.variants import attach_image_variants
+
+LATEST_COUNT = 4
+RECENTLY_POSTED_COUNT = 2
+MOST_COMMENTED_COUNT = 2
+RECOMMENDED_COUNT = 3
+POPULAR_TAGS_COUNT = 10
+
+POST_SECTIONS = ('latest_posts', 'recently_posted', 'most_commented', 'recommended_posts')
+
+
+def build_homepage_sections():
+    """Compute the homepage sections as ordered post ID lists (plus popular tag rows)"""
+    published = Post.objects.filter(status='published')
+
+    # Latest and recently posted share one query: recently posted are the next newest
+    newest_ids = list(
+        published.order_by('-published_at').values_list('pk', flat=True)[:LATEST_COUNT + RECENTLY_POSTED_COUNT]
+    )
+    return {
+        'latest_posts': newest_ids[:LATEST_COUNT],
+        'recently_posted': newest_ids[LATEST_COUNT:],
+        'most_commented': list(
+            published.order_by('-comment_count', '-published_at').values_list('pk', flat=True)[:MOST_COMMENTED_COUNT]
+        ),
+        'recommended_posts': list(
+            published.order_by('-like_count', '-published_at').values_list('pk', flat=True)[:RECOMMENDED_COUNT]
+        ),
+        'popular_tags': get_popular_tags(POPULAR_TAGS_COUNT),
+    }
+
+
+def get_homepage_sections():
+    """Return the homepage sections from cache, rebuilding them after invalidation"""
+    key = f'pages:homepage:{get_content_generation()}:{get_engagement_generation()}'
+    sections = cache.get(key)
+    if sections is None:
+        sections = build_homepage_sections()
+        cache.set(key, sections, getattr(settings, 'HOMEPAGE_CACHE_TIMEOUT', 300))
+    return sections
+
+
+def get_homepage_context():
+    """Homepage template context: every section's posts loaded in one query"""
+    sections = get_homepage_sections()
+    post_ids = {pk for name in POST_SECTIONS for pk in sections[name]}
+    posts = Post.objects.filter(status='published').select_related('author').prefetch_related(
+        'tags'
+    ).defer(*Post.LIST_DEFERRED_FIELDS).in_bulk(post_ids)
+    attach_image_variants(list(posts.values()))
+
+    context = {
+        name: [posts[pk] for pk in sections[name] if pk in posts]
+        for name in POST_SECTIONS
+    }
+    context['popular_tags'] = sections['popular_tags']
+    return context
@@ -1,14 +1,18 @@
 from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
 from django.urls import reverse
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.utils import timezone
 from datetime import timedelta
-from apps.blog.models import Post, Tag
+from apps.blog.models import Comment, Post, Tag
 
 
 class IndexViewTest(TestCase):
     def setUp(self):
+        cache.clear()
         self.client = Client()
         self.user1 = User.objects.create_user(
             username='author1',
@@ -242,3 +246,70 @@ class IndexViewTest(TestCase):
         # All posts should have 0 likes
         for post in recommended_posts:
             self.assertEqual(post.likes.count(), 0)
+
+
+class HomepageCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.reader = User.objects.create_user(username='reader', password='testpass123')
+        self.tag = Tag.objects.create(name='AI', slug='ai')
+        now = timezone.now()
+        self.posts = []
+        for index in range(8):
+            post = Post.objects.create(
+                title=f'Homepage Post {index}',
+                content='<p>Body</p>',
+                author=self.author,
+                status='published',
+                published_at=now - timedelta(days=index)
+            )
+            post.tags.add(self.tag)
+            self.posts.append(post)
+
+    def test_sections(self):
+        """Latest and recently posted split the newest posts without overlap"""
+        response = self.client.get(reverse('pages:index'))
+        self.assertEqual(response.context['latest_posts'], self.posts[:4])
+        self.assertEqual(response.context['recently_posted'], self.posts[4:6])
+        self.assertEqual(response.context['popular_tags'], [
+            {'id': self.tag.pk, 'name': 'AI', 'slug': 'ai', 'post_count': 8, 'last_used_at': self.posts[0].published_at}
+        ])
+
+    def test_cached_homepage_only_loads_cards(self):
+        """A warm homepage loads every section's cards in a single posts query"""
+        self.client.get(reverse('pages:index'))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('pages:index'))
+        self.assertEqual(response.status_code, 200)
+        post_queries = [q['sql'] for q in queries.captured_queries if '"blog_post"' in q['sql']]
+        self.assertEqual(len(post_queries), 1)
+        self.assertNotIn('COUNT(', post_queries[0].upper())
+
+    def test_like_invalidates_recommended_posts(self):
+        """Likes reorder the most liked section immediately"""
+        self.client.get(reverse('pages:index'))
+        self.posts[7].likes.add(self.reader)
+        response = self.client.get(reverse('pages:index'))
+        self.assertEqual(response.context['recommended_posts'][0], self.posts[7])
+
+    def test_comment_invalidates_most_commented(self):
+        """Comments reorder the most commented section immediately"""
+        self.client.get(reverse('pages:index'))
+        Comment.objects.create(post=self.posts[6], author=self.reader, content='Nice')
+        response = self.client.get(reverse('pages:index'))
+        self.assertEqual(response.context['most_commented'][0], self.posts[6])
+
+    def test_publish_invalidates_latest_posts(self):
+        """Publishing a post puts it on the homepage immediately"""
+        self.client.get(reverse('pages:index'))
+        post = Post.objects.create(
+            title='Brand New',
+            content='<p>New</p>',
+            author=self.author,
+            status='published',
+            published_at=timezone.now()
+        )
+        response = self.client.get(reverse('pages:index'))
+        self.assertEqual(response.context['latest_posts'][0], post)
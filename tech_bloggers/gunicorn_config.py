@@ -43,3 +43,23 @@ limit_request_field_size = 8190  # Max size of HTTP header field
 # Performance tuning
 preload_app = True  # Load application code before forking workers (saves memory)
 
+
+def when_ready(server):
+    """
+    Load shared reference data in the master so every worker forks with it in memory,
+    then close the master's connections so workers never share sockets.
+    """
+    from django.core.cache import caches
+    from django.db import connections
+    from apps.core.refdata import preload_reference_data, reference_data
+
+    try:
+        preload_reference_data()
+        server.log.info("Reference data preloaded: %s", reference_data.stats())
+    except Exception:
+        # Workers load it lazily instead
+        server.log.exception("Reference data preload failed")
+    finally:
+        connections.close_all()
+        caches.close_all()
+
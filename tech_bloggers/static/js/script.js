@@ -668,6 +668,40 @@ document.addEventListener("DOMContentLoaded", () => {
     searchInput.addEventListener('input', function() {
       updateSearchIcon();
     });
+
+    // Search-as-you-type suggestions (post titles and tags)
+    const suggestUrl = searchInput.dataset.suggestUrl;
+    const suggestionList = document.getElementById('search-suggestions');
+    if (suggestUrl && suggestionList) {
+      let suggestTimer = null;
+      let suggestController = null;
+
+      searchInput.addEventListener('input', function() {
+        clearTimeout(suggestTimer);
+        const query = searchInput.value.trim();
+        if (query.length < 2) {
+          suggestionList.innerHTML = '';
+          return;
+        }
+        suggestTimer = setTimeout(function() {
+          if (suggestController) {
+            suggestController.abort();
+          }
+          suggestController = new AbortController();
+          fetch(suggestUrl + '?q=' + encodeURIComponent(query), { signal: suggestController.signal })
+            .then(function(response) { return response.json(); })
+            .then(function(data) {
+              suggestionList.innerHTML = '';
+              data.posts.concat(data.tags).forEach(function(item) {
+                const option = document.createElement('option');
+                option.value = item.title || item.name;
+                suggestionList.appendChild(option);
+              });
+            })
+            .catch(function() {});
+        }, 150);
+      });
+    }
   }
 
   // Search Clear Functionality (Manage Posts page)
@@ -38,6 +38,7 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'django.contrib.sites',
     'django.contrib.sitemaps',
+    'django.contrib.postgres',
     'csp',
     'taggit',
     'easy_thumbnails',
@@ -77,6 +78,17 @@ IMAGE_MAX_WIDTH = int(os.getenv('IMAGE_MAX_WIDTH', '2048'))
 IMAGE_MAX_HEIGHT = int(os.getenv('IMAGE_MAX_HEIGHT', '2048'))
 # Maximum total pixels to mitigate decompression bombs
 IMAGE_MAX_PIXELS = int(os.getenv('IMAGE_MAX_PIXELS', '12000000'))  # 12 MP
+# Editor uploads: 'sync' re-encodes inside the request; 'background' validates and
+# stores the original, and the process_images command re-encodes it (see apps.blog.images)
+IMAGE_PROCESSING_MODE = os.getenv('IMAGE_PROCESSING_MODE', 'sync')
+# Widths of the responsive variants (WebP plus a JPEG fallback) generated for featured
+# and content images; only widths narrower than the original are made (see apps.blog.variants)
+IMAGE_VARIANT_WIDTHS = [
+    int(width) for width in os.getenv('IMAGE_VARIANT_WIDTHS', '320,640,960,1280').split(',') if width.strip()
+]
+# Variants are built by the process_images command; set this to build them right
+# after the saving request instead (8 files per image), e.g. without a worker
+IMAGE_VARIANTS_IN_REQUEST = os.getenv('IMAGE_VARIANTS_IN_REQUEST', 'False').lower() == 'true'
 
 # Image upload quantity and storage limits
 MAX_IMAGES_PER_POST = int(os.getenv('MAX_IMAGES_PER_POST', '15'))  # Max images per blog post
@@ -85,10 +97,13 @@ MAX_STORAGE_PER_USER_MB = int(os.getenv('MAX_STORAGE_PER_USER_MB', '400'))  # Ma
 ORPHANED_IMAGE_CLEANUP_HOURS = int(os.getenv('ORPHANED_IMAGE_CLEANUP_HOURS', '12'))  # Hours before orphaned images are cleaned up
 
 MIDDLEWARE = [
+    'apps.core.middleware.RequestMetricsMiddleware',  # First, so its timings cover everything below
     'csp.middleware.CSPMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'django.middleware.http.ConditionalGetMiddleware',  # 304s for cached pages too
+    'apps.core.middleware.AnonymousPageCacheMiddleware',  # Serves cached pages to anonymous visitors
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django_otp.middleware.OTPMiddleware',
@@ -234,7 +249,71 @@ AXES_EXCLUDE_URLS = [
 SITE_ID = 1
 
 # Static assets version for cache busting
-STATIC_VERSION = '4.2'
+STATIC_VERSION = '4.4'
+
+# Full-text search configuration (PostgreSQL text search config used for post search vectors)
+SEARCH_CONFIG = os.getenv('SEARCH_CONFIG', 'english')
+# Search-as-you-type suggestions: results per section, minimum query length,
+# tag index refresh interval (seconds) and the p99 latency budget checked by
+# benchmark_endpoints
+SEARCH_SUGGEST_LIMIT = int(os.getenv('SEARCH_SUGGEST_LIMIT', '5'))
+SEARCH_SUGGEST_MIN_LENGTH = 2
+SEARCH_TAG_INDEX_TTL = int(os.getenv('SEARCH_TAG_INDEX_TTL', '300'))
+SEARCH_SUGGEST_P99_MS = int(os.getenv('SEARCH_SUGGEST_P99_MS', '50'))
+# Search result cache: ordered post IDs per normalized query/category, invalidated
+# by the published content generation; popular queries are tracked for prewarming
+SEARCH_CACHE_TIMEOUT = int(os.getenv('SEARCH_CACHE_TIMEOUT', '900'))  # 15 minutes
+SEARCH_CACHE_MAX_RESULTS = int(os.getenv('SEARCH_CACHE_MAX_RESULTS', '500'))
+SEARCH_POPULAR_MAX_TRACKED = 500
+
+# Homepage sections are invalidated by content/engagement changes; this caps their age
+HOMEPAGE_CACHE_TIMEOUT = int(os.getenv('HOMEPAGE_CACHE_TIMEOUT', '300'))  # 5 minutes
+
+# RSS/Atom feeds: items per feed, and how long serialized feed XML may be cached
+# (publishing and tag changes invalidate it immediately)
+FEED_ITEM_COUNT = int(os.getenv('FEED_ITEM_COUNT', '5'))
+FEED_CACHE_TIMEOUT = int(os.getenv('FEED_CACHE_TIMEOUT', '3600'))  # 1 hour
+
+# Sitemaps: URLs per child sitemap page, and how long a rendered page may be
+# cached (pages are re-rendered as soon as a post on them changes)
+SITEMAP_PAGE_SIZE = int(os.getenv('SITEMAP_PAGE_SIZE', '10000'))
+SITEMAP_CACHE_TIMEOUT = int(os.getenv('SITEMAP_CACHE_TIMEOUT', '86400'))  # 1 day
+
+# Related posts by shared tags: stored matches per post, chosen among the newest
+# RELATED_POSTS_CANDIDATES published posts of each tag (refreshed on tag and status
+# changes; run rebuild_related_posts nightly to catch up older posts) and read cache age
+RELATED_POSTS_COUNT = int(os.getenv('RELATED_POSTS_COUNT', '3'))
+RELATED_POSTS_CANDIDATES = int(os.getenv('RELATED_POSTS_CANDIDATES', '50'))
+RELATED_POSTS_CACHE_TIMEOUT = int(os.getenv('RELATED_POSTS_CACHE_TIMEOUT', '3600'))  # 1 hour
+
+# Process-local reference data (apps.core.refdata), e.g. the tag list: at most this
+# many datasets stay loaded per worker, and larger datasets are never kept
+REFERENCE_DATA_MAX_ENTRIES = int(os.getenv('REFERENCE_DATA_MAX_ENTRIES', '32'))
+REFERENCE_DATA_MAX_ITEMS = int(os.getenv('REFERENCE_DATA_MAX_ITEMS', '5000'))
+
+# Buffer like counter changes in the cache and apply them with the
+# flush_like_counts command (run it every minute or so from cron). Needs a
+# shared cache with atomic incr() (Redis or Memcached); ignored with the database
+# and local-memory caches
+LIKE_WRITE_BEHIND = os.getenv('LIKE_WRITE_BEHIND', 'False').lower() == 'true'
+
+# Per-request SQL/cache/template/storage metrics: one JSON line per request on the
+# apps.core.metrics logger, plus a Server-Timing header for staff users
+REQUEST_METRICS_ENABLED = os.getenv('REQUEST_METRICS_ENABLED', 'True').lower() == 'true'
+
+# Anonymous full-page cache (apps.core.middleware.AnonymousPageCacheMiddleware).
+# Only these views are stored; blog signals purge the affected pages on change.
+PAGE_CACHE_ENABLED = os.getenv('PAGE_CACHE_ENABLED', 'True').lower() == 'true'
+PAGE_CACHE_TIMEOUT = int(os.getenv('PAGE_CACHE_TIMEOUT', '600'))  # 10 minutes
+PAGE_CACHE_VIEWS = [
+    'pages:index',
+    'blog:post_list',
+    'blog:post_detail',
+    'blog:post_feed',
+    'blog:post_atom_feed',
+    'django.contrib.sitemaps.views.index',
+    'django.contrib.sitemaps.views.sitemap',
+]
 
 # Bleach Configuration
 BLEACH_ALLOWED_TAGS = [
@@ -37,6 +37,9 @@ CACHES = {
     }
 }
 
+# Full-page cache is opt-in in development so edits to templates show up immediately
+PAGE_CACHE_ENABLED = os.getenv('PAGE_CACHE_ENABLED', 'False').lower() == 'true'
+
 # Email configuration - Console backend for development
 EMAIL_BACKEND = os.getenv('EMAIL_BACKEND') or 'django.core.mail.backends.console.EmailBackend'
 
@@ -85,6 +88,12 @@ LOGGING = {
             'level': 'DEBUG',
             'propagate': False,
         },
+        # Per-request metrics lines are only written to the log file
+        'apps.core.metrics': {
+            'handlers': ['file'] if DEV_LOGGING_ENABLED else ['null'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
 }
 
@@ -168,6 +168,11 @@ LOGGING = {
             'format': '{levelname} {asctime} {message}',
             'style': '{',
         },
+        # Request metrics are already JSON, one object per line
+        'json_line': {
+            'format': '{message}',
+            'style': '{',
+        },
     },
     'handlers': {
         'console': {
@@ -191,6 +196,14 @@ LOGGING = {
             'encoding': 'utf-8',
             'level': 'ERROR',
         },
+        'metrics_file': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': BASE_DIR.parent / 'logs' / 'metrics.log',
+            'formatter': 'json_line',
+            'maxBytes': 10485760,
+            'backupCount': 10,
+            'encoding': 'utf-8',
+        },
     },
     'loggers': {
         'django': {
@@ -207,6 +220,12 @@ LOGGING = {
             'level': 'WARNING',
             'propagate': False,
         },
+        # One line per request from apps.core.middleware.RequestMetricsMiddleware
+        'apps.core.metrics': {
+            'handlers': ['metrics_file'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
 }
 
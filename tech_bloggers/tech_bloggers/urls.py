@@ -8,10 +8,11 @@ from django.http import HttpResponseRedirect
 from django.urls import reverse
 from django.conf import settings
 from django.conf.urls.static import static
-from django.contrib.sitemaps.views import sitemap
+from django.contrib.sitemaps import views as sitemap_views
 from django.contrib.sitemaps import GenericSitemap
 from apps.blog.models import Post
-from apps.blog.sitemaps import PostSitemap, TagSitemap, StaticViewSitemap
+from apps.blog.conditional import published_content_condition
+from apps.blog.sitemaps import PostSitemap, TagSitemap, StaticViewSitemap, cached_sitemap
 from two_factor.urls import urlpatterns as two_factor_urlpatterns
 
 # Import admin configuration to apply custom branding
@@ -24,6 +25,9 @@ sitemaps = {
     'static': StaticViewSitemap,
 }
 
+# Crawlers revalidate sitemaps constantly; answer 304 until published content changes
+sitemap_condition = published_content_condition
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     # Redirect django-two-factor's /account/login/ to our styled login
@@ -35,8 +39,10 @@ urlpatterns = [
     # Include django-two-factor-auth URLs for admin login
     *two_factor_urlpatterns[0],  # Extract just the URL patterns from the tuple
     
-    # Sitemap
-    path('sitemap.xml', sitemap, {'sitemaps': sitemaps},
+    # Sitemap index, pointing at paginated per-section sitemaps
+    path('sitemap.xml', sitemap_condition(sitemap_views.index), {'sitemaps': sitemaps},
+         name='django.contrib.sitemaps.views.index'),
+    path('sitemap-<section>.xml', sitemap_condition(cached_sitemap), {'sitemaps': sitemaps},
          name='django.contrib.sitemaps.views.sitemap'),
 ]
 